@@ -1,16 +1,55 @@
+import startup_timing
+
+# Time every import below when AIUI_PROFILE_STARTUP is set
+startup_timing.install()
+
+import atexit
+import functools
 import os
-from datetime import datetime
-from openai import OpenAI
-import yaml
+import secrets
+import time
+from datetime import datetime, timedelta
 import streamlit as st
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import Flow
 import httpx
-from typing import Dict, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
 
+import metrics
 import system_prompts
-from ollama_manager import OllamaManager
-from toolbox_core import ToolboxSyncClient
+from authorization import ReloadingAuthorizationIndex
+from client_pool import ClientPool
+from conversation_store import ConversationStore, create_conversation_store
+from health import get_health_checker
+from history_manager import HistoryManager
+from llm_backends import BackendRouter, create_router, router_step, tool_message
+from mcp_sessions import MCPSessionPool
+from model_cascade import CHAT, TurnRoute, route_turn
+from model_warmup import start_model_warmer
+from prefix_cache import start_prefix_cache_monitor
+from prompt_layout import chat_messages
+from react_agent import ReActAgent
+from request_scheduler import RequestScheduler, SchedulerError, Ticket, until_deadline
+from result_shaping import MORE_RESULTS_TOOL, ResultShaper
+from semantic_cache import SemanticCache
+from settings import config, manager as config_manager, section_signature
+from startup_timing import timed_init
+from tool_cache import ToolResultCache
+from tool_runner import run_tool_loop
+from toolbox_manager import ToolboxManager
+
+# Only needed with credentials.enabled, so they are imported by the OAuth code paths
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import Flow
+
+    from session_cookie import SessionCookie
+
+# Appended to answers cut off after scheduler.request_timeout
+TRUNCATED_NOTICE = "\n\n⏱ *Stopped: the answer took too long. Try a narrower question.*"
+# Sample signing keys from earlier config.yaml files, never accepted for the login cookie
+PLACEHOLDER_COOKIE_KEYS = {"some_signature_key"}
+
+# Email of every visitor when credentials.enabled is false
+ANONYMOUS = "anonymous"
 
 # Page configuration
 st.set_page_config(
@@ -20,29 +59,280 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-# Load configuration
-def load_config() -> Dict:
+@st.cache_resource
+@timed_init
+def get_client_pool() -> ClientPool:
+    """
+    Get the process-wide LLM client pool shared by all sessions.
+
+    Returns:
+        ClientPool: Shared client pool
+    """
+    return ClientPool(config)
+
+@st.cache_resource
+def start_metrics_server() -> None:
+    """
+    Start the Prometheus metrics and health endpoints on their side port, once per process.
+
+    server.py starts it before Streamlit in the container; this covers streamlit run app.py.
+    """
+    metrics_config = config.get("metrics", {})
+    if not metrics_config.get("enabled", False) and not config.get("health", {}).get("enabled", False):
+        return
+
+    try:
+        metrics.start_metrics_server(metrics_config.get("port", 9100), get_health_checker(config).routes())
+    except OSError as e:
+        # Another process already serves the port, e.g. after a hot reload
+        print(f"Failed to start metrics server: {str(e)}")
+
+def get_router() -> BackendRouter:
+    """
+    Get the process-wide router over the configured LLM backends.
+
+    The router is rebuilt when the backend settings in config.yaml change;
+    requests already in flight finish on the previous one.
+
+    Returns:
+        BackendRouter: Shared backend router
+    """
+    return build_router(section_signature(config, "ollama", "vllm_config", "llm_config", "routing"))
+
+@st.cache_resource(max_entries=1)
+@timed_init
+def build_router(signature: str) -> BackendRouter:
+    """
+    Build the router for one version of the backend settings.
+
+    Args:
+        signature (str): Fingerprint of the backend settings; only keys the cache
+
+    Returns:
+        BackendRouter: Backend router
+    """
+    return create_router(config, get_client_pool())
+
+@st.cache_resource
+@timed_init
+def get_toolbox_manager() -> ToolboxManager:
+    """
+    Get the process-wide genai-toolbox client and its cached tool registry.
+
+    Returns:
+        ToolboxManager: Shared toolbox manager
+    """
+    toolbox_config = config.get("toolbox", {})
+    manager = ToolboxManager(
+        url=toolbox_config.get("url", "http://localhost:5000"),
+        toolset=toolbox_config.get("toolset", "partner_labs"),
+        runtime=get_client_pool().runtime(),
+        registry_ttl=toolbox_config.get("registry_ttl", 300),
+        max_concurrency=toolbox_config.get("max_concurrency", 8),
+    )
+    atexit.register(manager.close)
+
+    return manager
+
+@st.cache_resource
+@timed_init
+def get_mcp_pool() -> MCPSessionPool:
+    """
+    Get the process-wide sessions to the MCP servers in mcp.servers and their cached tool catalogs.
+
+    Returns:
+        MCPSessionPool: Shared MCP sessions
+    """
+    pool = MCPSessionPool.from_config(config.get("mcp", {}), get_client_pool().runtime())
+    atexit.register(pool.close)
+
+    return pool
+
+@st.cache_resource
+@timed_init
+def get_tool_cache() -> ToolResultCache:
+    """
+    Get the process-wide cache of read-only tool results.
+
+    Returns:
+        ToolResultCache: Shared tool result cache
+    """
+    cache_config = config.get("tool_cache", {})
+
+    return ToolResultCache(
+        ttls=cache_config.get("ttls", {}) if cache_config.get("enabled", False) else {},
+        max_entries=cache_config.get("max_entries", 256),
+        invalidates=cache_config.get("invalidates", {}),
+    )
+
+@st.cache_resource
+@timed_init
+def get_result_shaper() -> ResultShaper:
+    """
+    Get the process-wide tool result shaper and its pages of cut off results.
+
+    Returns:
+        ResultShaper: Shared tool result shaper
+    """
+    shaping_config = config.get("tool_results", {})
+
+    return ResultShaper(
+        columns=shaping_config.get("columns", {}),
+        max_tokens=shaping_config.get("max_tokens", 1500),
+        max_field_chars=shaping_config.get("max_field_chars", 120),
+        chars_per_token=config.get("history", {}).get("chars_per_token", 4),
+        max_results=shaping_config.get("max_results", 128),
+        result_ttl=shaping_config.get("result_ttl", 900),
+    )
+
+@st.cache_resource
+@timed_init
+def get_semantic_cache() -> SemanticCache:
+    """
+    Get the process-wide semantic response cache, embedding prompts with a local Ollama model.
+
+    Returns:
+        SemanticCache: Shared semantic cache
+    """
+    cache_config = config.get("semantic_cache", {})
+    embedding_model = cache_config.get("embedding_model", "nomic-embed-text")
+
+    async def embed_async(text: str) -> List[float]:
+        async with get_client_pool().acquire("ollama"):
+            return await get_client_pool().ollama().aembed(embedding_model, text)
+
+    def embed(text: str) -> List[float]:
+        return get_client_pool().runtime().run(embed_async(text))
+
+    return SemanticCache(
+        embed=embed,
+        similarity_threshold=cache_config.get("similarity_threshold", 0.92),
+        ttl=cache_config.get("ttl", 600),
+        max_entries=cache_config.get("max_entries", 500),
+    )
+
+@st.cache_resource
+@timed_init
+def get_scheduler() -> Optional[RequestScheduler]:
+    """
+    Get the process-wide scheduler that admits chat turns to the model backends.
+
+    Returns:
+        Optional[RequestScheduler]: Shared scheduler, or None if admission control is disabled
+    """
+    scheduler_config = config.get("scheduler", {})
+    if not scheduler_config.get("enabled", False):
+        return None
+
+    return RequestScheduler(
+        max_concurrent=scheduler_config.get("max_concurrent", 4),
+        max_per_user=scheduler_config.get("max_per_user", 1),
+        max_queue=scheduler_config.get("max_queue", 32),
+        max_queued_per_user=scheduler_config.get("max_queued_per_user", 2),
+        queue_timeout=scheduler_config.get("queue_timeout", 120),
+        # Slots of turns whose session died are reclaimed once they overrun the request timeout
+        lease=scheduler_config.get("request_timeout", 180) + 60,
+    )
+
+@st.cache_resource
+@timed_init
+def get_conversation_store() -> Optional[ConversationStore]:
+    """
+    Get the process-wide conversation store, if persistence is enabled.
+
+    Returns:
+        Optional[ConversationStore]: Shared conversation store
+    """
+    store = create_conversation_store(config)
+    if store is not None:
+        atexit.register(store.close)
+
+    return store
+
+def is_semantic_cache_enabled() -> bool:
+    """
+    Check whether the semantic cache is enabled for the active backend.
+
+    Returns:
+        bool: True if answers may be served from the semantic cache
+    """
+    cache_config = config.get("semantic_cache", {})
+
+    return cache_config.get("enabled", False) and cache_config.get("backends", {}).get(get_primary_backend_kind(), True)
+
+@st.cache_resource
+@timed_init
+def get_session_cookie() -> Optional["SessionCookie"]:
+    """
+    Get the signer of the login cookie, if a signing key is configured.
+
+    Returns:
+        Optional[SessionCookie]: Login cookie signer
+    """
+    from session_cookie import SessionCookie
+
+    cookie_config = config.get("cookie", {})
+    key = os.environ.get("AUTH_COOKIE_KEY") or cookie_config.get("key")
+    if not key:
+        return None
+    if key in PLACEHOLDER_COOKIE_KEYS:
+        # Anyone could sign a login cookie with a published key
+        print("The login cookie is disabled: cookie.key is a placeholder, set AUTH_COOKIE_KEY to a secret")
+        return None
+
+    return SessionCookie(
+        name=cookie_config.get("name", "aiui_session"),
+        key=key,
+        expiry_days=cookie_config.get("expiry_days", 1),
+    )
+
+@st.cache_resource
+@timed_init
+def get_authorization_index() -> ReloadingAuthorizationIndex:
     """
-    Load configuration from the config.yaml file.
+    Get the process-wide authorization index, rebuilt when the preauthorized lists change.
 
     Returns:
-        Dict: Configuration dictionary
+        ReloadingAuthorizationIndex: Shared authorization index
+    """
+    index = ReloadingAuthorizationIndex(
+        config_manager=config_manager,
+        check_interval=config["preauthorized"].get("reload_interval", 5),
+    )
+    # Build the lookup tables now rather than during the first login
+    index.index()
+
+    return index
+
+@st.cache_resource
+@timed_init
+def get_http_client() -> httpx.Client:
     """
-    with open("config.yaml", "r") as file:
-        config_file = yaml.safe_load(file)
+    Get the process-wide HTTP client for Google APIs, reusing connections across logins.
 
-    return config_file
+    Returns:
+        httpx.Client: Shared HTTP client
+    """
+    credentials_config = config.get("credentials", {})
 
-config = load_config()
+    return httpx.Client(
+        timeout=credentials_config.get("timeout", 10),
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+    )
 
 # Set up OAuth flow
-def create_oauth_flow() -> Flow:
+def create_oauth_flow(code_verifier: Optional[str] = None) -> "Flow":
     """
     Create Google OAuth flow.
 
+    Args:
+        code_verifier (Optional[str]): PKCE code verifier of the login; PKCE is not used without one
+
     Returns:
         Flow: Google OAuth flow
     """
+    from google_auth_oauthlib.flow import Flow
+
     # Ensure redirect URI is properly formatted
     redirect_uri = os.environ.get("GOOGLE_REDIRECT_URI", "http://localhost:8501")
 
@@ -61,13 +351,37 @@ def create_oauth_flow() -> Flow:
     flow = Flow.from_client_config(
         client_config=client_config,
         scopes=["openid", "https://www.googleapis.com/auth/userinfo.email", "https://www.googleapis.com/auth/userinfo.profile"],
-        redirect_uri=redirect_uri
+        redirect_uri=redirect_uri,
+        code_verifier=code_verifier,
+        autogenerate_code_verifier=False,
     )
 
     return flow
 
+def get_login_url() -> str:
+    """
+    Get the Google authorization URL, built once per browser session.
+
+    Returns:
+        str: Authorization URL
+    """
+    if "login_url" not in st.session_state:
+        state = secrets.token_urlsafe(24)
+        cookie = get_session_cookie()
+
+        flow = create_oauth_flow(cookie.code_verifier(state) if cookie else None)
+        auth_url, _ = flow.authorization_url(
+            state=state,
+            access_type="offline",
+            include_granted_scopes="true",
+            prompt="consent"
+        )
+        st.session_state["login_url"] = auth_url
+
+    return st.session_state["login_url"]
+
 # Get user info from Google
-def get_user_info(credentials: Credentials) -> Dict:
+def get_user_info(credentials: "Credentials") -> Dict:
     """
     Get user information from Google.
 
@@ -77,12 +391,65 @@ def get_user_info(credentials: Credentials) -> Dict:
     Returns:
         Dict: User information
     """
-    response = httpx.get(
+    return fetch_user_info(credentials.token)
+
+@st.cache_data(ttl=config.get("credentials", {}).get("userinfo_ttl", 300), max_entries=1000, show_spinner=False)
+def fetch_user_info(token: str) -> Dict:
+    """
+    Fetch the userinfo of an access token, cached per token.
+
+    Args:
+        token (str): OAuth access token
+
+    Returns:
+        Dict: User information
+    """
+    response = get_http_client().get(
         "https://www.googleapis.com/oauth2/v1/userinfo",
-        headers={"Authorization": f"Bearer {credentials.token}"}
+        headers={"Authorization": f"Bearer {token}"}
     )
+    response.raise_for_status()
     return response.json()
 
+def restore_session() -> None:
+    """
+    Authenticate a new browser session from a valid login cookie, skipping the OAuth round trip.
+    """
+    # Browser cookies are only read when the session starts; after a logout they are stale
+    if st.session_state.get("cookie_checked"):
+        return
+    st.session_state["cookie_checked"] = True
+
+    cookie = get_session_cookie()
+    if cookie is None:
+        return
+
+    user_info = cookie.decode(st.context.cookies.get(cookie.name))
+    if user_info and is_authorized(user_info["email"]):
+        st.session_state["authenticated"] = True
+        st.session_state["user_info"] = user_info
+
+def write_session_cookie(user_info: Optional[Dict]) -> None:
+    """
+    Set the login cookie in the browser, or expire it when user_info is None.
+
+    Args:
+        user_info (Optional[Dict]): Profile of the logged in user
+    """
+    cookie = get_session_cookie()
+    if cookie is None:
+        return
+
+    import extra_streamlit_components as stx
+
+    cookie_manager = stx.CookieManager(key="session_cookie_manager")
+    if user_info is None:
+        cookie_manager.set(cookie.name, "", key="session_cookie", expires_at=datetime.now() - timedelta(days=1),
+                           same_site="lax")
+    else:
+        cookie_manager.set(cookie.name, cookie.encode(user_info), key="session_cookie",
+                           expires_at=cookie.expires_at(), same_site="lax")
+
 # Check if the user is authorized
 def is_authorized(email: str) -> bool:
     """
@@ -94,15 +461,7 @@ def is_authorized(email: str) -> bool:
     Returns:
         bool: True if authorized, False otherwise
     """
-    # Allow if email is in the preauthorized list or if the list is empty
-    if email in config["preauthorized"]["emails"] or not config["preauthorized"]["emails"]:
-        return True
-
-    # Allow redhat.com email addresses
-    if email.lower().endswith("@redhat.com"):
-        return True
-
-    return False
+    return get_authorization_index().is_authorized(email)
 
 # Handle OAuth flow
 def handle_oauth() -> Tuple[bool, Optional[Dict]]:
@@ -117,7 +476,10 @@ def handle_oauth() -> Tuple[bool, Optional[Dict]]:
 
     if "code" in query_params:
         try:
-            flow = create_oauth_flow()
+            # The verifier is derived from the state, as the login may have started in another session
+            cookie = get_session_cookie()
+            state = query_params.get("state", "")
+            flow = create_oauth_flow(cookie.code_verifier(state) if cookie and state else None)
             # Get the authorization code from query parameters
             # Handle both list and string formats
             _code = query_params["code"]
@@ -125,20 +487,28 @@ def handle_oauth() -> Tuple[bool, Optional[Dict]]:
                 _code = _code
 
             # Exchange the authorization code for credentials
-            flow.fetch_token(
-                code=_code
-            )
+            with metrics.timed(metrics.AUTH_STEP_DURATION, step="fetch_token"):
+                flow.fetch_token(
+                    code=_code
+                )
             credentials = flow.credentials
 
             # Get user info
-            user_info = get_user_info(credentials)
+            with metrics.timed(metrics.AUTH_STEP_DURATION, step="userinfo"):
+                user_info = get_user_info(credentials)
 
             # Check if the user is authorized
-            if is_authorized(user_info.get("email", "")):
+            with metrics.timed(metrics.AUTH_STEP_DURATION, step="authorize"):
+                authorized = is_authorized(user_info.get("email", ""))
+
+            if authorized:
                 # Store user info in the session state
                 st.session_state["authenticated"] = True
                 st.session_state["user_info"] = user_info
 
+                # Remember the login across reloads
+                write_session_cookie(user_info)
+
                 # Clear the URL parameters
                 st.query_params.clear()
 
@@ -165,12 +535,66 @@ def handle_oauth() -> Tuple[bool, Optional[Dict]]:
             st.session_state["authenticated"] = False
             return False, None
 
+    restore_session()
+
     return st.session_state.get("authenticated", False), st.session_state.get("user_info", None)
 
 def get_system_prompt(user_prompt: str = None, persona: str = None) -> str:
+    """
+    Get the system prompt of the conversation, sent as its first message.
+
+    Turns are told apart by the model they are sent to (see route_chat_turn),
+    not by their prompt: one persona for every turn keeps the start of the
+    conversation identical, so the backends can reuse its cached prefill.
+
+    Args:
+        user_prompt (str): User prompt
+        persona (str): Unused; kept for callers that pass one
+
+    Returns:
+        str: System prompt
+    """
     return system_prompts.default_persona
 
-def init_session_state() -> None:
+def route_chat_turn(user_prompt: str) -> Optional[TurnRoute]:
+    """
+    Pick the model for a turn: the chat model for small talk and simple lookups,
+    the agent model for multi-step reasoning and tool planning.
+
+    Args:
+        user_prompt (str): User prompt
+
+    Returns:
+        Optional[TurnRoute]: Route of the turn, or None if the cascade is disabled
+    """
+    cascade_config = config.get("model_cascade", {})
+    if not cascade_config.get("enabled", False):
+        return None
+
+    route = route_turn(
+        user_prompt,
+        previous_role=st.session_state.get("last_role"),
+        min_confidence=cascade_config.get("min_confidence", 0.6),
+        escalate_on_failure=cascade_config.get("escalate_on_failure", True),
+    )
+
+    return route
+
+def get_user_key() -> str:
+    """
+    Get the key that tells users apart, for per-user scheduling and as the owner of stored conversations.
+
+    Without a login every visitor has the email "anonymous", so their sessions are told apart instead.
+
+    Returns:
+        str: The user's email, or the session id for anonymous visitors
+    """
+    if st.session_state.user_email != ANONYMOUS:
+        return st.session_state.user_email
+
+    return st.session_state.session_id
+
+def init_session_state(user_email: str) -> None:
     # Initialize empty message history for storing chat conversations
     if 'messages' not in st.session_state:
         st.session_state.messages = []
@@ -179,90 +603,435 @@ def init_session_state() -> None:
     if 'session_id' not in st.session_state:
         import uuid
         st.session_state.session_id = str(uuid.uuid4())
+        st.session_state.user_email = user_email
+
+        # Persisted messages before the loaded ones, paged in on request
+        st.session_state.older_messages = []
+        st.session_state.history_start = 0
+        st.session_state.stored_count = 0
+
+        store = get_conversation_store()
+        if store is not None:
+            try:
+                resume_conversation(store, user_email)
+            except Exception as e:
+                # Start a fresh conversation rather than failing the page
+                print(f"Failed to resume the conversation: {str(e)}")
+
+    # Rolling summary of turns that no longer fit the history budget
+    if 'history_summary' not in st.session_state:
+        st.session_state.history_summary = {}
+
+def resume_conversation(store: ConversationStore, user_email: str) -> None:
+    """
+    Continue the conversation named in the URL, or the user's latest one, loading only its newest messages.
+
+    The session id is kept in the URL so a reload or reconnect, on any replica, resumes the same conversation.
+    Anonymous visitors own their conversations by session id, so they only resume the one in their URL.
+
+    Args:
+        store (ConversationStore): Conversation store
+        user_email (str): Email of the user
+    """
+    store_config = config.get("conversation_store", {})
+    session_id = st.query_params.get("session")
+    if not session_id and store_config.get("resume_latest", True) and user_email != ANONYMOUS:
+        session_id = store.latest_session(user_email)
+
+    if session_id:
+        st.session_state.session_id = session_id
+        owner = get_user_key()
+        page_size = config.get("chat_display", {}).get("page_size", 20)
+        recent = store.load(owner, session_id, limit=page_size)
+        st.session_state.messages = [message for _, message in recent]
+        st.session_state.stored_count = recent[-1][0] + 1 if recent else store.next_seq(owner, session_id)
+        st.session_state.history_start = recent[0][0] if recent else st.session_state.stored_count
+
+    st.query_params["session"] = st.session_state.session_id
+
+def persist_messages(messages: List[Dict]) -> None:
+    """
+    Queue new messages of the current conversation for storage.
 
-    # Initialize ollama manager
-    if 'ollama' not in st.session_state:
-        st.session_state.ollama = None
+    Args:
+        messages (List[Dict]): Messages appended to the conversation
+    """
+    store = get_conversation_store()
+    if store is None:
+        return
 
-    if 'vllm' not in st.session_state:
-        st.session_state.vllm = None
+    store.append(get_user_key(), st.session_state.session_id, st.session_state.stored_count, messages)
+    st.session_state.stored_count += len(messages)
 
-def initialize_ollama():
-    try:
-        # Create a new instance of the ollama wrapper class
-        st.session_state.ollama = OllamaManager(
-            host=config["ollama"]["host"],
-            model=config["ollama"]["chat_model"],
-            options=dict(config["ollama"]["options"])
+def get_primary_backend_kind() -> str:
+    """
+    Get the kind of backend selected in config.yaml.
+
+    Returns:
+        str: "ollama" or "vllm"
+    """
+    return "ollama" if config["ollama"]["enabled"] else "vllm"
+
+def get_chat_model() -> str:
+    """
+    Get the chat model of the backend selected in config.yaml.
+
+    Returns:
+        str: Model name
+    """
+    return get_router().primary.model_for("chat")
+
+def summarize_messages(messages: List[Dict]) -> str:
+    """
+    Summarize older chat turns with the configured summary model.
+
+    vLLM routes serve a single model each, so there the route's chat model writes the summary.
+
+    Args:
+        messages (List[Dict]): Transcript of the turns to fold into the summary
+
+    Returns:
+        str: Summary text
+    """
+    messages = [{"role": "system", "content": system_prompts.summary_prompt}] + messages
+    response = get_client_pool().runtime().run(get_router().chat(messages, role="summary"))
+
+    return response.content
+
+def get_history_messages() -> List[Dict]:
+    """
+    Get the chat history to send to the model, compacted to the model's token budget.
+
+    Returns:
+        List[Dict]: Messages with role and content
+    """
+    messages = [{"role": message["role"], "content": message["content"]} for message in st.session_state.messages]
+
+    history_config = config.get("history", {})
+    if not history_config.get("enabled", False):
+        return messages
+
+    history_manager = HistoryManager(
+        budget_tokens=history_config.get("budgets", {}).get(get_chat_model(), history_config.get("default_budget", 4000)),
+        summarize=summarize_messages,
+        keep_recent=history_config.get("keep_recent", 6),
+        chars_per_token=history_config.get("chars_per_token", 4),
+    )
+
+    return history_manager.compact(messages, st.session_state.history_summary)
+
+def build_chat_messages(prompt: str) -> List[Dict]:
+    """
+    Build the request for a turn: the system prompt, the earlier turns, then the prompt.
+
+    Args:
+        prompt (str): User prompt
+
+    Returns:
+        List[Dict]: Messages to send to the model
+    """
+    history = get_history_messages()
+    # main adds the prompt to the chat history before asking the model
+    if history and history[-1]["role"] == "user" and history[-1]["content"] == prompt:
+        history = history[:-1]
+
+    return chat_messages(get_system_prompt(prompt), history, prompt)
+
+def is_tools_enabled() -> bool:
+    """
+    Check whether the model may call the toolbox tools.
+
+    Returns:
+        bool: True if tools are offered to the model
+    """
+    return config.get("tools", {}).get("enabled", False)
+
+def is_mcp_enabled() -> bool:
+    """
+    Check whether tools are called through the MCP servers in mcp.servers instead of the toolbox SDK.
+
+    Returns:
+        bool: True if the MCP session pool serves the tools
+    """
+    return config.get("mcp", {}).get("enabled", False)
+
+def is_result_shaping_enabled() -> bool:
+    """
+    Check whether tool results are compacted and paged before they reach the model.
+
+    Returns:
+        bool: True if tool_results.enabled is set
+    """
+    return config.get("tool_results", {}).get("enabled", False)
+
+def get_tools() -> List[Dict]:
+    """
+    Get the tool definitions offered to the model.
+
+    Returns:
+        List[Dict]: The merged catalog of the MCP servers with mcp.enabled, tools.json otherwise,
+        and the tool for the next page of a cut off result with tool_results.enabled
+    """
+    tools = get_mcp_pool().tools() if is_mcp_enabled() else get_client_pool().tools()
+    if is_result_shaping_enabled():
+        tools = tools + [get_result_shaper().tool_definition()]
+
+    return tools
+
+def chat_step(messages: List[Dict], allow_tools: bool, stream: bool = True, route: Optional[TurnRoute] = None,
+              deadline: Optional[float] = None):
+    """
+    Call the routed backend once as part of the tool-calling loop.
+
+    A chat model step that produces neither text nor tool calls is retried on
+    the agent model when the turn's route allows it.
+
+    Args:
+        messages (List[Dict]): Conversation to send
+        allow_tools (bool): Whether to offer the tools to the model
+        stream (bool): Whether to stream the response
+        route (Optional[TurnRoute]): Model role of the turn; the chat model when omitted
+        deadline (Optional[float]): time.monotonic() value after which the request is cancelled
+
+    Returns:
+        Generator yielding text chunks and returning the assistant message and the requested tool calls
+    """
+    tools = get_tools() if allow_tools and is_tools_enabled() else None
+    role = route.role if route else CHAT
+
+    assistant_message, tool_calls = yield from router_step(get_router(), get_client_pool().runtime(), messages,
+                                                           tools=tools, role=role, stream=stream,
+                                                           deadline=deadline)
+    if route and route.can_escalate and not tool_calls and not assistant_message.get("content", "").strip():
+        route.escalate("empty_answer")
+        return (yield from router_step(get_router(), get_client_pool().runtime(), messages,
+                                       tools=tools, role=route.role, stream=stream, deadline=deadline))
+
+    return assistant_message, tool_calls
+
+def run_chat_turn(messages: List[Dict], stream: bool, tool_log: Optional[List[str]] = None,
+                  route: Optional[TurnRoute] = None) -> Iterator[str]:
+    """
+    Run one chat turn through the tool-calling loop, or the ReAct agent with tools.mode react.
+
+    Args:
+        messages (List[Dict]): Conversation to send
+        stream (bool): Whether to stream the model output
+        tool_log (Optional[List[str]]): Receives the name of every tool called during the turn
+        route (Optional[TurnRoute]): Model role of the turn
+
+    Returns:
+        Iterator[str]: Text produced by the model
+    """
+    tools_config = config.get("tools", {})
+    # Every model call and step of the turn is bounded, so it cannot outlive its scheduler lease
+    deadline = time.monotonic() + config.get("scheduler", {}).get("request_timeout", 180)
+
+    def dispatch(tool_name: str, tool_params: Dict) -> str:
+        if tool_log is not None:
+            tool_log.append(tool_name)
+        try:
+            return use_toolbox_tool(tool_name, tool_params)
+        except Exception:
+            # A failed tool call is often a badly planned one; let the agent model take over
+            if route is not None:
+                route.escalate("tool_error")
+            raise
+
+    def complete(conversation: List[Dict]) -> Iterator[str]:
+        # Tools are described in the ReAct prompt instead of being offered natively
+        return router_step(get_router(), get_client_pool().runtime(), conversation,
+                           role=route.role if route else CHAT, stream=stream, deadline=deadline)
+
+    if is_tools_enabled() and tools_config.get("mode", "native") == "react":
+        agent = ReActAgent(
+            complete=complete,
+            tools=get_tools(),
+            dispatch=dispatch,
+            max_steps=tools_config.get("react_max_steps", 10),
+            max_workers=tools_config.get("max_workers", 4),
+        )
+        turn = agent.run(messages, deadline)
+    else:
+        turn = run_tool_loop(
+            step=functools.partial(chat_step, stream=stream, route=route, deadline=deadline),
+            messages=messages,
+            dispatch=dispatch,
+            tool_message=tool_message,
+            max_steps=tools_config.get("max_steps", 5),
+            max_workers=tools_config.get("max_workers", 4),
+            deadline=deadline,
         )
 
-        return True
+    # Cut off turns that hold their backend slot for too long
+    return until_deadline(turn, deadline, TRUNCATED_NOTICE)
 
-    except Exception as e:
-        # Display user-friendly error message in the Streamlit interface
-        st.error(f"Failed to initialize Ollama: {str(e)}")
-        return False
+def acquire_backend_slot(status) -> Optional[Ticket]:
+    """
+    Queue the turn for a backend slot, showing its place in the queue until it may run.
+
+    Args:
+        status: Streamlit placeholder for the queue position
+
+    Returns:
+        Optional[Ticket]: Admitted turn to release once answered, or None if the scheduler is disabled
 
-def get_ollama_response(prompt: str) -> str:
+    Raises:
+        SchedulerError: If the queue is full or the turn waited too long
+    """
+    scheduler = get_scheduler()
+    if scheduler is None:
+        return None
+
+    ticket = scheduler.submit(get_user_key())
     try:
-        messages = []
+        # Poll so the position stays current; a rerun (Stop, new input) interrupts the wait
+        while not scheduler.wait(ticket, timeout=0.5):
+            status.info(f"⏳ Many people are asking right now. You are number {scheduler.position(ticket)} in the queue.")
+    except BaseException:
+        scheduler.release(ticket)
+        raise
 
-        for message in st.session_state.messages:
-            messages.append({"role": message["role"], "content": message["content"]})
+    status.empty()
+    return ticket
 
-        messages.append({"role": "user", "content": prompt})
+def get_response(prompt: str, tool_log: Optional[List[str]] = None, route: Optional[TurnRoute] = None) -> str:
+    """
+    Get a complete response from the routed backend.
 
-        response = st.session_state.ollama.chat(messages)
+    Args:
+        prompt (str): User prompt
+        tool_log (Optional[List[str]]): Receives the name of every tool called during the turn
+        route (Optional[TurnRoute]): Model role of the turn
 
-        return response.message.content
+    Returns:
+        str: Model response
+    """
+    try:
+        messages = build_chat_messages(prompt)
+
+        return "".join(run_chat_turn(messages, stream=False, tool_log=tool_log, route=route))
     except Exception as e:
         # Return the error message
         return f"❌ Error: {str(e)}"
 
-def initialize_vllm():
-    try:
-        openai_api_key = config["vllm_config"]["api_key"]
-        schema = "https://" if config["vllm_config"]["secure"] else "http://"
-        openai_api_base = f"{schema}{config['vllm_config']['chat_model']}-{config['vllm_config']['namespace']}.{config['vllm_config']['base_url']}"
-
-        client = OpenAI(api_key=openai_api_key, base_url=openai_api_base)
-        st.session_state.vllm = client
+def stream_response(prompt: str, tool_log: Optional[List[str]] = None,
+                    route: Optional[TurnRoute] = None) -> Iterator[str]:
+    """
+    Stream a response from the routed backend chunk by chunk.
 
-        return True
-    except Exception as e:
-        st.error(f"Failed to initialize vLLM: {str(e)}")
-        return False
+    Args:
+        prompt (str): User prompt
+        tool_log (Optional[List[str]]): Receives the name of every tool called during the turn
+        route (Optional[TurnRoute]): Model role of the turn
 
-def get_vllm_response(prompt: str) -> str:
+    Returns:
+        Iterator[str]: Incremental pieces of the model response
+    """
     try:
-        messages = []
+        messages = build_chat_messages(prompt)
 
-        for message in st.session_state.messages:
-            messages.append({"role": message["role"], "content": message["content"]})
+        yield from run_chat_turn(messages, stream=True, tool_log=tool_log, route=route)
+    except Exception as e:
+        # Yield the error message so it lands in the chat transcript
+        yield f"❌ Error: {str(e)}"
 
-        messages.append({"role": "user", "content": prompt})
+def is_streaming_enabled() -> bool:
+    """
+    Check whether the active backend is configured to stream responses.
 
-        response = st.session_state.vllm.chat.completions.create(
-            model=config["vllm_config"]["chat_model"],
-            messages=messages
-        )
+    Returns:
+        bool: True if responses should be streamed token by token
+    """
+    if get_primary_backend_kind() == "ollama":
+        return config["ollama"].get("stream", True)
 
-        return response.choices[0].message.content
-    except Exception as e:
-        # Return the error message
-        return f"❌ Error: {str(e)}"
+    return config["vllm_config"].get("stream", True)
 
 def use_toolbox_tool(tool_name: str, tool_params: Dict) -> str:
-    toolbox = ToolboxSyncClient("http://localhost:5000")
-    tool = toolbox.load_tool(tool_name)
-    result = tool(**tool_params)
+    """
+    Execute a genai-toolbox tool, over MCP with mcp.enabled.
+
+    Args:
+        tool_name (str): Name of the tool in tools.yaml
+        tool_params (Dict): Tool parameters
+
+    Returns:
+        str: Tool result, compacted with tool_results.enabled
+    """
+    if is_result_shaping_enabled() and tool_name == MORE_RESULTS_TOOL:
+        return get_result_shaper().more(tool_params.get("handle", ""))
+
+    result = get_tool_cache().get_or_call(
+        tool_name,
+        tool_params,
+        lambda: (get_mcp_pool() if is_mcp_enabled() else get_toolbox_manager()).call(tool_name, tool_params)
+    )
+    if is_result_shaping_enabled():
+        return get_result_shaper().shape(tool_name, result)
+
     return result
 
 
 # Main application
+def load_older_messages() -> None:
+    """Widen the rendered history window by one page, fetching persisted messages that are not loaded yet"""
+    page_size = config.get("chat_display", {}).get("page_size", 20)
+    st.session_state.visible_messages += page_size
+
+    loaded = len(st.session_state.older_messages) + len(st.session_state.messages)
+    missing = st.session_state.visible_messages - loaded
+    store = get_conversation_store()
+    if store is None or missing <= 0 or st.session_state.history_start <= 0:
+        return
+
+    try:
+        older = store.load(get_user_key(), st.session_state.session_id, limit=missing,
+                           before_seq=st.session_state.history_start)
+    except Exception as e:
+        st.error(f"Failed to load older messages: {str(e)}")
+        return
+
+    if older:
+        st.session_state.older_messages = [message for _, message in older] + st.session_state.older_messages
+        st.session_state.history_start = older[0][0]
+    else:
+        st.session_state.history_start = 0
+
+@st.fragment
+def render_history() -> None:
+    """
+    Render the most recent window of the conversation.
+
+    Older messages are only sent to the browser on request, and on a resumed
+    conversation only loaded from the conversation store on request. Runs as a
+    fragment, so loading older messages reruns this function instead of the whole app.
+    Fragment reruns reuse the arguments of the last full run, so the loaded
+    conversation is read from the session state on every run.
+    """
+    display_config = config.get("chat_display", {})
+    messages = st.session_state.older_messages + st.session_state.messages
+
+    visible = st.session_state.setdefault("visible_messages", display_config.get("page_size", 20))
+    start = max(0, len(messages) - visible) if display_config.get("paginate", True) else 0
+
+    # Persisted messages older than the loaded ones count as hidden too
+    hidden = start + st.session_state.get("history_start", 0)
+    if hidden:
+        st.button(f"Load older messages ({hidden} hidden)", on_click=load_older_messages)
+
+    for message in messages[start:]:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+
 def main():
     user_info = {}
 
+    start_metrics_server()
+    # Process-wide and started once; server.py already started them in the container
+    start_model_warmer(config)
+    start_prefix_cache_monitor(config)
+
     # Initialize session state
     if "authenticated" not in st.session_state:
         st.session_state["authenticated"] = False
@@ -270,6 +1039,8 @@ def main():
     if not config["credentials"]["enabled"]:
         st.session_state["authenticated"] = True
     else:
+        get_authorization_index()
+
         # Check authentication
         authenticated, user_info = handle_oauth()
 
@@ -278,13 +1049,11 @@ def main():
         st.title("OpenShift Partner Labs")
         st.write("Please log in with your Google account to continue.")
 
-        # Create OAuth flow
-        flow = create_oauth_flow()
-        auth_url, _ = flow.authorization_url(
-            access_type="offline",
-            include_granted_scopes="true",
-            prompt="consent"
-        )
+        # Expire the login cookie after a logout
+        if st.session_state.pop("clear_cookie", False):
+            write_session_cookie(None)
+
+        auth_url = get_login_url()
 
         # Login button
         st.markdown(f"<a href='{auth_url}' target='_self'><button style='background-color:#4285F4;color:white;border:none;padding:10px 20px;border-radius:4px;cursor:pointer;'>Login with Google</button></a>", unsafe_allow_html=True)
@@ -292,14 +1061,16 @@ def main():
     # If authenticated, show the main content
     else:
         # Initialize all session state variables
-        init_session_state()
+        init_session_state((user_info or {}).get("email", ANONYMOUS))
 
         # === SIDEBAR CONFIGURATION ===
         with st.sidebar:
-            if not st.session_state.ollama and config["ollama"]["enabled"]:
-                initialize_ollama()
-            else:
-                initialize_vllm()
+            try:
+                router = get_router()
+            except Exception as e:
+                # Display user-friendly error message in the Streamlit interface
+                st.error(f"Failed to initialize the model backends: {str(e)}")
+                router = None
 
             st.subheader(f"Welcome, {user_info.get('name', 'User')}!")
 
@@ -310,37 +1081,46 @@ def main():
             # Display chat statistics
             st.divider()
             st.subheader("📊 Chat Statistics")
-            st.metric("Total Messages", len(st.session_state.messages))
+            # Updated in place once the current turn completes
+            message_count = st.empty()
+            message_count.metric("Total Messages", len(st.session_state.messages))
+            st.metric("Tool Cache Hit Rate", f"{get_tool_cache().hit_rate():.0%}")
 
             # Model and session information
             st.divider()
 
-            if not config["ollama"]["enabled"]:
-                st.caption(f"Model: {config['vllm_config']['chat_model']}")
-            else:
-                st.caption(f"Model: {config['ollama']['chat_model']}")
+            if router:
+                st.caption(f"Model: {get_chat_model()}")
             st.caption(f"Session started: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
 
-            # Connection status indicator
-            if st.session_state.ollama or st.session_state.vllm:
-                st.caption("🟢 Connected")
-            else:
+            # Connection status indicator, from the last readiness probe of the model endpoints;
+            # the page does not wait for a probe
+            models_health = get_health_checker(config).cached("models")
+            if not router:
                 st.caption("🔴 Disconnected")
+            elif models_health is not None and not models_health.ok:
+                st.caption(f"🔴 Model unavailable: {models_health.detail}")
+            elif not router.is_available():
+                st.caption(f"🔴 Backend unavailable: {get_client_pool().health(router.primary.name).last_error}")
+            else:
+                st.caption(f"🟢 Connected ({len(router.backends)} endpoint(s))")
 
             # Logout button
             if st.button("Logout"):
                 st.session_state["authenticated"] = False
                 st.session_state["user_info"] = None
+                st.session_state["clear_cookie"] = True
                 st.rerun()
 
         # Main app content
         st.header("OpenShift Partner Labs")
 
         # === MAIN CHAT INTERFACE ===
-        # Display all previous chat messages
-        for message in st.session_state.messages:
-            with st.chat_message(message["role"]):
-                st.markdown(message["content"])
+        # Display the most recent previous chat messages
+        render_history()
+
+        # With AIUI_PROFILE_STARTUP set, print the import and initializer costs of the first page
+        startup_timing.report_once()
 
         # Chat input handling
         # The walrus operator := captures the input while checking if it exists
@@ -352,23 +1132,71 @@ def main():
             # Add the user message to state
             st.session_state.messages.append({"role": "user", "content": user_prompt})
 
-            # TODO: get_system_prompt should send the user_prompt to a LLM with the intent
-            #  of selecting a system prompt based on the user prompt.
-            system_prompt = get_system_prompt(user_prompt)
-
-            # Get a response from the model
-            with st.spinner("Thinking..."):
-                if config["ollama"]["enabled"]:
-                    response = get_ollama_response(system_prompt + user_prompt + "\n</user>")
+            # Serve near-identical questions from the semantic cache. Its answers are shared by all
+            # conversations, so only the opening question of a conversation, which needs no context, uses it.
+            response = None
+            context_free = len(st.session_state.messages) == 1 and st.session_state.history_start == 0
+            if is_semantic_cache_enabled() and context_free:
+                try:
+                    response = get_semantic_cache().lookup(user_prompt)
+                except Exception as e:
+                    print(f"Semantic cache lookup failed: {str(e)}")
+
+                if response is not None:
+                    with st.chat_message("assistant"):
+                        st.markdown(response)
+
+            # Get a response from the model, once the scheduler admits the turn
+            cached = response is not None
+            tool_log = []
+            if not cached:
+                status = st.empty()
+                stop = st.empty()
+                try:
+                    ticket = acquire_backend_slot(status)
+                except SchedulerError as e:
+                    status.empty()
+                    response = f"❌ Error: {str(e)}"
+                    with st.chat_message("assistant"):
+                        st.markdown(response)
                 else:
-                    response = get_vllm_response(system_prompt + user_prompt + "\n</user>")
-
-            # Add the model response to state
+                    # Clicking Stop reruns the script, which interrupts the turn; the finally block frees its slot
+                    stop.button("⏹ Stop", key="stop_generation")
+                    route = route_chat_turn(user_prompt)
+                    try:
+                        if is_streaming_enabled():
+                            # Render chunks as they arrive; write_stream returns the full text
+                            with st.chat_message("assistant"):
+                                response = st.write_stream(stream_response(user_prompt, tool_log, route))
+                        else:
+                            with st.spinner("Thinking..."):
+                                response = get_response(user_prompt, tool_log, route)
+                            with st.chat_message("assistant"):
+                                st.markdown(response)
+                        # Short follow-ups stay on the model that answered this turn
+                        st.session_state.last_role = route.role if route else CHAT
+                        if route:
+                            route.record()
+                    finally:
+                        if ticket is not None:
+                            get_scheduler().release(ticket)
+                        stop.empty()
+
+            # Tool results may change, so by default only answers that did not use tools are reused
+            skip_tool_turns = config.get("semantic_cache", {}).get("skip_tool_turns", True)
+            if not cached and is_semantic_cache_enabled() and context_free and response \
+                    and not response.startswith("❌ Error") \
+                    and not response.endswith(TRUNCATED_NOTICE) and not (tool_log and skip_tool_turns):
+                try:
+                    get_semantic_cache().store(user_prompt, response)
+                except Exception as e:
+                    print(f"Semantic cache store failed: {str(e)}")
+
+            # Add the model response to state. Both messages are already on screen,
+            # so there is no need to rerun the script to show them.
             st.session_state.messages.append({"role": "assistant", "content": response})
-            print(response)
-
-            # Reload streamlit
-            st.rerun()
+            persist_messages(st.session_state.messages[-2:])
+            message_count.metric("Total Messages", len(st.session_state.messages))
 
 
 if __name__ == "__main__":
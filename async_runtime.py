@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """A chat turn ran past its deadline"""
+
+
+def check_deadline(deadline: Optional[float]) -> Optional[float]:
+    """
+    Get the seconds left until a monotonic deadline.
+
+    Args:
+        deadline (Optional[float]): time.monotonic() value, or None for no deadline
+
+    Returns:
+        Optional[float]: Seconds left, or None without a deadline
+
+    Raises:
+        DeadlineExceeded: If the deadline has passed
+    """
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded("The turn ran past its deadline")
+    return remaining
+
+
+class AsyncRuntime:
+    """Shared asyncio event loop running in a daemon thread, with helpers to drive it from sync code"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="async-backends", daemon=True)
+        self._thread.start()
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the shared loop and wait for its result.
+
+        Args:
+            coro (Coroutine): Coroutine to run
+            timeout (Optional[float]): Seconds to wait before cancelling the coroutine
+
+        Returns:
+            Any: Result of the coroutine
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def iterate(self, iterable: AsyncIterator, deadline: Optional[float] = None) -> Iterator:
+        """
+        Consume an async iterator on the shared loop as a regular iterator.
+
+        The async iterator is closed if the caller stops iterating early.
+
+        Args:
+            iterable (AsyncIterator): Async iterator to consume
+            deadline (Optional[float]): time.monotonic() value by which every item must have arrived
+
+        Returns:
+            Iterator: Items of the async iterator
+
+        Raises:
+            DeadlineExceeded: If the deadline passes, also while waiting for an item
+        """
+        try:
+            while True:
+                try:
+                    yield self.run(iterable.__anext__(), check_deadline(deadline))
+                except StopAsyncIteration:
+                    return
+                except TimeoutError:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise DeadlineExceeded("The turn ran past its deadline") from None
+                    raise
+        finally:
+            aclose = getattr(iterable, "aclose", None)
+            if aclose is not None:
+                self.run(aclose())
+
+    def close(self) -> None:
+        """Stop the loop and wait for its thread to exit"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
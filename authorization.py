@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from settings import ConfigManager
+
+
+def normalize_email(email: str) -> str:
+    """Normalize an email address for lookups"""
+    return email.strip().lower()
+
+
+class AuthorizationIndex:
+    """
+    Precomputed lookup tables for the preauthorized users.
+
+    Emails are matched in a case-insensitive hash set. Domains match exactly
+    ("redhat.com" authorizes "user@redhat.com"), while entries starting with a
+    dot also match subdomains (".redhat.com" authorizes "user@emea.redhat.com").
+    Lookups cost one set probe per domain label, whatever the size of the lists.
+    """
+
+    def __init__(self, emails: Iterable[str], domains: Iterable[str], allow_all: bool = False):
+        self.emails = frozenset(normalize_email(email) for email in emails if email and email.strip())
+
+        domains = [domain.strip().lower().lstrip("@") for domain in domains if domain and domain.strip()]
+        self.domains = frozenset(domain for domain in domains if not domain.startswith("."))
+        self.suffixes = frozenset(domain for domain in domains if domain.startswith("."))
+
+        # Only set when nothing restricts access at all; never derived from the loaded lists,
+        # so an empty or half-written email file does not let everyone in
+        self.allow_all = allow_all
+
+    @classmethod
+    def from_config(cls, preauthorized: Dict, base_dir: str = ".",
+                    allow_empty_file: bool = True) -> "AuthorizationIndex":
+        """
+        Build the index from the preauthorized section of config.yaml.
+
+        Every user is authorized only when the section lists no emails, no
+        emails_file and no domains.
+
+        Args:
+            preauthorized (Dict): preauthorized section (emails, emails_file, domains)
+            base_dir (str): Directory relative emails_file paths are resolved against
+            allow_empty_file (bool): Whether an emails_file without emails is accepted
+
+        Returns:
+            AuthorizationIndex: The index
+
+        Raises:
+            OSError: If emails_file cannot be read
+            ValueError: If emails_file lists no emails and allow_empty_file is False
+        """
+        emails = list(preauthorized.get("emails") or [])
+        domains = list(preauthorized.get("domains", ["redhat.com"]) or [])
+
+        emails_file = preauthorized.get("emails_file")
+        if emails_file:
+            with open(os.path.join(base_dir, emails_file), "r") as f:
+                file_emails = [line for line in f.read().splitlines()
+                               if line.strip() and not line.lstrip().startswith("#")]
+            if not file_emails and not allow_empty_file:
+                raise ValueError(f"{emails_file} lists no emails")
+            emails += file_emails
+
+        return cls(emails, domains, allow_all=not emails and not emails_file and not domains)
+
+    def is_authorized(self, email: str) -> bool:
+        """
+        Check if the user email is preauthorized or has an authorized domain.
+
+        Args:
+            email (str): User email
+
+        Returns:
+            bool: True if authorized, False otherwise
+        """
+        email = normalize_email(email or "")
+        if self.allow_all or email in self.emails:
+            return True
+
+        _, _, domain = email.rpartition("@")
+        if not domain:
+            return False
+        if domain in self.domains:
+            return True
+
+        # Walk up the domain labels: emea.redhat.com -> .emea.redhat.com, .redhat.com, .com
+        labels = domain.split(".")
+        return any("." + ".".join(labels[index:]) in self.suffixes for index in range(len(labels)))
+
+    def __len__(self) -> int:
+        return len(self.emails)
+
+
+class ReloadingAuthorizationIndex:
+    """Serves an AuthorizationIndex and rebuilds it when the configuration or the email list file changes"""
+
+    def __init__(self, config_manager: ConfigManager, check_interval: float = 5.0):
+        self.config_manager = config_manager
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._index: Optional[AuthorizationIndex] = None
+        self._signature: Tuple = ()
+        self._checked_at = 0.0
+
+    def index(self) -> AuthorizationIndex:
+        """Return the current index, checking the sources for changes at most every check_interval seconds"""
+        now = time.monotonic()
+        if self._index is not None and now - self._checked_at < self.check_interval:
+            return self._index
+
+        with self._lock:
+            if self._index is None or now - self._checked_at >= self.check_interval:
+                self._checked_at = now
+                self._reload_if_changed()
+            return self._index
+
+    def is_authorized(self, email: str) -> bool:
+        """Check an email against the current index"""
+        return self.index().is_authorized(email)
+
+    def _reload_if_changed(self) -> None:
+        preauthorized = self.config_manager.get().get("preauthorized", {})
+        base_dir = os.path.dirname(os.path.abspath(self.config_manager.path))
+        emails_file = preauthorized.get("emails_file")
+        emails_path = os.path.join(base_dir, emails_file) if emails_file else None
+
+        signature = (self.config_manager.version, emails_path, self._stat(emails_path))
+        if self._index is not None and signature == self._signature:
+            return
+
+        try:
+            # Once lists are served, an empty email file is taken for one being written
+            index = AuthorizationIndex.from_config(preauthorized, base_dir, allow_empty_file=self._index is None)
+        except Exception as e:
+            if self._index is None:
+                raise
+            # Keep the previous lists, e.g. while the email file is half written
+            print(f"Failed to reload the authorization lists: {str(e)}")
+            return
+
+        self._signature = signature
+        self._index = index
+        print(f"Loaded authorization index: {len(index)} emails, {len(index.domains) + len(index.suffixes)} domains")
+
+    @staticmethod
+    def _stat(path: Optional[str]) -> Tuple:
+        if path is None:
+            return None, None
+        try:
+            # Resolve symlinks: ConfigMap volumes swap a ..data symlink on update
+            stat = os.stat(os.path.realpath(path))
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None, None
@@ -0,0 +1,177 @@
+import asyncio
+import json
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from async_runtime import AsyncRuntime
+
+# The client libraries are imported on first use, so a deployment only loads the backend it uses
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+    from ollama_manager import OllamaManager
+
+
+def vllm_base_url(config: Dict) -> str:
+    """
+    Build the OpenAI-compatible base URL for the configured vLLM route.
+
+    Args:
+        config (Dict): Configuration dictionary
+
+    Returns:
+        str: Base URL of the vLLM endpoint
+    """
+    vllm_config = config["vllm_config"]
+    schema = "https://" if vllm_config["secure"] else "http://"
+    return f"{schema}{vllm_config['chat_model']}-{vllm_config['namespace']}.{vllm_config['base_url']}"
+
+
+@dataclass
+class BackendHealth:
+    """Rolling health state of a single backend"""
+    healthy: bool = True
+    consecutive_failures: int = 0
+    last_success: Optional[float] = None
+    last_failure: Optional[float] = None
+    last_error: Optional[str] = None
+
+
+class ClientPool:
+    """Process-wide, thread-safe pool of LLM clients shared by every Streamlit session"""
+
+    def __init__(self, config: Dict):
+        self.config = config
+
+        pool_config = config.get("client_pool", {})
+        self.max_connections = pool_config.get("max_connections", 20)
+        self.max_keepalive_connections = pool_config.get("max_keepalive_connections", 10)
+        self.keepalive_expiry = pool_config.get("keepalive_expiry", 30)
+        self.timeout = pool_config.get("timeout", 120)
+        self.max_concurrency = pool_config.get("max_concurrency", 8)
+        self.acquire_timeout = pool_config.get("acquire_timeout", 60)
+        self.failure_threshold = pool_config.get("failure_threshold", 3)
+
+        self._lock = threading.RLock()
+        self._clients: Dict[str, object] = {}
+        self._tools: Optional[List[Dict]] = None
+        self._runtime: Optional[AsyncRuntime] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._health: Dict[str, BackendHealth] = {}
+
+    def _limits(self) -> httpx.Limits:
+        """Connection limits shared by every HTTP client in the pool"""
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def runtime(self) -> AsyncRuntime:
+        """Return the event loop shared by every async client, starting it on first use"""
+        with self._lock:
+            if self._runtime is None:
+                self._runtime = AsyncRuntime()
+            return self._runtime
+
+    def tools(self) -> List[Dict]:
+        """Return the tool definitions from tools.json, read once per process"""
+        with self._lock:
+            if self._tools is None:
+                with open("tools.json", "r") as f:
+                    self._tools = json.load(f)
+            return self._tools
+
+    def ollama(self) -> "OllamaManager":
+        """Return the shared Ollama manager for the configured host, creating it on first use"""
+        from ollama_manager import OllamaManager
+
+        ollama_config = self.config["ollama"]
+        key = f"ollama:{ollama_config['host']}"
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = OllamaManager(
+                    host=ollama_config["host"],
+                    model=ollama_config["chat_model"],
+                    options=dict(ollama_config["options"]),
+                    tools=self.tools(),
+                    limits=self._limits(),
+                    timeout=self.timeout,
+                )
+            # Shared by every session; model and options from config.yaml reloads are passed per request
+            return self._clients[key]
+
+    def vllm(self, base_url: Optional[str] = None) -> "AsyncOpenAI":
+        """Return the shared async OpenAI client for a vLLM endpoint, creating it on first use"""
+        from openai import AsyncOpenAI
+
+        base_url = base_url or vllm_base_url(self.config)
+        with self._lock:
+            if base_url not in self._clients:
+                self._clients[base_url] = AsyncOpenAI(
+                    api_key=self.config["vllm_config"]["api_key"],
+                    base_url=base_url,
+                    http_client=httpx.AsyncClient(limits=self._limits(), timeout=self.timeout),
+                )
+            return self._clients[base_url]
+
+    def _semaphore(self, backend: str) -> asyncio.Semaphore:
+        with self._lock:
+            if backend not in self._semaphores:
+                self._semaphores[backend] = asyncio.Semaphore(self.max_concurrency)
+            return self._semaphores[backend]
+
+    @asynccontextmanager
+    async def acquire(self, backend: str) -> AsyncIterator[None]:
+        """
+        Reserve one of the bounded request slots of a backend and record the outcome.
+
+        Must be used on the shared runtime loop.
+
+        Args:
+            backend (str): Backend name, "ollama" or the base URL of a vLLM endpoint
+
+        Raises:
+            TimeoutError: If no slot frees up within acquire_timeout seconds
+        """
+        semaphore = self._semaphore(backend)
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Timed out waiting for a free {backend} request slot")
+
+        try:
+            yield
+        except Exception as e:
+            self.record_failure(backend, e)
+            raise
+        else:
+            self.record_success(backend)
+        finally:
+            semaphore.release()
+
+    def health(self, backend: str) -> BackendHealth:
+        """Return the current health state of a backend"""
+        with self._lock:
+            return self._health.setdefault(backend, BackendHealth())
+
+    def record_success(self, backend: str) -> None:
+        with self._lock:
+            state = self._health.setdefault(backend, BackendHealth())
+            state.healthy = True
+            state.consecutive_failures = 0
+            state.last_success = time.time()
+
+    def record_failure(self, backend: str, error: Exception) -> None:
+        with self._lock:
+            state = self._health.setdefault(backend, BackendHealth())
+            state.consecutive_failures += 1
+            state.last_failure = time.time()
+            state.last_error = str(error)
+            if state.consecutive_failures >= self.failure_threshold:
+                state.healthy = False
@@ -0,0 +1,320 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class StoredMessage:
+    """A message queued for writing, with its position in the conversation"""
+    user_email: str
+    session_id: str
+    seq: int
+    message: Dict
+    created_at: datetime
+
+
+def compress_message(message: Dict, level: int = 6) -> bytes:
+    """Serialize and compress a chat message for storage"""
+    return zlib.compress(json.dumps(message, separators=(",", ":")).encode("utf-8"), level)
+
+
+def decompress_message(body: bytes) -> Dict:
+    """Inverse of compress_message"""
+    return json.loads(zlib.decompress(body).decode("utf-8"))
+
+
+class ConversationStore(ABC):
+    """
+    Persistent chat history keyed by user email and session id.
+
+    Writes are queued and flushed in batches by a background thread, so the chat
+    never waits on the database. Reads go straight to the database and return
+    the newest messages first, so a resumed session only loads what it shows.
+    """
+
+    def __init__(self, batch_size: int = 20, flush_interval: float = 2.0, compression_level: int = 6):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compression_level = compression_level
+
+        self._queue: "queue.Queue[Optional[StoredMessage]]" = queue.Queue()
+        self._idle = threading.Condition()
+        self._pending = 0
+        self._writer = threading.Thread(target=self._write_loop, name="conversation-store", daemon=True)
+        self._writer.start()
+
+    def append(self, user_email: str, session_id: str, start_seq: int, messages: List[Dict]) -> None:
+        """
+        Queue messages for writing.
+
+        Args:
+            user_email (str): Owner of the conversation
+            session_id (str): Conversation id
+            start_seq (int): Position of the first message in the conversation
+            messages (List[Dict]): Messages to store
+        """
+        now = datetime.now()
+        with self._idle:
+            self._pending += len(messages)
+        for offset, message in enumerate(messages):
+            self._queue.put(StoredMessage(user_email, session_id, start_seq + offset, message, now))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued message is written; False if the timeout expired first"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self) -> None:
+        """Write the remaining messages and stop the writer"""
+        self._queue.put(None)
+        self._writer.join(timeout=10)
+        self._close()
+
+    def load(self, user_email: str, session_id: str, limit: int,
+             before_seq: Optional[int] = None) -> List[Tuple[int, Dict]]:
+        """
+        Load the newest messages of a conversation, optionally older than a position.
+
+        Args:
+            user_email (str): Owner of the conversation
+            session_id (str): Conversation id
+            limit (int): Maximum number of messages
+            before_seq (Optional[int]): Only load messages before this position
+
+        Returns:
+            List[Tuple[int, Dict]]: (position, message) pairs in conversation order
+        """
+        rows = self._select(user_email, session_id, limit, before_seq)
+        return [(seq, decompress_message(body)) for seq, body in reversed(rows)]
+
+    def _write_loop(self) -> None:
+        while True:
+            batch: List[StoredMessage] = []
+            deadline = None
+            stop = False
+
+            # Collect up to batch_size messages, waiting at most flush_interval after the first one
+            while len(batch) < self.batch_size:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if batch:
+                rows = [
+                    (item.user_email, item.session_id, item.seq, item.message.get("role", ""),
+                     compress_message(item.message, self.compression_level), item.created_at)
+                    for item in batch
+                ]
+                try:
+                    self._insert(rows)
+                except Exception as e:
+                    # History is best effort; the live session still has its messages
+                    print(f"Failed to store {len(rows)} chat messages: {str(e)}")
+
+                with self._idle:
+                    self._pending -= len(batch)
+                    self._idle.notify_all()
+
+            if stop:
+                return
+
+    @abstractmethod
+    def _insert(self, rows: List[Tuple]) -> None:
+        """Insert (user_email, session_id, seq, role, body, created_at) rows, ignoring duplicates"""
+
+    @abstractmethod
+    def _select(self, user_email: str, session_id: str, limit: int,
+                before_seq: Optional[int]) -> List[Tuple[int, bytes]]:
+        """Return (seq, body) rows, newest first"""
+
+    @abstractmethod
+    def latest_session(self, user_email: str) -> Optional[str]:
+        """Return the id of the user's most recently updated conversation"""
+
+    @abstractmethod
+    def next_seq(self, user_email: str, session_id: str) -> int:
+        """Return the position after the last stored message of a conversation"""
+
+    @abstractmethod
+    def _close(self) -> None:
+        """Release the database connection"""
+
+
+class SQLiteConversationStore(ConversationStore):
+    """Conversation store in a local SQLite file, for development and single-replica setups"""
+
+    def __init__(self, path: str, **kwargs):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS chat_messages ("
+                " user_email TEXT NOT NULL, session_id TEXT NOT NULL, seq INTEGER NOT NULL,"
+                " role TEXT NOT NULL, body BLOB NOT NULL, created_at TIMESTAMP NOT NULL,"
+                " PRIMARY KEY (user_email, session_id, seq))"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS chat_messages_user_created ON chat_messages (user_email, created_at)"
+            )
+            self._db.commit()
+        super().__init__(**kwargs)
+
+    def _insert(self, rows):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO chat_messages (user_email, session_id, seq, role, body, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [row[:5] + (row[5].isoformat(sep=" "),) for row in rows],
+            )
+            self._db.commit()
+
+    def _select(self, user_email, session_id, limit, before_seq):
+        with self._lock:
+            return self._db.execute(
+                "SELECT seq, body FROM chat_messages WHERE user_email = ? AND session_id = ? AND seq < ?"
+                " ORDER BY seq DESC LIMIT ?",
+                (user_email, session_id, before_seq if before_seq is not None else 2 ** 62, limit),
+            ).fetchall()
+
+    def latest_session(self, user_email):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT session_id FROM chat_messages WHERE user_email = ? ORDER BY created_at DESC, seq DESC LIMIT 1",
+                (user_email,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def next_seq(self, user_email, session_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MAX(seq) FROM chat_messages WHERE user_email = ? AND session_id = ?",
+                (user_email, session_id),
+            ).fetchone()
+        return row[0] + 1 if row and row[0] is not None else 0
+
+    def _close(self):
+        with self._lock:
+            self._db.close()
+
+
+class MySQLConversationStore(ConversationStore):
+    """Conversation store in MySQL, shared by every replica"""
+
+    def __init__(self, host: str, port: int, database: str, user: str, password: str, **kwargs):
+        # Only needed in production, so it is not imported for SQLite setups
+        import pymysql
+
+        self._connect = lambda: pymysql.connect(
+            host=host, port=port, database=database, user=user, password=password, autocommit=True,
+        )
+        self._local = threading.local()
+        with self._cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS chat_messages ("
+                " user_email varchar(255) not null, session_id char(36) not null, seq int not null,"
+                " role varchar(16) not null, body mediumblob not null, created_at datetime(6) not null,"
+                " primary key (user_email, session_id, seq),"
+                " index chat_messages_user_created (user_email, created_at)"
+                ") collate = utf8mb4_general_ci"
+            )
+        super().__init__(**kwargs)
+
+    def _cursor(self):
+        # pymysql connections are not thread safe; keep one per thread and reconnect when dropped
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        else:
+            connection.ping(reconnect=True)
+        return connection.cursor()
+
+    def _insert(self, rows):
+        with self._cursor() as cursor:
+            cursor.executemany(
+                "INSERT IGNORE INTO chat_messages (user_email, session_id, seq, role, body, created_at)"
+                " VALUES (%s, %s, %s, %s, %s, %s)",
+                rows,
+            )
+
+    def _select(self, user_email, session_id, limit, before_seq):
+        with self._cursor() as cursor:
+            cursor.execute(
+                "SELECT seq, body FROM chat_messages WHERE user_email = %s AND session_id = %s AND seq < %s"
+                " ORDER BY seq DESC LIMIT %s",
+                (user_email, session_id, before_seq if before_seq is not None else 2 ** 31 - 1, limit),
+            )
+            return cursor.fetchall()
+
+    def latest_session(self, user_email):
+        with self._cursor() as cursor:
+            cursor.execute(
+                "SELECT session_id FROM chat_messages WHERE user_email = %s ORDER BY created_at DESC, seq DESC LIMIT 1",
+                (user_email,),
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def next_seq(self, user_email, session_id):
+        with self._cursor() as cursor:
+            cursor.execute(
+                "SELECT MAX(seq) FROM chat_messages WHERE user_email = %s AND session_id = %s",
+                (user_email, session_id),
+            )
+            row = cursor.fetchone()
+        return row[0] + 1 if row and row[0] is not None else 0
+
+    def _close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+
+
+def create_conversation_store(config: Dict) -> Optional[ConversationStore]:
+    """
+    Build the conversation store selected in config.yaml.
+
+    Args:
+        config (Dict): Configuration dictionary
+
+    Returns:
+        Optional[ConversationStore]: The store, or None if persistence is disabled
+    """
+    store_config = config.get("conversation_store", {})
+    if not store_config.get("enabled", False):
+        return None
+
+    options = {
+        "batch_size": store_config.get("batch_size", 20),
+        "flush_interval": store_config.get("flush_interval", 2.0),
+        "compression_level": store_config.get("compression_level", 6),
+    }
+
+    if store_config.get("backend", "sqlite") == "mysql":
+        mysql_config = store_config.get("mysql", {})
+        return MySQLConversationStore(
+            host=mysql_config.get("host", "127.0.0.1"),
+            port=mysql_config.get("port", 3306),
+            database=mysql_config.get("database", "openshift_partner_labs_app"),
+            user=mysql_config.get("user", ""),
+            password=os.environ.get("CONVERSATION_STORE_PASSWORD", mysql_config.get("password", "")),
+            **options,
+        )
+
+    return SQLiteConversationStore(store_config.get("sqlite_path", "conversations.db"), **options)
@@ -0,0 +1,268 @@
+import json
+import os
+import threading
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from client_pool import vllm_base_url
+
+
+@dataclass
+class CheckResult:
+    """Outcome of one dependency probe"""
+    ok: bool
+    detail: str
+    checked_at: float
+    duration: float
+
+
+def served_models(names: List[str]) -> set:
+    """Ollama reports "llama2:latest" for a model configured as "llama2"; accept both spellings"""
+    models = set(names)
+    models.update(name[:-len(":latest")] for name in names if name.endswith(":latest"))
+    return models
+
+
+def probe_models(config: Mapping, client: httpx.Client) -> Optional[str]:
+    """
+    Check that the chat model is served by at least one configured endpoint.
+
+    Ollama must also serve the agent model when one is configured. vLLM
+    replicas are interchangeable, so one replica serving the model is enough.
+
+    Returns:
+        Optional[str]: Description of the healthy endpoints
+
+    Raises:
+        RuntimeError: If no endpoint serves the configured models
+    """
+    if config["ollama"]["enabled"]:
+        ollama_config = config["ollama"]
+        response = client.get(f"{ollama_config['host'].rstrip('/')}/api/tags")
+        response.raise_for_status()
+        available = served_models([model["model"] for model in response.json().get("models", [])])
+
+        missing = [model for model in (ollama_config["chat_model"], ollama_config.get("agent_model"))
+                   if model and model not in available]
+        if missing:
+            raise RuntimeError(f"ollama does not serve {', '.join(missing)}")
+        return f"ollama serves {ollama_config['chat_model']}"
+
+    vllm_config = config["vllm_config"]
+    model = vllm_config["chat_model"]
+    errors = []
+    for base_url in [vllm_base_url(config)] + list(vllm_config.get("endpoints", [])):
+        try:
+            response = client.get(f"{base_url.rstrip('/')}/models",
+                                  headers={"Authorization": f"Bearer {vllm_config['api_key']}"})
+            response.raise_for_status()
+            if any(entry.get("id") == model for entry in response.json().get("data", [])):
+                return f"{base_url} serves {model}"
+            errors.append(f"{base_url}: {model} not served")
+        except Exception as e:
+            errors.append(f"{base_url}: {str(e)}")
+
+    raise RuntimeError("; ".join(errors))
+
+
+def probe_toolbox(config: Mapping, client: httpx.Client) -> Optional[str]:
+    """Check that genai-toolbox serves the configured toolset; None when tools are disabled"""
+    if not config.get("tools", {}).get("enabled", False):
+        return None
+
+    toolbox_config = config.get("toolbox", {})
+    url = toolbox_config.get("url", "http://localhost:5000").rstrip("/")
+    toolset = toolbox_config.get("toolset", "partner_labs")
+    response = client.get(f"{url}/api/toolset/{toolset}")
+    response.raise_for_status()
+    return f"toolset {toolset} loaded"
+
+
+def probe_database(config: Mapping, client: httpx.Client) -> Optional[str]:
+    """Check that the MySQL conversation store accepts connections; None when it is not used"""
+    store_config = config.get("conversation_store", {})
+    if not store_config.get("enabled", False) or store_config.get("backend", "sqlite") != "mysql":
+        return None
+
+    # Only needed with the MySQL store, like in the store itself
+    import pymysql
+
+    mysql_config = store_config.get("mysql", {})
+    connection = pymysql.connect(
+        host=mysql_config.get("host", "127.0.0.1"),
+        port=mysql_config.get("port", 3306),
+        database=mysql_config.get("database", "openshift_partner_labs_app"),
+        user=mysql_config.get("user", ""),
+        password=os.environ.get("CONVERSATION_STORE_PASSWORD", mysql_config.get("password", "")),
+        connect_timeout=client.timeout.connect or 3,
+        read_timeout=client.timeout.read or 3,
+    )
+    try:
+        connection.ping(reconnect=False)
+    finally:
+        connection.close()
+    return f"mysql at {mysql_config.get('host', '127.0.0.1')} reachable"
+
+
+# Dependency probes by name. A probe returns a description when healthy, None when
+# the dependency is not used by this configuration, and raises when it is down.
+PROBES: Dict[str, Callable[[Mapping, httpx.Client], Optional[str]]] = {
+    "models": probe_models,
+    "toolbox": probe_toolbox,
+    "database": probe_database,
+}
+
+
+class HealthChecker:
+    """
+    Liveness and readiness of the app, for the Kubernetes probes.
+
+    Liveness only reports that the process serves requests; a restart cannot
+    bring back a model server. Readiness probes the dependencies listed in
+    health.required and fails while any of them is down, so traffic goes to
+    replicas that can answer. Each probe result is reused for cache_ttl seconds
+    and concurrent callers share one probe, so frequent probes from several
+    sources cost one request per dependency per interval.
+    """
+
+    def __init__(self, config: Mapping):
+        # Read on every check, so health settings follow config.yaml reloads
+        self.config = config
+
+        self._started = time.time()
+        self._lock = threading.Lock()
+        self._probe_locks = {name: threading.Lock() for name in PROBES}
+        self._results: Dict[str, CheckResult] = {}
+        self._executor = ThreadPoolExecutor(max_workers=len(PROBES), thread_name_prefix="health")
+        self._client: Optional[httpx.Client] = None
+
+    def _settings(self) -> Mapping:
+        return self.config.get("health", {})
+
+    def _http_client(self) -> httpx.Client:
+        timeout = self._settings().get("timeout", 3)
+        with self._lock:
+            if self._client is None or self._client.timeout.read != timeout:
+                if self._client is not None:
+                    self._client.close()
+                self._client = httpx.Client(timeout=timeout, limits=httpx.Limits(max_connections=len(PROBES)))
+            return self._client
+
+    def check(self, name: str) -> Optional[CheckResult]:
+        """
+        Return the result of a probe, running it when the cached result has expired.
+
+        Args:
+            name (str): Probe name, a key of PROBES
+
+        Returns:
+            Optional[CheckResult]: The result, or None if the dependency is not used
+        """
+        cache_ttl = self._settings().get("cache_ttl", 10)
+        result = self._results.get(name)
+        if result is not None and time.time() - result.checked_at < cache_ttl:
+            return result
+
+        with self._probe_locks[name]:
+            # Another caller may have refreshed it while this one waited
+            result = self._results.get(name)
+            if result is not None and time.time() - result.checked_at < cache_ttl:
+                return result
+
+            started = time.monotonic()
+            try:
+                detail = PROBES[name](self.config, self._http_client())
+                ok = True
+            except Exception as e:
+                detail = f"{type(e).__name__}: {str(e)}"
+                ok = False
+
+            if detail is None:
+                self._results.pop(name, None)
+                return None
+
+            result = CheckResult(ok, detail, time.time(), time.monotonic() - started)
+            self._results[name] = result
+            if not ok:
+                print(f"Health check {name} failed: {detail}")
+            return result
+
+    def cached(self, name: str) -> Optional[CheckResult]:
+        """
+        Return the last result of a probe without waiting for it, refreshing an expired one in the background.
+
+        Args:
+            name (str): Probe name, a key of PROBES
+
+        Returns:
+            Optional[CheckResult]: The last result, or None if there is none yet or the dependency is not used
+        """
+        result = self._results.get(name)
+        if result is None or time.time() - result.checked_at >= self._settings().get("cache_ttl", 10):
+            if not self._probe_locks[name].locked():
+                self._executor.submit(self.check, name)
+        return result
+
+    def check_all(self) -> Dict[str, CheckResult]:
+        """Run every probe in parallel; dependencies that are not used are left out"""
+        futures = {name: self._executor.submit(self.check, name) for name in PROBES}
+        wait(futures.values())
+        return {name: future.result() for name, future in futures.items() if future.result() is not None}
+
+    def is_ready(self) -> Tuple[bool, Dict[str, CheckResult]]:
+        """
+        Check the dependencies that must be up to serve chats.
+
+        Returns:
+            Tuple[bool, Dict[str, CheckResult]]: Readiness, and the result of every probe
+        """
+        required = self._settings().get("required", ["models"])
+        results = self.check_all()
+        return all(results[name].ok for name in required if name in results), results
+
+    def liveness_route(self) -> Tuple[int, str, bytes]:
+        """GET /healthz: the process is up and serving"""
+        payload = {"status": "ok", "uptime": round(time.time() - self._started, 1)}
+        return 200, "application/json", json.dumps(payload).encode()
+
+    def readiness_route(self) -> Tuple[int, str, bytes]:
+        """GET /readyz: 200 when the required dependencies are up, 503 otherwise"""
+        ready, results = self.is_ready()
+        payload = {
+            "status": "ok" if ready else "unavailable",
+            "checks": {name: asdict(result) for name, result in results.items()},
+        }
+        return (200 if ready else 503), "application/json", json.dumps(payload).encode()
+
+    def routes(self) -> Dict[str, Callable[[], Tuple[int, str, bytes]]]:
+        """Endpoints to serve on the metrics side server"""
+        return {"/healthz": self.liveness_route, "/readyz": self.readiness_route}
+
+
+_checker: Optional[HealthChecker] = None
+_checker_lock = threading.Lock()
+
+
+def get_health_checker(config: Mapping) -> HealthChecker:
+    """
+    Return the process-wide health checker, creating it on first use.
+
+    It is shared by the side server, which may start before the first Streamlit
+    session, and the sidebar status of every session.
+
+    Args:
+        config (Mapping): Configuration
+
+    Returns:
+        HealthChecker: Shared health checker
+    """
+    global _checker
+    with _checker_lock:
+        if _checker is None:
+            _checker = HealthChecker(config)
+        return _checker
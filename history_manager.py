@@ -0,0 +1,75 @@
+from typing import Callable, Dict, List
+
+
+class HistoryManager:
+    """Keeps the chat history sent to the model within a per-model token budget"""
+
+    def __init__(self, budget_tokens: int, summarize: Callable[[List[Dict]], str],
+                 keep_recent: int = 6, chars_per_token: int = 4):
+        self.budget_tokens = budget_tokens
+        self.summarize = summarize
+        self.keep_recent = keep_recent
+        self.chars_per_token = chars_per_token
+
+    def count_tokens(self, text: str) -> int:
+        """Approximate the token count of a piece of text"""
+        return len(text) // self.chars_per_token + 1
+
+    def count_message_tokens(self, messages: List[Dict]) -> int:
+        """Approximate the token count of a list of chat messages, including role overhead"""
+        return sum(self.count_tokens(message["content"]) + 4 for message in messages)
+
+    def compact(self, messages: List[Dict], state: Dict) -> List[Dict]:
+        """
+        Fit the conversation into the token budget.
+
+        Older turns are folded into a rolling summary kept in `state`, so each
+        turn is summarized only once. The most recent `keep_recent` messages are
+        always sent verbatim unless they alone exceed the budget.
+
+        Args:
+            messages (List[Dict]): Full conversation history
+            state (Dict): Per-session summary state ("summary", "summarized_count")
+
+        Returns:
+            List[Dict]: Messages to send to the model
+        """
+        summarized_count = state.get("summarized_count", 0)
+        recent = messages[summarized_count:]
+
+        if self._total_tokens(state.get("summary", ""), recent) > self.budget_tokens:
+            foldable = recent[:-self.keep_recent] if self.keep_recent else recent
+            if foldable:
+                try:
+                    summary = self.summarize(self._summary_input(state.get("summary", ""), foldable))
+                    state["summary"] = summary
+                    state["summarized_count"] = summarized_count + len(foldable)
+                    recent = recent[len(foldable):]
+                except Exception as e:
+                    # Keep answering even if the summary model is unavailable
+                    print(f"History summarization failed: {str(e)}")
+
+        # Hard limit: drop the oldest remaining turns if the recent window alone is too large
+        while len(recent) > 1 and self._total_tokens(state.get("summary", ""), recent) > self.budget_tokens:
+            recent = recent[1:]
+
+        compacted = []
+        if state.get("summary"):
+            compacted.append({"role": "system", "content": f"Summary of the earlier conversation:\n{state['summary']}"})
+        compacted.extend(recent)
+
+        return compacted
+
+    def _total_tokens(self, summary: str, messages: List[Dict]) -> int:
+        return (self.count_tokens(summary) if summary else 0) + self.count_message_tokens(messages)
+
+    @staticmethod
+    def _summary_input(summary: str, messages: List[Dict]) -> List[Dict]:
+        """Render the previous summary and the turns to fold as a transcript for the summary model"""
+        lines = []
+        if summary:
+            lines.append(f"Previous summary:\n{summary}\n")
+        for message in messages:
+            lines.append(f"{message['role']}: {message['content']}")
+
+        return [{"role": "user", "content": "\n".join(lines)}]
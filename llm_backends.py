@@ -0,0 +1,402 @@
+import json
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, Generator, List, Optional, Tuple
+
+import metrics
+from async_runtime import AsyncRuntime
+from client_pool import ClientPool, vllm_base_url
+from model_warmup import KeepAlive, keep_alive_for
+from tool_runner import ToolCall
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+    from ollama_manager import OllamaManager
+
+
+@dataclass
+class ChatChunk:
+    """A piece of model output: text and/or complete tool calls, plus token usage when the backend reports it"""
+    content: str = ""
+    tool_calls: List[ToolCall] = field(default_factory=list)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+def assistant_message(content: str, tool_calls: List[ToolCall]) -> Dict:
+    """
+    Build an assistant message in the OpenAI format used for the stored conversation.
+
+    Args:
+        content (str): Text produced by the model
+        tool_calls (List[ToolCall]): Tool calls requested by the model
+
+    Returns:
+        Dict: Assistant message
+    """
+    message = {"role": "assistant", "content": content}
+    if tool_calls:
+        message["tool_calls"] = [
+            {"id": call.id, "type": "function", "function": {"name": call.name, "arguments": json.dumps(call.arguments)}}
+            for call in tool_calls
+        ]
+    return message
+
+
+def tool_message(tool_call: ToolCall, result: str) -> Dict:
+    """Build a tool result message in the OpenAI format used for the stored conversation"""
+    return {"role": "tool", "tool_call_id": tool_call.id, "content": result}
+
+
+def parse_arguments(arguments: str) -> Dict:
+    """Parse JSON tool arguments, letting the toolbox reject malformed ones"""
+    try:
+        return json.loads(arguments or "{}")
+    except ValueError:
+        return {}
+
+
+class LLMBackend(ABC):
+    """A chat model endpoint. Messages are exchanged in the OpenAI chat format."""
+
+    kind = ""
+
+    def __init__(self, name: str, models: Dict[str, str]):
+        # Unique endpoint name, also the key of its health state and request slots in the client pool
+        self.name = name
+        # Model per purpose ("chat", "summary", ...); "chat" is the fallback
+        self.models = models
+
+    def model_for(self, role: str) -> str:
+        return self.models.get(role) or self.models["chat"]
+
+    @abstractmethod
+    def stream(self, messages: List[Dict], tools: Optional[List[Dict]] = None, role: str = "chat",
+               stream: bool = True) -> AsyncIterator[ChatChunk]:
+        """Send the conversation and yield the output, in one chunk when stream is False"""
+
+
+class OllamaBackend(LLMBackend):
+    """Ollama server, through the shared OllamaManager"""
+
+    kind = "ollama"
+
+    def __init__(self, name: str, manager: "OllamaManager", models: Dict[str, str],
+                 keep_alive: Optional[Callable[[], KeepAlive]] = None, options: Optional[Dict] = None):
+        super().__init__(name, models)
+        # Shared by every backend on the host, so it is never changed here
+        self.manager = manager
+        # Sampling options of this backend's requests, as ollama.options when the router was built
+        self.options = options
+        # Returns the keep_alive of the next request, which may depend on the time of day
+        self.keep_alive = keep_alive or (lambda: None)
+
+    async def stream(self, messages, tools=None, role="chat", stream=True):
+        messages = self._to_ollama(messages)
+        model = self.model_for(role)
+        keep_alive = self.keep_alive()
+
+        if stream:
+            responses = await self.manager.achat_stream(messages, model=model, tools=tools, keep_alive=keep_alive,
+                                                        options=self.options)
+        else:
+            responses = self._single(await self.manager.achat(messages, model=model, tools=tools,
+                                                              keep_alive=keep_alive, options=self.options))
+
+        async for response in responses:
+            yield ChatChunk(
+                content=response.message.content or "",
+                tool_calls=[
+                    ToolCall(id=f"call_{uuid.uuid4().hex[:12]}", name=call.function.name, arguments=dict(call.function.arguments))
+                    for call in response.message.tool_calls or []
+                ],
+                # Only the final response carries the evaluation counts
+                prompt_tokens=response.prompt_eval_count or 0,
+                completion_tokens=response.eval_count or 0,
+            )
+
+    @staticmethod
+    async def _single(response):
+        yield response
+
+    @staticmethod
+    def _to_ollama(messages: List[Dict]) -> List[Dict]:
+        """Convert OpenAI style tool turns to the shape Ollama expects"""
+        tool_names = {}
+        converted = []
+
+        for message in messages:
+            if message["role"] == "assistant" and message.get("tool_calls"):
+                calls = []
+                for call in message["tool_calls"]:
+                    tool_names[call["id"]] = call["function"]["name"]
+                    calls.append({"function": {"name": call["function"]["name"],
+                                               "arguments": parse_arguments(call["function"]["arguments"])}})
+                converted.append({"role": "assistant", "content": message.get("content") or "", "tool_calls": calls})
+            elif message["role"] == "tool":
+                converted.append({"role": "tool", "content": message["content"],
+                                  "tool_name": tool_names.get(message.get("tool_call_id"), "")})
+            else:
+                converted.append(message)
+
+        return converted
+
+
+class VLLMBackend(LLMBackend):
+    """OpenAI-compatible vLLM endpoint. Each route serves a single model."""
+
+    kind = "vllm"
+
+    def __init__(self, name: str, client: "AsyncOpenAI", models: Dict[str, str]):
+        super().__init__(name, models)
+        self.client = client
+
+    async def stream(self, messages, tools=None, role="chat", stream=True):
+        params = {"model": self.model_for(role), "messages": messages}
+        if tools:
+            params["tools"] = tools
+
+        if not stream:
+            response = await self.client.chat.completions.create(**params)
+            message = response.choices[0].message
+            yield ChatChunk(
+                content=message.content or "",
+                tool_calls=[
+                    ToolCall(id=call.id, name=call.function.name, arguments=parse_arguments(call.function.arguments))
+                    for call in message.tool_calls or []
+                ],
+                prompt_tokens=response.usage.prompt_tokens if response.usage else 0,
+                completion_tokens=response.usage.completion_tokens if response.usage else 0,
+            )
+            return
+
+        # Tool calls arrive in fragments; collect them by index and emit them once complete
+        calls: Dict[int, Dict] = {}
+        stream_options = {"include_usage": True}
+        async for chunk in await self.client.chat.completions.create(**params, stream=True, stream_options=stream_options):
+            if chunk.usage:
+                # The usage chunk comes last and has no choices
+                yield ChatChunk(prompt_tokens=chunk.usage.prompt_tokens, completion_tokens=chunk.usage.completion_tokens)
+
+            if not chunk.choices:
+                continue
+
+            delta = chunk.choices[0].delta
+            if delta.content:
+                yield ChatChunk(content=delta.content)
+
+            for fragment in delta.tool_calls or []:
+                call = calls.setdefault(fragment.index, {"id": "", "name": "", "arguments": ""})
+                if fragment.id:
+                    call["id"] = fragment.id
+                if fragment.function and fragment.function.name:
+                    call["name"] = fragment.function.name
+                if fragment.function and fragment.function.arguments:
+                    call["arguments"] += fragment.function.arguments
+
+        if calls:
+            yield ChatChunk(tool_calls=[
+                ToolCall(id=call["id"], name=call["name"], arguments=parse_arguments(call["arguments"]))
+                for call in (calls[index] for index in sorted(calls))
+            ])
+
+
+class BackendRouter:
+    """Spreads requests over healthy backends, preferring the fastest, least busy one, and fails over"""
+
+    def __init__(self, backends: List[LLMBackend], pool: ClientPool,
+                 latency_smoothing: float = 0.3, retry_after: float = 30):
+        self.backends = backends
+        self.pool = pool
+        self.latency_smoothing = latency_smoothing
+        self.retry_after = retry_after
+
+        self._lock = threading.Lock()
+        # Smoothed time to first chunk per backend, in seconds
+        self._latency: Dict[str, float] = {}
+        self._in_flight: Dict[str, int] = {backend.name: 0 for backend in backends}
+
+    @property
+    def primary(self) -> LLMBackend:
+        return self.backends[0]
+
+    def candidates(self) -> List[LLMBackend]:
+        """
+        Order the backends for the next request.
+
+        Healthy backends come first, ranked by smoothed latency weighted by
+        their in-flight requests; backends without a measurement are tried
+        first so they get one. Unhealthy backends follow once retry_after has
+        passed since their last failure, and are used as a last resort otherwise.
+
+        Returns:
+            List[LLMBackend]: Backends in the order they should be tried
+        """
+        now = time.time()
+        healthy, recovering, down = [], [], []
+
+        for backend in self.backends:
+            state = self.pool.health(backend.name)
+            if state.healthy:
+                healthy.append(backend)
+            elif state.last_failure is None or now - state.last_failure >= self.retry_after:
+                recovering.append(backend)
+            else:
+                down.append(backend)
+
+        with self._lock:
+            healthy.sort(key=lambda backend: self._latency.get(backend.name, 0.0) * (self._in_flight[backend.name] + 1))
+
+        return healthy + recovering + down
+
+    def is_available(self) -> bool:
+        """Check whether at least one backend is healthy"""
+        return any(self.pool.health(backend.name).healthy for backend in self.backends)
+
+    async def stream(self, messages: List[Dict], tools: Optional[List[Dict]] = None, role: str = "chat",
+                     stream: bool = True) -> AsyncIterator[ChatChunk]:
+        """
+        Send the conversation to the best backend, failing over to the next one on errors.
+
+        A backend that already produced output is not retried, since the output cannot be taken back.
+
+        Raises:
+            ConnectionError: If every backend failed
+        """
+        errors = []
+
+        for backend in self.candidates():
+            model = backend.model_for(role)
+            started = time.monotonic()
+            produced = False
+            self._track(backend.name, 1)
+
+            try:
+                with metrics.timed(metrics.LLM_REQUEST_DURATION, backend=backend.name, model=model):
+                    async with self.pool.acquire(backend.name):
+                        async for chunk in backend.stream(messages, tools, role, stream):
+                            if not produced:
+                                produced = True
+                                time_to_first_chunk = time.monotonic() - started
+                                self._record_latency(backend.name, time_to_first_chunk)
+                                metrics.LLM_TIME_TO_FIRST_TOKEN.labels(backend=backend.name, model=model).observe(time_to_first_chunk)
+                            if chunk.prompt_tokens:
+                                metrics.LLM_TOKENS.labels(backend=backend.name, model=model, type="prompt").inc(chunk.prompt_tokens)
+                            if chunk.completion_tokens:
+                                metrics.LLM_TOKENS.labels(backend=backend.name, model=model, type="completion").inc(chunk.completion_tokens)
+                            yield chunk
+                return
+            except Exception as e:
+                if produced:
+                    raise
+                errors.append(f"{backend.name}: {str(e)}")
+            finally:
+                self._track(backend.name, -1)
+
+        raise ConnectionError(f"All backends failed: {'; '.join(errors)}")
+
+    async def chat(self, messages: List[Dict], tools: Optional[List[Dict]] = None, role: str = "chat") -> ChatChunk:
+        """Send the conversation and return the complete output"""
+        result = ChatChunk()
+        async for chunk in self.stream(messages, tools, role, stream=False):
+            result.content += chunk.content
+            result.tool_calls.extend(chunk.tool_calls)
+        return result
+
+    def _track(self, name: str, delta: int) -> None:
+        with self._lock:
+            self._in_flight[name] += delta
+
+    def _record_latency(self, name: str, seconds: float) -> None:
+        with self._lock:
+            previous = self._latency.get(name)
+            self._latency[name] = seconds if previous is None else \
+                self.latency_smoothing * seconds + (1 - self.latency_smoothing) * previous
+
+
+def router_step(router: BackendRouter, runtime: AsyncRuntime, messages: List[Dict],
+                tools: Optional[List[Dict]] = None, role: str = "chat", stream: bool = True,
+                deadline: Optional[float] = None) -> Generator[str, None, Tuple[Dict, List[ToolCall]]]:
+    """
+    Call the router once as a step of the tool-calling loop.
+
+    The request runs on the shared event loop; the calling thread only consumes its output.
+
+    Args:
+        router (BackendRouter): Router to send the request through
+        runtime (AsyncRuntime): Shared event loop
+        messages (List[Dict]): Conversation to send
+        tools (Optional[List[Dict]]): Tools to offer to the model
+        role (str): Model role
+        stream (bool): Whether to stream the response
+        deadline (Optional[float]): time.monotonic() value after which the request is cancelled
+
+    Returns:
+        Generator yielding text chunks and returning the assistant message and the requested tool calls
+
+    Raises:
+        DeadlineExceeded: If the deadline passes, also while waiting for the response
+    """
+    content = []
+    tool_calls = []
+
+    for chunk in runtime.iterate(router.stream(messages, tools=tools, role=role, stream=stream), deadline):
+        if chunk.content:
+            content.append(chunk.content)
+            yield chunk.content
+        tool_calls.extend(chunk.tool_calls)
+
+    return assistant_message("".join(content), tool_calls), tool_calls
+
+
+def create_router(config: Dict, pool: ClientPool) -> BackendRouter:
+    """
+    Build the backend router from the configuration.
+
+    The backend selected by ollama.enabled comes first. vLLM contributes one
+    backend per endpoint: the route derived from vllm_config plus any replicas
+    listed in vllm_config.endpoints. With routing.cross_backend_failover the
+    other backend kind is appended as a fallback.
+
+    Args:
+        config (Dict): Configuration dictionary
+        pool (ClientPool): Shared client pool
+
+    Returns:
+        BackendRouter: Router over the configured backends
+    """
+    def ollama_backends() -> List[LLMBackend]:
+        return [OllamaBackend("ollama", pool.ollama(), {
+            "chat": config["ollama"]["chat_model"],
+            "agent": config["ollama"].get("agent_model"),
+            "summary": config.get("llm_config", {}).get("summary_model"),
+        }, keep_alive=lambda: keep_alive_for(config), options=dict(config["ollama"]["options"]))]
+
+    def vllm_backends() -> List[LLMBackend]:
+        base_urls = [vllm_base_url(config)] + list(config["vllm_config"].get("endpoints", []))
+        return [
+            VLLMBackend(base_url, pool.vllm(base_url), {"chat": config["vllm_config"]["chat_model"]})
+            for base_url in base_urls
+        ]
+
+    routing_config = config.get("routing", {})
+
+    if config["ollama"]["enabled"]:
+        backends = ollama_backends()
+        if routing_config.get("cross_backend_failover", False):
+            backends += vllm_backends()
+    else:
+        backends = vllm_backends()
+        if routing_config.get("cross_backend_failover", False):
+            backends += ollama_backends()
+
+    return BackendRouter(
+        backends,
+        pool,
+        latency_smoothing=routing_config.get("latency_smoothing", 0.3),
+        retry_after=routing_config.get("retry_after", 30),
+    )
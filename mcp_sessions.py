@@ -0,0 +1,351 @@
+import asyncio
+import json
+import time
+from collections.abc import Mapping
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import anyio
+
+import metrics
+from async_runtime import AsyncRuntime
+
+# mcp is imported when the first session connects, so deployments without MCP servers skip it
+if TYPE_CHECKING:
+    from mcp import ClientSession
+
+# Errors of a transport that went away, e.g. an MCP server that restarted; other errors are the call's own
+CONNECTION_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream, ConnectionError)
+# JSON-RPC error code the session reports for requests on a closed connection
+CONNECTION_CLOSED = -32000
+
+
+def connection_lost(error: Exception) -> bool:
+    """Check whether a failed request failed because the session to the server is gone"""
+    if isinstance(error, CONNECTION_ERRORS):
+        return True
+    # MCPError carries the code itself, the McpError of older mcp releases in its ErrorData
+    code = getattr(error, "code", getattr(getattr(error, "error", None), "code", None))
+    return code == CONNECTION_CLOSED
+
+
+@dataclass
+class MCPServer:
+    """How to reach one MCP server: over streamable HTTP at url, or as a stdio subprocess"""
+    name: str
+    transport: str = "streamable_http"
+    url: Optional[str] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    command: Optional[str] = None
+    args: List[str] = field(default_factory=list)
+    env: Optional[Dict[str, str]] = None
+
+    @classmethod
+    def from_config(cls, name: str, server_config: Mapping) -> "MCPServer":
+        """Build the server from an entry of mcp.servers"""
+        transport = server_config.get("transport", "streamable_http")
+        if transport not in ("streamable_http", "stdio"):
+            raise ValueError(f"mcp.servers.{name}.transport must be streamable_http or stdio, not {transport}")
+        if transport == "streamable_http" and not server_config.get("url"):
+            raise ValueError(f"mcp.servers.{name}.url is required for streamable_http")
+        if transport == "stdio" and not server_config.get("command"):
+            raise ValueError(f"mcp.servers.{name}.command is required for stdio")
+
+        return cls(
+            name=name,
+            transport=transport,
+            url=server_config.get("url"),
+            headers=dict(server_config.get("headers", {})),
+            command=server_config.get("command"),
+            args=list(server_config.get("args", [])),
+            env=dict(server_config["env"]) if server_config.get("env") else None,
+        )
+
+
+def tool_definition(tool: Dict) -> Dict:
+    """Convert an MCP tool description into the OpenAI function format the backends expect"""
+    return {"type": "function", "function": {
+        "name": tool["name"],
+        "description": tool.get("description") or "",
+        "parameters": tool.get("inputSchema") or {"type": "object", "properties": {}},
+    }}
+
+
+def result_text(result: Dict) -> str:
+    """Join the text content of a tool result; other content types are passed as JSON"""
+    parts = []
+    for content in result.get("content") or []:
+        parts.append(content["text"] if content.get("type") == "text" else json.dumps(content))
+    return "\n".join(parts)
+
+
+class MCPConnection:
+    """
+    One long-lived session to an MCP server with its cached tool catalog.
+
+    The session is opened and closed by a task of its own on the shared loop,
+    since the transports must be entered and exited in the same task; requests
+    from any other task use it concurrently. The catalog is listed once and
+    reused until catalog_ttl expires or the server sends a tools/list_changed
+    notification. A session whose transport fails is reopened on the next use.
+    """
+
+    def __init__(self, server: MCPServer, catalog_ttl: float = 300, call_timeout: float = 60,
+                 max_concurrency: int = 8):
+        self.server = server
+        self.catalog_ttl = catalog_ttl
+        self.call_timeout = call_timeout
+        self.max_concurrency = max_concurrency
+
+        # Created lazily on the runtime loop they are used on
+        self._lock: Optional[asyncio.Lock] = None
+        self._catalog_lock: Optional[asyncio.Lock] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._closing: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._session: Optional["ClientSession"] = None
+        self._catalog: List[Dict] = []
+        self._catalog_at = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._session is not None and self._task is not None and not self._task.done()
+
+    async def session(self) -> "ClientSession":
+        """Return the open session, connecting first if there is none"""
+        if self.connected:
+            return self._session
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self.connected:
+                await self._connect()
+            return self._session
+
+    async def tools(self) -> List[Dict]:
+        """Return the tool catalog of the server, listing it again once it is stale"""
+        if self._catalog and time.monotonic() - self._catalog_at < self.catalog_ttl:
+            return self._catalog
+
+        if self._catalog_lock is None:
+            self._catalog_lock = asyncio.Lock()
+        async with self._catalog_lock:
+            # Another caller may have refreshed it while this one waited
+            if self._catalog and time.monotonic() - self._catalog_at < self.catalog_ttl:
+                return self._catalog
+            try:
+                self._catalog = await self._list_tools(await self.session())
+            except Exception as e:
+                # Keep serving the previous catalog if there is one
+                if not self._catalog:
+                    raise
+                print(f"Failed to refresh the tools of MCP server {self.server.name}: {str(e)}")
+            self._catalog_at = time.monotonic()
+            return self._catalog
+
+    async def call_tool(self, tool_name: str, arguments: Dict) -> str:
+        """
+        Call a tool, reconnecting once if the session was lost.
+
+        Args:
+            tool_name (str): Tool name from the catalog
+            arguments (Dict): Tool arguments
+
+        Returns:
+            str: Text of the tool result
+
+        Raises:
+            RuntimeError: If the server reports the call as failed
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            for attempt in range(2):
+                session = await self.session()
+                try:
+                    result = await asyncio.wait_for(session.call_tool(tool_name, arguments), self.call_timeout)
+                    break
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"MCP tool {tool_name} did not answer within {self.call_timeout:g}s")
+                except Exception as e:
+                    if attempt or not connection_lost(e):
+                        raise
+                    print(f"Lost the session to MCP server {self.server.name}, reconnecting: {str(e)}")
+                    await self._reconnect(session)
+
+        result = result.model_dump(by_alias=True)
+        if result.get("isError"):
+            raise RuntimeError(result_text(result) or f"MCP tool {tool_name} failed")
+        return result_text(result)
+
+    async def close(self) -> None:
+        """Close the session and end its transport"""
+        if self._closing is not None:
+            self._closing.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, 5)
+            except Exception:
+                pass
+        self._task = None
+        self._session = None
+
+    async def _reconnect(self, session: "ClientSession") -> None:
+        async with self._lock:
+            # Concurrent calls that failed on the same session reconnect once
+            if self._session is session:
+                await self._connect()
+
+    async def _connect(self) -> None:
+        await self.close()
+
+        ready = asyncio.get_running_loop().create_future()
+        self._closing = asyncio.Event()
+        self._task = asyncio.create_task(self._serve(ready), name=f"mcp-{self.server.name}")
+        self._session = await ready
+        self._catalog_at = 0.0
+        print(f"Connected to MCP server {self.server.name} over {self.server.transport}")
+
+    async def _serve(self, ready: asyncio.Future) -> None:
+        from mcp import ClientSession
+
+        try:
+            async with AsyncExitStack() as stack:
+                streams = await stack.enter_async_context(self._transport())
+                session = await stack.enter_async_context(
+                    ClientSession(streams[0], streams[1], message_handler=self._on_message))
+                await session.initialize()
+                ready.set_result(session)
+                await self._closing.wait()
+        except BaseException as e:
+            if not ready.done():
+                ready.set_exception(e if isinstance(e, Exception) else ConnectionError(str(e)))
+            elif not self._closing.is_set():
+                print(f"Session to MCP server {self.server.name} ended: {str(e)}")
+            if not isinstance(e, Exception):
+                raise
+
+    def _transport(self):
+        if self.server.transport == "stdio":
+            from mcp import StdioServerParameters
+            from mcp.client.stdio import stdio_client
+
+            return stdio_client(StdioServerParameters(command=self.server.command, args=self.server.args,
+                                                      env=self.server.env))
+
+        from mcp.client import streamable_http
+
+        if hasattr(streamable_http, "streamable_http_client"):
+            from mcp.client.streamable_http import create_mcp_http_client, streamable_http_client
+
+            return streamable_http_client(self.server.url,
+                                          http_client=create_mcp_http_client(headers=self.server.headers))
+        # Older mcp releases; the stream pair is followed by a session id getter
+        return streamable_http.streamablehttp_client(self.server.url, headers=self.server.headers)
+
+    async def _on_message(self, message) -> None:
+        from mcp import types
+
+        # Older mcp releases wrap notifications in a root model
+        if isinstance(getattr(message, "root", message), types.ToolListChangedNotification):
+            self._catalog_at = 0.0
+        elif isinstance(message, Exception):
+            print(f"MCP server {self.server.name} sent an error: {str(message)}")
+
+    @staticmethod
+    async def _list_tools(session: "ClientSession") -> List[Dict]:
+        from mcp import types
+
+        result = (await session.list_tools()).model_dump(by_alias=True)
+        tools = list(result.get("tools", []))
+        while result.get("nextCursor"):
+            result = (await session.list_tools(
+                params=types.PaginatedRequestParams(cursor=result["nextCursor"]))).model_dump(by_alias=True)
+            tools.extend(result.get("tools", []))
+        return tools
+
+
+class MCPSessionPool:
+    """
+    Process-wide MCP sessions to every configured server, shared by all Streamlit sessions.
+
+    Tools are looked up by name in the merged catalog of the servers; a name
+    offered by several servers is served by the first one configured. Calls
+    from different threads run concurrently over the shared sessions.
+    """
+
+    def __init__(self, servers: List[MCPServer], runtime: AsyncRuntime, catalog_ttl: float = 300,
+                 call_timeout: float = 60, max_concurrency: int = 8):
+        self.runtime = runtime
+        self.connections = {server.name: MCPConnection(server, catalog_ttl, call_timeout, max_concurrency)
+                            for server in servers}
+
+    @classmethod
+    def from_config(cls, mcp_config: Mapping, runtime: AsyncRuntime) -> "MCPSessionPool":
+        """Build the pool from the mcp section of config.yaml"""
+        servers = [MCPServer.from_config(name, server_config)
+                   for name, server_config in mcp_config.get("servers", {}).items()]
+        return cls(
+            servers,
+            runtime,
+            catalog_ttl=mcp_config.get("catalog_ttl", 300),
+            call_timeout=mcp_config.get("call_timeout", 60),
+            max_concurrency=mcp_config.get("max_concurrency", 8),
+        )
+
+    async def catalog(self) -> Dict[str, Tuple[MCPConnection, Dict]]:
+        """Merged tool catalog: tool name to the connection serving it and its description"""
+        names = list(self.connections)
+        results = await asyncio.gather(*(self.connections[name].tools() for name in names), return_exceptions=True)
+
+        catalog = {}
+        for name, tools in zip(names, results):
+            if isinstance(tools, Exception):
+                print(f"Failed to list the tools of MCP server {name}: {str(tools)}")
+                continue
+            for tool in tools:
+                catalog.setdefault(tool["name"], (self.connections[name], tool))
+        return catalog
+
+    def tools(self) -> List[Dict]:
+        """Tool definitions of every server, in the OpenAI function format"""
+        return [tool_definition(tool) for _, tool in self.runtime.run(self.catalog()).values()]
+
+    async def call_async(self, tool_name: str, tool_params: Dict) -> str:
+        """
+        Call a tool on the server that offers it.
+
+        Args:
+            tool_name (str): Tool name
+            tool_params (Dict): Tool arguments
+
+        Returns:
+            str: Tool result
+
+        Raises:
+            ValueError: If no server offers the tool
+        """
+        entry = (await self.catalog()).get(tool_name)
+        if entry is None:
+            raise ValueError(f"Unknown MCP tool: {tool_name}")
+
+        try:
+            with metrics.timed(metrics.TOOL_CALL_DURATION, tool=tool_name):
+                return await entry[0].call_tool(tool_name, tool_params)
+        except Exception:
+            metrics.TOOL_CALL_ERRORS.labels(tool=tool_name).inc()
+            raise
+
+    def call(self, tool_name: str, tool_params: Dict) -> str:
+        """Call a tool from sync code by running call_async on the shared loop"""
+        return self.runtime.run(self.call_async(tool_name, tool_params))
+
+    def close(self) -> None:
+        """Close every session"""
+        async def close_all():
+            await asyncio.gather(*(connection.close() for connection in self.connections.values()))
+
+        self.runtime.run(close_all())
@@ -0,0 +1,177 @@
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Latency buckets sized for LLM calls, from fast cache-like answers to long generations
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+FAST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "aiui_llm_time_to_first_token_seconds",
+    "Time from sending a model request to receiving its first chunk",
+    ["backend", "model"],
+    buckets=LLM_BUCKETS,
+)
+LLM_REQUEST_DURATION = Histogram(
+    "aiui_llm_request_duration_seconds",
+    "Total duration of a model request",
+    ["backend", "model", "outcome"],
+    buckets=LLM_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "aiui_llm_tokens_total",
+    "Tokens processed by the model backends, by type (prompt or completion)",
+    ["backend", "model", "type"],
+)
+TOOL_CALL_DURATION = Histogram(
+    "aiui_tool_call_duration_seconds",
+    "Duration of toolbox tool invocations",
+    ["tool", "outcome"],
+    buckets=FAST_BUCKETS,
+)
+TOOL_CALL_ERRORS = Counter(
+    "aiui_tool_call_errors_total",
+    "Failed toolbox tool invocations",
+    ["tool"],
+)
+TOOL_CACHE_LOOKUPS = Counter(
+    "aiui_tool_cache_lookups_total",
+    "Tool result cache lookups, by result (hit or miss)",
+    ["tool", "result"],
+)
+SEMANTIC_CACHE_LOOKUPS = Counter(
+    "aiui_semantic_cache_lookups_total",
+    "Semantic response cache lookups of context-free turns, by result (hit or miss)",
+    ["result"],
+)
+TOOL_RESULT_CHARS = Counter(
+    "aiui_tool_result_chars_total",
+    "Characters of tool results as returned by the tools (raw) and as sent to the model (shaped)",
+    ["tool", "stage"],
+)
+AUTH_STEP_DURATION = Histogram(
+    "aiui_auth_step_duration_seconds",
+    "Duration of the authentication steps",
+    ["step", "outcome"],
+    buckets=FAST_BUCKETS,
+)
+
+SCHEDULER_QUEUE_WAIT = Histogram(
+    "aiui_scheduler_queue_wait_seconds",
+    "Time chat turns waited for a backend slot, by outcome (admitted, timeout, cancelled, abandoned)",
+    ["outcome"],
+    buckets=LLM_BUCKETS,
+)
+SCHEDULER_RUN_DURATION = Histogram(
+    "aiui_scheduler_run_duration_seconds",
+    "Time chat turns held a backend slot",
+    buckets=LLM_BUCKETS,
+)
+SCHEDULER_REJECTIONS = Counter(
+    "aiui_scheduler_rejections_total",
+    "Chat turns refused because the queue was full",
+    ["reason"],
+)
+SCHEDULER_RUNNING = Gauge("aiui_scheduler_running", "Chat turns holding a backend slot")
+SCHEDULER_WAITING = Gauge("aiui_scheduler_waiting", "Chat turns waiting for a backend slot")
+MODEL_CASCADE_ROUTES = Counter(
+    "aiui_model_cascade_routes_total",
+    "Chat turns by the model role that answered them and why (small_talk, lookup, reasoning, follow_up, "
+    "low_confidence, tool_error, empty_answer)",
+    ["role", "reason"],
+)
+VLLM_PREFIX_CACHE_HIT_RATE = Gauge(
+    "aiui_vllm_prefix_cache_hit_rate",
+    "Share of prompt tokens served from the vLLM prefix cache since the previous scrape of its /metrics",
+    ["endpoint"],
+)
+VLLM_PREFIX_CACHE_TOKENS = Gauge(
+    "aiui_vllm_prefix_cache_tokens",
+    "Prompt tokens looked up in (queries) and served from (hits) the vLLM prefix cache since the endpoint started",
+    ["endpoint", "type"],
+)
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels) -> Iterator[None]:
+    """
+    Observe the duration of a block in a histogram with an "outcome" label.
+
+    Args:
+        histogram (Histogram): Histogram with an "outcome" label
+        **labels: Remaining label values
+    """
+    started = time.monotonic()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    finally:
+        histogram.labels(outcome=outcome, **labels).observe(time.monotonic() - started)
+
+
+# Extra endpoints of the side server: path -> handler returning (status, content type, body)
+Route = Callable[[], Tuple[int, str, bytes]]
+
+
+def _metrics_route() -> Tuple[int, str, bytes]:
+    return 200, CONTENT_TYPE_LATEST, generate_latest()
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, routes: Dict[str, Route] = None) -> ThreadingHTTPServer:
+    """
+    Serve /metrics, plus any extra routes, on a side port in a daemon thread.
+
+    The server is started once per process; later calls return the running
+    server and add their routes to it.
+
+    Args:
+        port (int): Port to listen on
+        routes (Dict[str, Route]): Extra endpoints by path
+
+    Returns:
+        ThreadingHTTPServer: The running server
+    """
+    global _server
+    with _server_lock:
+        if _server is not None:
+            _server.routes.update(routes or {})
+            return _server
+
+        _server = _create_server(port, {"/metrics": _metrics_route, **(routes or {})})
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server
+
+
+def _create_server(port: int, all_routes: Dict[str, Route]) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            route = all_routes.get(self.path.split("?", 1)[0])
+            if route is None:
+                status, content_type, body = 404, "text/plain", b"not found\n"
+            else:
+                status, content_type, body = route()
+
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Scrapes and probes are too frequent to log
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    server.daemon_threads = True
+    server.routes = all_routes
+
+    return server
@@ -0,0 +1,125 @@
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+import metrics
+
+# Model roles of the backends: the small chat model and the larger reasoning model
+CHAT = "chat"
+AGENT = "agent"
+
+# Messages that are only small talk
+SMALL_TALK = re.compile(
+    r"^\s*(hi|hello|hey|hiya|thanks|thank you|thx|ty|good (morning|afternoon|evening)|bye|goodbye|"
+    r"ok|okay|cool|great|nice|perfect|got it|yes|no|sure)\b[\s!.,:)]*(there|again|so much|a lot)?[\s!.,:)]*$",
+    re.IGNORECASE,
+)
+
+# Small talk that answers the previous turn, e.g. "yes" to "Should I extend the lab?"
+CONFIRMATION = re.compile(r"^\s*(ok|okay|yes|no|sure)\b", re.IGNORECASE)
+
+# Score from which a turn goes to the agent model
+AGENT_THRESHOLD = 1.0
+
+# Signals of a turn that needs reasoning or several tool calls, with their weight.
+# The strong ones reach the agent threshold on their own.
+REASONING_SIGNALS = [
+    (re.compile(r"\b(why|explain|compare|difference|versus|vs\.?|troubleshoot|debug|diagnose|analy[sz]e)\b", re.I), 1.5),
+    (re.compile(r"\b(plan|step by step|steps|should (i|we)|recommend|best way|pros and cons|what if|trade-?offs?)\b", re.I), 1.5),
+    (re.compile(r"\b(and then|then|after that|afterwards|for each|each of|both|as well as)\b", re.I), 0.5),
+    (re.compile(r"\b(how many|count|total|average|sum|most|least|top \d+|per|group(ed)? by|trend|over time)\b", re.I), 0.5),
+    (re.compile(r"\b(if|unless|except|only those|but not|excluding|between)\b", re.I), 0.4),
+]
+
+# Asks and commands; two or more in one message usually mean several lookups
+ASKS = re.compile(r"\b(which|what|how|who|when|where|list|show|tell|give|find|check)\b", re.IGNORECASE)
+
+# Follow-ups that only make sense with the previous turn, e.g. "and the pending ones?"
+FOLLOW_UP = re.compile(r"^\s*(and|what about|how about|also|same|those|them|that|it)\b", re.IGNORECASE)
+
+
+@dataclass
+class TurnRoute:
+    """Model role of one chat turn, which may move up to the agent model while the turn runs"""
+    role: str
+    confidence: float
+    reason: str
+    escalate_on_failure: bool = True
+
+    @property
+    def can_escalate(self) -> bool:
+        return self.escalate_on_failure and self.role == CHAT
+
+    def escalate(self, reason: str) -> None:
+        """Send the rest of the turn to the agent model"""
+        if self.can_escalate:
+            self.role = AGENT
+            self.reason = reason
+
+    def record(self) -> None:
+        """Count the turn by the role that answered it, once it is done"""
+        metrics.MODEL_CASCADE_ROUTES.labels(role=self.role, reason=self.reason).inc()
+
+
+def classify_turn(prompt: str, previous_role: Optional[str] = None) -> TurnRoute:
+    """
+    Decide whether a turn needs the agent model, from the wording of the user's message.
+
+    Small talk goes to the chat model with full confidence, except a confirmation
+    of an agent model turn, which continues it. Otherwise the reasoning signals
+    are added up; a score of AGENT_THRESHOLD or more picks the agent model. The
+    confidence is 0.5 at the threshold and grows with the distance from it.
+
+    Args:
+        prompt (str): User message
+        previous_role (Optional[str]): Role that answered the previous turn, inherited by short follow-ups
+
+    Returns:
+        TurnRoute: Suggested role, with the classifier's confidence
+    """
+    if SMALL_TALK.match(prompt):
+        if previous_role == AGENT and CONFIRMATION.match(prompt):
+            return TurnRoute(AGENT, 1.0, "follow_up")
+        return TurnRoute(CHAT, 1.0, "small_talk")
+
+    score = sum(weight for pattern, weight in REASONING_SIGNALS if pattern.search(prompt))
+
+    words = len(prompt.split())
+    if words > 40:
+        score += 0.6
+    elif words > 20:
+        score += 0.3
+    if prompt.count("?") > 1 or len(ASKS.findall(prompt)) > 1:
+        score += 0.5
+    if previous_role == AGENT and words <= 8 and FOLLOW_UP.match(prompt):
+        # A short follow-up of a reasoning turn continues it
+        return TurnRoute(AGENT, 1.0, "follow_up")
+
+    confidence = min(1.0, 0.5 + abs(score - AGENT_THRESHOLD) / 2)
+    if score >= AGENT_THRESHOLD:
+        return TurnRoute(AGENT, confidence, "reasoning")
+    return TurnRoute(CHAT, confidence, "lookup")
+
+
+def route_turn(prompt: str, previous_role: Optional[str] = None, min_confidence: float = 0.6,
+               escalate_on_failure: bool = True) -> TurnRoute:
+    """
+    Pick the cheapest model role for a turn, moving up when the classifier is unsure.
+
+    Args:
+        prompt (str): User message
+        previous_role (Optional[str]): Role that answered the previous turn
+        min_confidence (float): Confidence below which a chat model turn goes to the agent model
+        escalate_on_failure (bool): Whether the turn may move up while it runs
+
+    Returns:
+        TurnRoute: Route of the turn; record it once the turn is done
+    """
+    route = classify_turn(prompt, previous_role)
+    route.escalate_on_failure = escalate_on_failure
+
+    if route.role == CHAT and route.confidence < min_confidence:
+        route.role = AGENT
+        route.reason = "low_confidence"
+
+    return route
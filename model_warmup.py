@@ -0,0 +1,204 @@
+import threading
+import time
+from collections.abc import Mapping
+from datetime import datetime, timedelta, timezone
+from datetime import time as clock
+from typing import Dict, List, Optional, Union
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# Ollama keep_alive: a duration string ("5m", "1h"), seconds, or a negative number to keep the model loaded
+KeepAlive = Union[str, float, None]
+
+
+class BusinessHours:
+    """Weekly window in a time zone, e.g. Monday to Friday 08:00-18:00 in America/New_York"""
+
+    def __init__(self, days: List[str], start: str, end: str, tz: str = "UTC"):
+        self.days = {DAYS.index(day.strip().lower()[:3]) for day in days}
+        self.start = clock.fromisoformat(start)
+        self.end = clock.fromisoformat(end)
+        try:
+            self.tz = ZoneInfo(tz)
+        except ZoneInfoNotFoundError:
+            print(f"Unknown time zone {tz}, using UTC for business hours")
+            self.tz = timezone.utc
+
+    @classmethod
+    def from_config(cls, hours_config: Mapping) -> Optional["BusinessHours"]:
+        """Build the window from the model_warmup.business_hours section; None when it is disabled"""
+        if not hours_config.get("enabled", False):
+            return None
+        return cls(
+            days=hours_config.get("days", list(DAYS[:5])),
+            start=hours_config.get("start", "08:00"),
+            end=hours_config.get("end", "18:00"),
+            tz=hours_config.get("timezone", "UTC"),
+        )
+
+    def contains(self, now: Optional[datetime] = None) -> bool:
+        """Check whether a moment, by default now, falls inside the window"""
+        local = (now or datetime.now(timezone.utc)).astimezone(self.tz)
+        return local.weekday() in self.days and self.start <= local.time() < self.end
+
+
+def keep_alive_for(config: Mapping, now: Optional[datetime] = None) -> KeepAlive:
+    """
+    Choose the keep_alive sent with Ollama requests.
+
+    During business hours models stay loaded for model_warmup.business_hours.keep_alive,
+    outside of them for ollama.keep_alive, so idle nights and weekends free the memory.
+
+    Args:
+        config (Mapping): Configuration
+        now (Optional[datetime]): Moment to decide for, by default now
+
+    Returns:
+        KeepAlive: keep_alive value, or None to use the Ollama server default
+    """
+    hours_config = config.get("model_warmup", {}).get("business_hours", {})
+    hours = BusinessHours.from_config(hours_config)
+    if hours is not None and hours.contains(now):
+        return hours_config.get("keep_alive", config["ollama"].get("keep_alive"))
+    return config["ollama"].get("keep_alive")
+
+
+class ModelWarmer:
+    """
+    Loads the Ollama models before the first chat and keeps them resident during business hours.
+
+    A model is loaded by a generate request without a prompt. While business
+    hours are active the models are checked every ping_interval seconds with
+    /api/ps, and only those that are unloaded or would expire before the next
+    check are pinged again.
+    """
+
+    def __init__(self, config: Mapping):
+        # Read on every pass, so the settings follow config.yaml reloads
+        self.config = config
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._clients: Dict[str, object] = {}
+
+    def _settings(self) -> Mapping:
+        return self.config.get("model_warmup", {})
+
+    def _client(self):
+        # Only used with Ollama; imported here so vLLM deployments do not load it
+        from ollama import Client
+
+        host = self.config["ollama"]["host"]
+        if host not in self._clients:
+            # Loading a large model from disk can take minutes
+            self._clients[host] = Client(host=host, timeout=self._settings().get("load_timeout", 300))
+        return self._clients[host]
+
+    def models(self) -> List[str]:
+        """Models to keep loaded: the chat model and, if configured, the agent model"""
+        ollama_config = self.config["ollama"]
+        models = [ollama_config["chat_model"], ollama_config.get("agent_model")]
+        return list(dict.fromkeys(model for model in models if model))
+
+    def warm(self, models: Optional[List[str]] = None) -> Dict[str, float]:
+        """
+        Load models into memory with the current keep_alive.
+
+        Args:
+            models (Optional[List[str]]): Models to load, by default models()
+
+        Returns:
+            Dict[str, float]: Seconds each model took to load; failed models are left out
+        """
+        keep_alive = keep_alive_for(self.config)
+        durations = {}
+        for model in models if models is not None else self.models():
+            started = time.monotonic()
+            try:
+                self._client().generate(model=model, keep_alive=keep_alive)
+            except Exception as e:
+                print(f"Failed to warm up {model}: {str(e)}")
+                continue
+            durations[model] = time.monotonic() - started
+            print(f"Warmed up {model} in {durations[model]:.1f}s (keep_alive={keep_alive})")
+        return durations
+
+    def expiring(self, within: float) -> List[str]:
+        """
+        Find the models that are not loaded or unload within a number of seconds.
+
+        Args:
+            within (float): Seconds until the next check
+
+        Returns:
+            List[str]: Models to ping
+        """
+        models = self.models()
+        try:
+            loaded = {model.model: model.expires_at for model in self._client().ps().models}
+        except Exception as e:
+            print(f"Failed to list loaded models: {str(e)}")
+            return models
+
+        deadline = datetime.now(timezone.utc) + timedelta(seconds=within)
+        expiring = []
+        for model in models:
+            expires_at = loaded.get(model, loaded.get(f"{model}:latest"))
+            if expires_at is None or expires_at.astimezone(timezone.utc) < deadline:
+                expiring.append(model)
+        return expiring
+
+    def start(self) -> None:
+        """Warm up in a daemon thread, then keep pinging during business hours"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="model-warmer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        if self._settings().get("on_startup", True):
+            self.warm()
+
+        while True:
+            ping_interval = self._settings().get("ping_interval", 240)
+            if self._stop.wait(ping_interval):
+                return
+            if not self.config["ollama"]["enabled"]:
+                continue
+
+            hours = BusinessHours.from_config(self._settings().get("business_hours", {}))
+            if hours is None or not hours.contains():
+                continue
+
+            # Allow for a slow check: a model must outlive the next one with a margin
+            models = self.expiring(within=2 * ping_interval)
+            if models:
+                self.warm(models)
+
+
+_warmer: Optional[ModelWarmer] = None
+_warmer_lock = threading.Lock()
+
+
+def start_model_warmer(config: Mapping) -> Optional[ModelWarmer]:
+    """
+    Start the process-wide model warmer, once; nothing to do without Ollama or when it is disabled.
+
+    Args:
+        config (Mapping): Configuration
+
+    Returns:
+        Optional[ModelWarmer]: The running warmer
+    """
+    global _warmer
+    if not config["ollama"]["enabled"] or not config.get("model_warmup", {}).get("enabled", False):
+        return None
+
+    with _warmer_lock:
+        if _warmer is None:
+            _warmer = ModelWarmer(config)
+            _warmer.start()
+        return _warmer
@@ -1,49 +1,38 @@
 import json
-import yaml
 
-from ollama import Client, ChatResponse
-from typing import Dict
-
-
-# Load configuration
-def load_config() -> Dict:
-    """
-    Load configuration from the config.yaml file.
-
-    Returns:
-        Dict: Configuration dictionary
-    """
-    with open("config.yaml", "r") as file:
-        config_file = yaml.safe_load(file)
-
-    return config_file
-
-config = load_config()
+from ollama import AsyncClient, Client, ChatResponse
 
 
 class OllamaManager:
     """Manages the persistent Ollama client with tool/function support"""
 
-    def __init__(self, host, model, options, tools=None):
-        self.client = Client(host=host)
+    def __init__(self, host, model, options, tools=None, **client_kwargs):
+        # Extra keyword arguments (limits, timeout, ...) are handed to the underlying httpx client
+        self.client = Client(host=host, **client_kwargs)
+        # Async twin of the client, meant to be driven from a single shared event loop
+        self.async_client = AsyncClient(host=host, **client_kwargs)
         self.model = model
         self.options = options
 
-        with open("tools.json", "r") as f:
-            self.tools = json.load(f)  # Load tools from the JSON file
+        if tools is not None:
+            self.tools = tools
+        else:
+            with open("tools.json", "r") as f:
+                self.tools = json.load(f)  # Load tools from the JSON file
 
-    def chat(self, messages) -> ChatResponse:
-        """Chat with optional tool support"""
+    def chat(self, messages, model=None, tools=None) -> ChatResponse:
+        """Chat with optional tool support, optionally overriding the default model"""
         # Build request parameters
         params = {
-            'model': self.model,
+            'model': model or self.model,
             'messages': messages,
-            #'tools': self.tools,
             'options': self.options
         }
 
+        if tools:
+            params['tools'] = tools
+
         response = self.client.chat(**params)
-        print(response)
         return response
 
     def chat_stream(self, messages, tools=None):
@@ -55,11 +44,47 @@ class OllamaManager:
             'stream': True
         }
 
-        if tools or self.tools:
-            params['tools'] = tools or self.tools
+        if tools:
+            params['tools'] = tools
 
         return self.client.chat(**params)
 
+    async def achat(self, messages, model=None, tools=None, keep_alive=None, options=None) -> ChatResponse:
+        """Async variant of chat; keep_alive sets how long the model stays loaded afterwards, options override the defaults"""
+        params = {
+            'model': model or self.model,
+            'messages': messages,
+            'options': self.options if options is None else options
+        }
+
+        if tools:
+            params['tools'] = tools
+        if keep_alive is not None:
+            params['keep_alive'] = keep_alive
+
+        return await self.async_client.chat(**params)
+
+    async def achat_stream(self, messages, model=None, tools=None, keep_alive=None, options=None):
+        """Async variant of chat_stream, optionally overriding the default model and options"""
+        params = {
+            'model': model or self.model,
+            'messages': messages,
+            'options': self.options if options is None else options,
+            'stream': True
+        }
+
+        if tools:
+            params['tools'] = tools
+        if keep_alive is not None:
+            params['keep_alive'] = keep_alive
+
+        return await self.async_client.chat(**params)
+
+    async def aembed(self, model, text):
+        """Embed a piece of text with the given embedding model"""
+        response = await self.async_client.embed(model=model, input=text)
+        return response.embeddings[0]
+
     def set_tools(self, tools):
         """Update default tools"""
         self.tools = tools
\ No newline at end of file
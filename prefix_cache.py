@@ -0,0 +1,157 @@
+import threading
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+import metrics
+from client_pool import vllm_base_url
+
+# Prefix cache counters by vLLM version: the V1 engine names first, then the older gpu_ ones.
+# Both count prompt tokens.
+QUERY_COUNTERS = ("vllm:prefix_cache_queries", "vllm:gpu_prefix_cache_queries")
+HIT_COUNTERS = ("vllm:prefix_cache_hits", "vllm:gpu_prefix_cache_hits")
+
+
+def metrics_url(base_url: str) -> str:
+    """vLLM serves /metrics next to /v1, at the root of the server"""
+    base_url = base_url.rstrip("/")
+    if base_url.endswith("/v1"):
+        base_url = base_url[:-len("/v1")]
+    return f"{base_url}/metrics"
+
+
+def parse_prefix_cache_counters(text: str) -> Optional[Tuple[float, float]]:
+    """
+    Read the prefix cache counters from a vLLM /metrics page.
+
+    Args:
+        text (str): Prometheus text exposition
+
+    Returns:
+        Optional[Tuple[float, float]]: Queried and hit prompt tokens summed over all models,
+        or None if the server does not export them (prefix caching disabled or an old vLLM)
+    """
+    from prometheus_client.parser import text_string_to_metric_families
+
+    totals: Dict[str, float] = {}
+    for family in text_string_to_metric_families(text):
+        for sample in family.samples:
+            name = sample.name[:-len("_total")] if sample.name.endswith("_total") else sample.name
+            if name in QUERY_COUNTERS or name in HIT_COUNTERS:
+                totals[name] = totals.get(name, 0.0) + sample.value
+
+    queries = next((totals[name] for name in QUERY_COUNTERS if name in totals), None)
+    hits = next((totals[name] for name in HIT_COUNTERS if name in totals), None)
+    if queries is None or hits is None:
+        return None
+    return queries, hits
+
+
+class PrefixCacheMonitor:
+    """
+    Tracks the prefix cache hit rate of the vLLM endpoints.
+
+    Every interval seconds the /metrics page of each endpoint is scraped and the
+    share of prompt tokens served from the cache since the previous scrape is
+    exported as aiui_vllm_prefix_cache_hit_rate. A high rate means the requests
+    share their prefix (system prompt, tools, earlier turns) and only the new
+    turn is prefilled.
+    """
+
+    def __init__(self, config: Mapping):
+        # Read on every pass, so the endpoints follow config.yaml reloads
+        self.config = config
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._previous: Dict[str, Tuple[float, float]] = {}
+
+    def _settings(self) -> Mapping:
+        return self.config.get("prefix_cache", {})
+
+    def endpoints(self) -> List[str]:
+        """Base URLs of the vLLM endpoints serving the chat model"""
+        vllm_config = self.config["vllm_config"]
+        return list(dict.fromkeys([vllm_base_url(self.config)] + list(vllm_config.get("endpoints", []))))
+
+    def sample(self, client: httpx.Client) -> Dict[str, float]:
+        """
+        Scrape every endpoint once and update the hit rate gauges.
+
+        Args:
+            client (httpx.Client): HTTP client for the scrapes
+
+        Returns:
+            Dict[str, float]: Hit rate of each endpoint since its previous sample; endpoints
+            that failed, export no counters or received no requests are left out
+        """
+        api_key = self.config["vllm_config"].get("api_key", "EMPTY")
+        rates = {}
+        for endpoint in self.endpoints():
+            try:
+                response = client.get(metrics_url(endpoint), headers={"Authorization": f"Bearer {api_key}"})
+                response.raise_for_status()
+                counters = parse_prefix_cache_counters(response.text)
+            except Exception as e:
+                print(f"Failed to read the prefix cache metrics of {endpoint}: {str(e)}")
+                continue
+            if counters is None:
+                continue
+
+            queries, hits = counters
+            metrics.VLLM_PREFIX_CACHE_TOKENS.labels(endpoint=endpoint, type="queries").set(queries)
+            metrics.VLLM_PREFIX_CACHE_TOKENS.labels(endpoint=endpoint, type="hits").set(hits)
+
+            previous_queries, previous_hits = self._previous.get(endpoint, (0.0, 0.0))
+            if queries < previous_queries:
+                # The endpoint restarted and its counters were reset
+                previous_queries, previous_hits = 0.0, 0.0
+            self._previous[endpoint] = counters
+
+            if queries > previous_queries:
+                rates[endpoint] = (hits - previous_hits) / (queries - previous_queries)
+                metrics.VLLM_PREFIX_CACHE_HIT_RATE.labels(endpoint=endpoint).set(rates[endpoint])
+        return rates
+
+    def start(self) -> None:
+        """Scrape the endpoints in a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="prefix-cache-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        with httpx.Client(timeout=self._settings().get("timeout", 5)) as client:
+            while not self._stop.is_set():
+                if not self.config["ollama"]["enabled"]:
+                    self.sample(client)
+                if self._stop.wait(self._settings().get("interval", 60)):
+                    return
+
+
+_monitor: Optional[PrefixCacheMonitor] = None
+_monitor_lock = threading.Lock()
+
+
+def start_prefix_cache_monitor(config: Mapping) -> Optional[PrefixCacheMonitor]:
+    """
+    Start the process-wide prefix cache monitor, once; nothing to do with Ollama or when it is disabled.
+
+    Args:
+        config (Mapping): Configuration
+
+    Returns:
+        Optional[PrefixCacheMonitor]: The running monitor
+    """
+    global _monitor
+    if config["ollama"]["enabled"] or not config.get("prefix_cache", {}).get("enabled", False):
+        return None
+
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = PrefixCacheMonitor(config)
+            _monitor.start()
+        return _monitor
@@ -0,0 +1,35 @@
+from typing import Dict, List
+
+import system_prompts
+
+
+def user_turn(prompt: str) -> Dict:
+    """Wrap a user prompt the same way every time it is sent, in this turn and in later ones"""
+    return {"role": "user", "content": system_prompts.user_message.format(prompt=prompt)}
+
+
+def chat_messages(system_prompt: str, history: List[Dict], prompt: str) -> List[Dict]:
+    """
+    Lay out a chat request so consecutive requests share the longest possible prefix.
+
+    The system prompt comes first and never changes between turns, the earlier
+    turns follow exactly as they were sent before, and only the new prompt is
+    appended. Backends with prefix caching (vLLM automatic prefix caching, the
+    Ollama prompt cache) then only prefill the new turn instead of the whole
+    conversation. Tool schemas are rendered before the messages by the chat
+    template and are read once per process, so they stay stable as well.
+
+    Args:
+        system_prompt (str): System prompt of the conversation
+        history (List[Dict]): Earlier messages with the raw user prompts, as stored in the chat history
+        prompt (str): New user prompt
+
+    Returns:
+        List[Dict]: Messages to send to the model
+    """
+    messages = [{"role": "system", "content": system_prompt}]
+    for message in history:
+        messages.append(user_turn(message["content"]) if message["role"] == "user" else dict(message))
+    messages.append(user_turn(prompt))
+
+    return messages
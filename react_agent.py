@@ -0,0 +1,187 @@
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+import system_prompts
+from async_runtime import check_deadline
+from tool_runner import ToolCall, dispatch_tool_calls
+
+# Sends the conversation to the model and yields its output as it arrives.
+# Closing the iterator must cancel the request.
+Complete = Callable[[List[Dict]], Iterator[str]]
+
+ANSWER = "Answer:"
+THOUGHT = re.compile(r"^\s*Thought:\s*(?P<thought>.*)$", re.MULTILINE)
+ACTION = re.compile(r"^\s*Action:\s*(?P<name>[^\n]+?)\s*$", re.MULTILINE)
+ACTION_INPUT = re.compile(r"\s*Action Input:\s*")
+# The model is writing the observation it should wait for
+OBSERVATION = re.compile(r"^\s*Observation\b", re.MULTILINE)
+
+
+@dataclass
+class ReActStep:
+    """What the model wrote in one step: its reasoning, and either actions to run or the answer"""
+    thought: Optional[str] = None
+    actions: List[ToolCall] = field(default_factory=list)
+    answer: Optional[str] = None
+
+
+def describe_tools(tools: List[Dict]) -> str:
+    """Render OpenAI-style function definitions as the tool list of the ReAct prompt"""
+    lines = []
+    for tool in tools:
+        function = tool.get("function", tool)
+        parameters = function.get("parameters", {}).get("properties", {})
+        signature = ", ".join(f"{name}: {schema.get('type', 'string')}" for name, schema in parameters.items())
+        lines.append(f"- {function['name']}({signature}): {function.get('description', '').strip()}")
+    return "\n".join(lines)
+
+
+def parse_step(text: str, step_number: int = 0) -> ReActStep:
+    """
+    Parse the text of one model step.
+
+    Every "Action:" line may be followed by an "Action Input:" JSON object,
+    which can span several lines. A JSON value that is not an object is passed
+    as {"input": value}.
+
+    Args:
+        text (str): Model output of the step
+        step_number (int): Step number, used for the ids of the actions
+
+    Returns:
+        ReActStep: Parsed step
+    """
+    step = ReActStep()
+
+    thought = THOUGHT.search(text)
+    if thought:
+        step.thought = thought.group("thought").strip()
+
+    if ANSWER in text:
+        step.answer = text.split(ANSWER, 1)[1].strip()
+        return step
+
+    decoder = json.JSONDecoder()
+    for index, action in enumerate(ACTION.finditer(text)):
+        arguments: Dict = {}
+        action_input = ACTION_INPUT.match(text, action.end())
+        if action_input:
+            try:
+                value, _ = decoder.raw_decode(text, action_input.end())
+                arguments = value if isinstance(value, dict) else {"input": value}
+            except ValueError:
+                # Not JSON; pass the rest of the line as a single input
+                arguments = {"input": text[action_input.end():].split("\n", 1)[0].strip()}
+        step.actions.append(ToolCall(id=f"react-{step_number}-{index}", name=action.group("name"),
+                                     arguments=arguments))
+
+    return step
+
+
+def observation_message(actions: List[ToolCall], results: List[str], final: bool = False) -> Dict:
+    """Report the results of a step's actions back to the model"""
+    lines = [f"Observation ({action.name}): {result}" for action, result in zip(actions, results)]
+    if final:
+        lines.append("You have no steps left. Give your Answer now with what you have.")
+    return {"role": "user", "content": "\n".join(lines)}
+
+
+def fallback_answer(text: str, step: ReActStep) -> str:
+    """The answer to show when the model wrote no usable one: its reasoning, or else its raw text"""
+    raw = text.replace(ANSWER, "").strip()
+    return step.thought or raw or "I could not find an answer."
+
+
+class ReActAgent:
+    """
+    Tool use for models without native tool calling, in the ReAct format
+    (Thought / Action / Action Input / Observation / Answer).
+
+    The conversation is only ever extended: each step appends the model's text
+    and one message with the observations, so the prompt of the next step starts
+    with the previous one and the backend's prefix cache covers it. The output
+    is streamed: once the model writes "Answer:" the rest of its text goes
+    straight to the caller, and a step is cut off as soon as the model starts to
+    make up an observation. Several actions in one step run concurrently.
+    """
+
+    def __init__(self, complete: Complete, tools: List[Dict], dispatch: Callable[[str, Dict], str],
+                 max_steps: int = 10, max_workers: int = 4):
+        self.complete = complete
+        self.tools = tools
+        self.dispatch = dispatch
+        self.max_steps = max_steps
+        self.max_workers = max_workers
+
+        self.tool_names = {tool.get("function", tool)["name"] for tool in tools}
+        self.instructions = system_prompts.react_prompt.format(tools=describe_tools(tools))
+
+    def run(self, messages: List[Dict], deadline: Optional[float] = None) -> Iterator[str]:
+        """
+        Answer the last message of a conversation, calling tools as the model asks.
+
+        Args:
+            messages (List[Dict]): Conversation to answer; extended in place with the steps
+            deadline (Optional[float]): time.monotonic() value after which no step or action is started
+
+        Returns:
+            Iterator[str]: The answer, as the model writes it
+
+        Raises:
+            DeadlineExceeded: If the deadline passes between steps
+        """
+        # Many chat templates take a single system message, so the instructions join the existing one
+        if messages and messages[0]["role"] == "system":
+            messages[0] = {**messages[0], "content": f"{messages[0]['content'].rstrip()}\n{self.instructions}"}
+        else:
+            messages.insert(0, {"role": "system", "content": self.instructions})
+
+        for step_number in range(self.max_steps):
+            check_deadline(deadline)
+            text = ""
+            # Position in text of the answer's part that was not passed on yet
+            answer_from = None
+            answering = False
+            output = self.complete(messages)
+            try:
+                for chunk in output:
+                    text += chunk
+                    if answer_from is None:
+                        observation = OBSERVATION.search(text)
+                        if ANSWER in text:
+                            answer_from = text.index(ANSWER) + len(ANSWER)
+                        elif observation:
+                            text = text[:observation.start()]
+                            break
+                    if answer_from is not None and text[answer_from:].strip():
+                        # Leave out the whitespace after "Answer:"
+                        yield text[answer_from:] if answering else text[answer_from:].lstrip()
+                        answer_from = len(text)
+                        answering = True
+            finally:
+                close = getattr(output, "close", None)
+                if close is not None:
+                    close()
+
+            if answering:
+                return
+
+            step = parse_step(text, step_number)
+            if answer_from is not None or not step.actions:
+                # An empty answer, or neither an action nor an answer: take the text as the answer
+                yield fallback_answer(text, step)
+                return
+
+            messages.append({"role": "assistant", "content": text.strip()})
+            check_deadline(deadline)
+            results = dispatch_tool_calls(step.actions, self._dispatch, self.max_workers)
+            messages.append(observation_message(step.actions, results, final=step_number == self.max_steps - 2))
+
+        yield f"I could not find an answer within {self.max_steps} steps."
+
+    def _dispatch(self, tool_name: str, tool_params: Dict) -> str:
+        if tool_name not in self.tool_names:
+            raise ValueError(f"Unknown tool {tool_name}")
+        return self.dispatch(tool_name, tool_params)
@@ -0,0 +1,211 @@
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import metrics
+from async_runtime import DeadlineExceeded
+
+
+class SchedulerError(Exception):
+    """A chat request was not admitted to the model backends"""
+
+
+class QueueFull(SchedulerError):
+    """The queue, or the user's share of it, is full"""
+
+
+class QueueTimeout(SchedulerError, TimeoutError):
+    """The request waited longer than queue_timeout"""
+
+
+@dataclass
+class Ticket:
+    """A chat turn waiting for, or holding, one of the backend slots"""
+    id: int
+    user: str
+    enqueued_at: float = field(default_factory=time.monotonic)
+    admitted_at: Optional[float] = None
+    # Refreshed while the owner waits; abandoned tickets are dropped
+    seen_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def admitted(self) -> bool:
+        return self.admitted_at is not None
+
+
+class RequestScheduler:
+    """
+    Admission control in front of the model backends.
+
+    At most max_concurrent chat turns run at once and each user runs at most
+    max_per_user of them; other turns wait in a bounded queue. Waiting turns
+    are admitted in arrival order, skipping users who already have a turn
+    running, so one user's tabs cannot take the slots of everyone else.
+
+    A turn keeps its slot for all of its model and tool calls. Slots are leased:
+    a turn that is not released within lease seconds, e.g. because its session
+    died mid-stream, is reclaimed, and a waiting turn whose owner stopped
+    polling for abandon_after seconds is dropped.
+    """
+
+    def __init__(self, max_concurrent: int = 4, max_per_user: int = 1, max_queue: int = 32,
+                 max_queued_per_user: int = 2, queue_timeout: float = 120, lease: float = 300,
+                 abandon_after: float = 10):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.max_queued_per_user = max_queued_per_user
+        self.queue_timeout = queue_timeout
+        self.lease = lease
+        self.abandon_after = abandon_after
+
+        self._ids = itertools.count(1)
+        self._changed = threading.Condition()
+        self._waiting: List[Ticket] = []
+        self._running: Dict[int, Ticket] = {}
+
+    def submit(self, user: str) -> Ticket:
+        """
+        Queue a chat turn, admitting it at once when a slot is free.
+
+        Args:
+            user (str): User the turn belongs to
+
+        Returns:
+            Ticket: The queued or admitted turn
+
+        Raises:
+            QueueFull: If the queue or the user's share of it is full
+        """
+        with self._changed:
+            self._expire()
+            if len(self._waiting) >= self.max_queue:
+                metrics.SCHEDULER_REJECTIONS.labels(reason="queue_full").inc()
+                raise QueueFull("The assistant is busy, please try again in a moment")
+            if sum(ticket.user == user for ticket in self._waiting) >= self.max_queued_per_user:
+                metrics.SCHEDULER_REJECTIONS.labels(reason="user_queue_full").inc()
+                raise QueueFull("You already have requests waiting, please wait for them to finish")
+
+            ticket = Ticket(next(self._ids), user)
+            self._waiting.append(ticket)
+            self._admit()
+            return ticket
+
+    def position(self, ticket: Ticket) -> int:
+        """1-based place of a waiting turn in the queue; 0 once it is admitted"""
+        with self._changed:
+            if ticket.admitted:
+                return 0
+            ticket.seen_at = time.monotonic()
+            for index, waiting in enumerate(self._waiting):
+                if waiting.id == ticket.id:
+                    return index + 1
+            return 0
+
+    def wait(self, ticket: Ticket, timeout: float) -> bool:
+        """
+        Wait up to timeout seconds for a turn to be admitted.
+
+        Args:
+            ticket (Ticket): Queued turn
+            timeout (float): Seconds to wait in this call; callers poll to update the UI
+
+        Returns:
+            bool: True once the turn is admitted
+
+        Raises:
+            QueueTimeout: If the turn has waited longer than queue_timeout in total
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while not ticket.admitted:
+                now = time.monotonic()
+                ticket.seen_at = now
+                if now - ticket.enqueued_at >= self.queue_timeout:
+                    self._remove(ticket, "timeout")
+                    raise QueueTimeout(f"No answer slot freed up within {self.queue_timeout:g}s, please try again")
+                if now >= deadline:
+                    return False
+                self._changed.wait(min(deadline, ticket.enqueued_at + self.queue_timeout) - now)
+                self._expire()
+            return True
+
+    def release(self, ticket: Ticket) -> None:
+        """Give back the slot of a finished turn, or withdraw a waiting one"""
+        with self._changed:
+            self._remove(ticket, "cancelled")
+
+    def stats(self) -> Dict[str, int]:
+        """Current number of running and waiting turns"""
+        with self._changed:
+            return {"running": len(self._running), "waiting": len(self._waiting)}
+
+    def _remove(self, ticket: Ticket, outcome: str) -> None:
+        if self._running.pop(ticket.id, None) is not None:
+            metrics.SCHEDULER_RUN_DURATION.observe(time.monotonic() - ticket.admitted_at)
+        elif ticket in self._waiting:
+            self._waiting.remove(ticket)
+            metrics.SCHEDULER_QUEUE_WAIT.labels(outcome=outcome).observe(time.monotonic() - ticket.enqueued_at)
+        self._admit()
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for ticket in [ticket for ticket in self._running.values() if now - ticket.admitted_at > self.lease]:
+            print(f"Reclaiming the backend slot of {ticket.user} after {self.lease:g}s")
+            self._remove(ticket, "expired")
+        for ticket in [ticket for ticket in self._waiting if now - ticket.seen_at > self.abandon_after]:
+            self._remove(ticket, "abandoned")
+
+    def _admit(self) -> None:
+        running_per_user: Dict[str, int] = {}
+        for ticket in self._running.values():
+            running_per_user[ticket.user] = running_per_user.get(ticket.user, 0) + 1
+
+        for ticket in list(self._waiting):
+            if len(self._running) >= self.max_concurrent:
+                break
+            if running_per_user.get(ticket.user, 0) >= self.max_per_user:
+                continue
+            self._waiting.remove(ticket)
+            ticket.admitted_at = time.monotonic()
+            self._running[ticket.id] = ticket
+            running_per_user[ticket.user] = running_per_user.get(ticket.user, 0) + 1
+            metrics.SCHEDULER_QUEUE_WAIT.labels(outcome="admitted").observe(ticket.admitted_at - ticket.enqueued_at)
+
+        metrics.SCHEDULER_RUNNING.set(len(self._running))
+        metrics.SCHEDULER_WAITING.set(len(self._waiting))
+        self._changed.notify_all()
+
+
+def until_deadline(chunks: Iterable[str], deadline: float, notice: str) -> Iterator[str]:
+    """
+    Pass chunks through until a monotonic deadline, then stop the underlying iterator.
+
+    Closing the iterator cancels the backend stream. The deadline is checked
+    between chunks here; a turn that also passes it to its model calls and
+    steps is cut off while it waits, raising DeadlineExceeded, which ends the
+    output the same way.
+
+    Args:
+        chunks (Iterable[str]): Model output
+        deadline (float): time.monotonic() value after which the output is cut off
+        notice (str): Text appended when the output is cut off
+
+    Returns:
+        Iterator[str]: The output, possibly truncated
+    """
+    iterator = iter(chunks)
+    try:
+        for chunk in iterator:
+            yield chunk
+            if time.monotonic() >= deadline:
+                yield notice
+                return
+    except DeadlineExceeded:
+        yield notice
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,196 @@
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import metrics
+
+# Offered to the model next to the toolbox tools while result shaping is enabled
+MORE_RESULTS_TOOL = "more_tool_results"
+
+
+@dataclass
+class ShapedResult:
+    """A tool result rendered for the model, split into pages of at most the token budget"""
+    tool_name: str
+    header: str
+    # Rendered rows, or slices of the text for results that are not tabular
+    units: List[str]
+    # Whether units are table rows, counted as such in the page footers
+    tabular: bool
+    created_at: float
+
+
+def cell(value: Any, max_chars: int) -> str:
+    """Render one value as a table cell, on one line and cut to max_chars"""
+    if value is None:
+        return ""
+    text = value if isinstance(value, str) else json.dumps(value, default=str, separators=(",", ":"))
+    text = " ".join(text.split()).replace("|", "/")
+    if max_chars and len(text) > max_chars:
+        text = text[:max_chars - 1].rstrip() + "…"
+    return text
+
+
+def parse_rows(result: str) -> Optional[List[Dict]]:
+    """The rows of a JSON result holding an object or a list of objects, or None for any other result"""
+    try:
+        value = json.loads(result)
+    except (TypeError, ValueError):
+        return None
+    if isinstance(value, dict):
+        return [value]
+    if isinstance(value, list) and value and all(isinstance(row, dict) for row in value):
+        return value
+    return None
+
+
+class ResultShaper:
+    """
+    Compacts tool results before they are added to the conversation.
+
+    JSON rows are projected to the columns configured for the tool and rendered
+    as a pipe-separated table under a single header line, with long text cut to
+    max_field_chars. A result over max_tokens is split into pages: the model
+    gets the first one with a handle to request the next from the
+    more_tool_results tool. Pages are built from the cached tool result, so the
+    tool is not called again for them.
+    """
+
+    def __init__(self, columns: Optional[Dict[str, List[str]]] = None, max_tokens: int = 1500,
+                 max_field_chars: int = 120, chars_per_token: int = 4, max_results: int = 128,
+                 result_ttl: float = 900):
+        # Columns to keep per tool; tools not listed keep all their columns
+        self.columns = columns or {}
+        self.max_tokens = max_tokens
+        self.max_field_chars = max_field_chars
+        self.chars_per_token = chars_per_token
+        self.max_results = max_results
+        self.result_ttl = result_ttl
+
+        self._lock = threading.Lock()
+        self._results: OrderedDict = OrderedDict()
+
+    def count_tokens(self, text: str) -> int:
+        """Approximate the token count of a piece of text"""
+        return len(text) // self.chars_per_token + 1
+
+    @staticmethod
+    def tool_definition() -> Dict:
+        """The more_tool_results tool in the OpenAI function format"""
+        return {"type": "function", "function": {
+            "name": MORE_RESULTS_TOOL,
+            "description": "Get the next page of a tool result that was cut off. Only call it when the rows "
+                           "you already have do not answer the question.",
+            "parameters": {
+                "type": "object",
+                "properties": {"handle": {"type": "string", "description": "Handle given at the end of the page"}},
+                "required": ["handle"],
+            },
+        }}
+
+    def shape(self, tool_name: str, result: str) -> str:
+        """
+        Render a tool result for the model.
+
+        Args:
+            tool_name (str): Name of the tool that produced the result
+            result (str): Raw tool result, usually JSON rows
+
+        Returns:
+            str: The compacted result, or its first page with a continuation handle
+        """
+        rows = parse_rows(result)
+        if rows is None:
+            if self.count_tokens(result) <= self.max_tokens:
+                return self._count(tool_name, result, result)
+            page_chars = self.max_tokens * self.chars_per_token
+            shaped = ShapedResult(tool_name, "", [result[start:start + page_chars]
+                                                  for start in range(0, len(result), page_chars)],
+                                  tabular=False, created_at=time.monotonic())
+        else:
+            columns = self.columns.get(tool_name) or list(dict.fromkeys(key for row in rows for key in row))
+            shaped = ShapedResult(
+                tool_name,
+                header="|".join(columns),
+                units=["|".join(cell(row.get(column), self.max_field_chars) for column in columns) for row in rows],
+                tabular=True,
+                created_at=time.monotonic(),
+            )
+
+        return self._count(tool_name, result, self._page(shaped, None, 0))
+
+    def more(self, handle: str) -> str:
+        """
+        Get a page of a result that was cut off.
+
+        Args:
+            handle (str): Continuation handle from the end of the previous page
+
+        Returns:
+            str: The page, with the handle of the next one if there is more
+
+        Raises:
+            ValueError: If the handle is malformed, unknown or expired
+        """
+        result_id, _, offset = str(handle).partition(":")
+        with self._lock:
+            self._expire()
+            shaped = self._results.get(result_id)
+        if shaped is None or not offset.isdigit() or int(offset) >= len(shaped.units):
+            raise ValueError(f"Unknown or expired handle {handle}; call the original tool again")
+
+        return self._count(MORE_RESULTS_TOOL, "", self._page(shaped, result_id, int(offset)))
+
+    def _page(self, shaped: ShapedResult, result_id: Optional[str], offset: int) -> str:
+        lines = [shaped.header] if shaped.header else []
+        used = self.count_tokens(shaped.header) if shaped.header else 0
+        end = offset
+        # Always at least one unit per page, so every page makes progress
+        while end < len(shaped.units):
+            tokens = self.count_tokens(shaped.units[end])
+            if end > offset and used + tokens > self.max_tokens:
+                break
+            used += tokens
+            lines.append(shaped.units[end])
+            end += 1
+
+        if shaped.tabular:
+            if offset or end < len(shaped.units):
+                footer = f"(rows {offset + 1}-{end} of {len(shaped.units)}"
+            else:
+                footer = f"({len(shaped.units)} rows"
+            lines.append(footer + (", long values cut with …)" if self.max_field_chars else ")"))
+
+        if end < len(shaped.units):
+            if result_id is None:
+                result_id = self._store(shaped)
+            lines.append(f'More: call {MORE_RESULTS_TOOL} with {{"handle": "{result_id}:{end}"}}')
+        return "\n".join(lines)
+
+    def _store(self, shaped: ShapedResult) -> str:
+        result_id = secrets.token_hex(4)
+        with self._lock:
+            self._expire()
+            self._results[result_id] = shaped
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+        return result_id
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        while self._results:
+            result_id, shaped = next(iter(self._results.items()))
+            if now - shaped.created_at < self.result_ttl:
+                return
+            del self._results[result_id]
+
+    @staticmethod
+    def _count(tool_name: str, raw: str, shaped: str) -> str:
+        if raw:
+            metrics.TOOL_RESULT_CHARS.labels(tool=tool_name, stage="raw").inc(len(raw))
+        metrics.TOOL_RESULT_CHARS.labels(tool=tool_name, stage="shaped").inc(len(shaped))
+        return shaped
@@ -0,0 +1,119 @@
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+import metrics
+
+
+class SemanticCache:
+    """Bounded LRU cache of answers looked up by embedding similarity of the user prompt"""
+
+    def __init__(self, embed: Callable[[str], List[float]], similarity_threshold: float = 0.92,
+                 ttl: float = 600, max_entries: int = 500):
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        # normalized prompt -> (unit embedding, answer, stored at)
+        self._entries: OrderedDict = OrderedDict()
+        # embeddings computed by recent misses, reused when the answer is stored
+        self._recent_embeddings: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(prompt: str) -> str:
+        """Lowercase the prompt, collapse whitespace and drop trailing punctuation"""
+        return re.sub(r"\s+", " ", prompt).strip().lower().rstrip("?!. ")
+
+    def lookup(self, prompt: str) -> Optional[str]:
+        """
+        Find a fresh answer to a sufficiently similar earlier prompt.
+
+        Args:
+            prompt (str): User prompt
+
+        Returns:
+            Optional[str]: Cached answer, or None on a miss
+        """
+        key = self.normalize(prompt)
+
+        with self._lock:
+            self._purge_expired()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._count(hit=True)
+                return self._entries[key][1]
+            if not self._entries:
+                self._count(hit=False)
+                return None
+
+        embedding = self._embedding(key)
+
+        with self._lock:
+            best_key, best_similarity = None, self.similarity_threshold
+            for entry_key, (entry_embedding, _, _) in self._entries.items():
+                similarity = sum(a * b for a, b in zip(embedding, entry_embedding))
+                if similarity >= best_similarity:
+                    best_key, best_similarity = entry_key, similarity
+
+            if best_key is None:
+                self._count(hit=False)
+                return None
+
+            self._entries.move_to_end(best_key)
+            self._count(hit=True)
+            return self._entries[best_key][1]
+
+    def store(self, prompt: str, answer: str) -> None:
+        """Remember the answer to a prompt, evicting the least recently used entries beyond max_entries"""
+        key = self.normalize(prompt)
+        embedding = self._embedding(key)
+
+        with self._lock:
+            self._entries[key] = (embedding, answer, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _embedding(self, key: str) -> List[float]:
+        with self._lock:
+            if key in self._recent_embeddings:
+                return self._recent_embeddings[key]
+
+        embedding = self._unit(self.embed(key))
+
+        with self._lock:
+            self._recent_embeddings[key] = embedding
+            while len(self._recent_embeddings) > 64:
+                self._recent_embeddings.popitem(last=False)
+
+        return embedding
+
+    def _count(self, hit: bool) -> None:
+        # Called with the lock held
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        metrics.SEMANTIC_CACHE_LOOKUPS.labels(result="hit" if hit else "miss").inc()
+
+    def _purge_expired(self) -> None:
+        cutoff = time.monotonic() - self.ttl
+        for key in [key for key, (_, _, stored_at) in self._entries.items() if stored_at < cutoff]:
+            del self._entries[key]
+
+    @staticmethod
+    def _unit(vector: List[float]) -> List[float]:
+        """Scale a vector to unit length so cosine similarity becomes a dot product"""
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
@@ -0,0 +1,39 @@
+"""
+Container entry point: serves the metrics and health endpoints and starts the model
+warm-up and the prefix cache monitor, then runs Streamlit in the same process.
+
+Streamlit only executes app.py when a browser session connects, so a side server
+started from the app would not answer the readiness probe of a pod that receives
+no traffic yet. Starting it here serves /healthz and /readyz from process start.
+
+    python server.py [streamlit run options]
+"""
+import os
+import sys
+
+import metrics
+from health import get_health_checker
+from model_warmup import start_model_warmer
+from prefix_cache import start_prefix_cache_monitor
+from settings import config
+
+
+def main() -> int:
+    metrics_config = config.get("metrics", {})
+    if metrics_config.get("enabled", False) or config.get("health", {}).get("enabled", False):
+        metrics.start_metrics_server(metrics_config.get("port", 9100), get_health_checker(config).routes())
+
+    # Load the models while Streamlit starts, before the first user asks anything
+    start_model_warmer(config)
+    start_prefix_cache_monitor(config)
+
+    # Imported late: it is the slowest import and the side server should answer probes early
+    from streamlit.web import cli
+
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+    sys.argv = ["streamlit", "run", app_path, *sys.argv[1:]]
+    return cli.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import base64
+import hashlib
+import hmac
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import jwt
+
+# Profile fields kept in the cookie; enough to render the page without asking Google again
+USER_FIELDS = ("email", "name", "picture")
+
+
+class SessionCookie:
+    """Signed, expiring login cookie so authenticated users skip the OAuth round trip on reload"""
+
+    def __init__(self, name: str, key: str, expiry_days: float = 1):
+        self.name = name
+        self.key = key
+        self.expiry_days = expiry_days
+
+    def expires_at(self) -> datetime:
+        """Expiry of a cookie issued now"""
+        return datetime.now(timezone.utc) + timedelta(days=self.expiry_days)
+
+    def encode(self, user_info: Dict) -> str:
+        """
+        Sign the user's profile into a cookie value.
+
+        Args:
+            user_info (Dict): Google userinfo response
+
+        Returns:
+            str: Cookie value
+        """
+        claims = {field: user_info.get(field) for field in USER_FIELDS if user_info.get(field)}
+        claims["exp"] = self.expires_at()
+        return jwt.encode(claims, self.key, algorithm="HS256")
+
+    def decode(self, value: Optional[str]) -> Optional[Dict]:
+        """
+        Verify a cookie value.
+
+        Args:
+            value (Optional[str]): Cookie value
+
+        Returns:
+            Optional[Dict]: The user's profile, or None if the cookie is missing, tampered with or expired
+        """
+        if not value:
+            return None
+
+        try:
+            claims = jwt.decode(value, self.key, algorithms=["HS256"])
+        except jwt.PyJWTError:
+            return None
+
+        return {field: claims[field] for field in USER_FIELDS if field in claims} if claims.get("email") else None
+
+    def code_verifier(self, state: str) -> str:
+        """
+        Derive the PKCE code verifier of a login from its OAuth state.
+
+        The callback may land on a new session or another replica, so the verifier
+        is recomputed from the state Google sends back instead of being kept in memory.
+
+        Args:
+            state (str): OAuth state parameter of the login
+
+        Returns:
+            str: Code verifier (43 URL-safe characters)
+        """
+        digest = hmac.new(self.key.encode(), f"pkce:{state}".encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).decode().rstrip("=")
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Tuple
+
+import yaml
+
+# Settings the code reads without a fallback: (section, key, type, default). A
+# default of REQUIRED means the key must be present in config.yaml.
+REQUIRED = object()
+SCHEMA: List[Tuple[str, str, type, Any]] = [
+    ("credentials", "enabled", bool, REQUIRED),
+    ("preauthorized", "emails", list, []),
+    ("ollama", "enabled", bool, True),
+    ("ollama", "host", str, "http://localhost:11434"),
+    ("ollama", "chat_model", str, REQUIRED),
+    ("ollama", "options", dict, {}),
+    ("vllm_config", "secure", bool, True),
+    ("vllm_config", "api_key", str, "EMPTY"),
+    ("vllm_config", "endpoints", list, []),
+]
+
+# Settings only needed when ollama.enabled is false
+VLLM_REQUIRED = [("base_url", str), ("namespace", str), ("chat_model", str)]
+
+
+class ConfigError(ValueError):
+    """config.yaml is missing settings or has settings of the wrong type"""
+
+
+def validate_config(config: Dict) -> Dict:
+    """
+    Check the configuration against the schema and fill in the defaults.
+
+    Args:
+        config (Dict): Parsed config.yaml
+
+    Returns:
+        Dict: The configuration with defaults applied
+
+    Raises:
+        ConfigError: If a setting is missing or has the wrong type
+    """
+    if not isinstance(config, dict):
+        raise ConfigError("config.yaml must contain a mapping")
+
+    errors = []
+    for section, key, expected, default in SCHEMA:
+        if config.get(section) is None:
+            config[section] = {}
+        values = config[section]
+        if not isinstance(values, dict):
+            errors.append(f"{section}: expected a section, got {type(values).__name__}")
+            continue
+
+        if key not in values or values[key] is None:
+            if default is REQUIRED:
+                errors.append(f"{section}.{key}: missing")
+            else:
+                values[key] = json.loads(json.dumps(default))
+        elif not isinstance(values[key], expected) or (expected is not bool and isinstance(values[key], bool)):
+            errors.append(f"{section}.{key}: expected {expected.__name__}, got {type(values[key]).__name__}")
+
+    if isinstance(config["ollama"], dict) and isinstance(config["vllm_config"], dict) \
+            and config["ollama"].get("enabled") is False:
+        for key, expected in VLLM_REQUIRED:
+            if not isinstance(config["vllm_config"].get(key), expected):
+                errors.append(f"vllm_config.{key}: required when ollama.enabled is false")
+
+    if errors:
+        raise ConfigError("Invalid configuration: " + "; ".join(errors))
+
+    return config
+
+
+def load_config(path: str) -> Dict:
+    """
+    Parse and validate a configuration file.
+
+    Args:
+        path (str): Path of config.yaml
+
+    Returns:
+        Dict: Validated configuration
+    """
+    with open(path, "r") as file:
+        return validate_config(yaml.safe_load(file))
+
+
+def section_signature(config: Mapping, *sections: str) -> str:
+    """
+    Fingerprint configuration sections, to rebuild what depends on them when they change.
+
+    Args:
+        config (Mapping): Configuration
+        *sections (str): Section names
+
+    Returns:
+        str: Stable hash of the sections
+    """
+    payload = json.dumps({section: config.get(section) for section in sections}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class ConfigManager:
+    """
+    Parses config.yaml once and hot-swaps it when the file changes.
+
+    The file is checked by polling its modification time, at most every
+    check_interval seconds and only when settings are read. An invalid update is
+    reported and ignored; the previous settings stay in effect.
+    """
+
+    def __init__(self, path: str, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.version = 0
+
+        self._lock = threading.Lock()
+        self._config = load_config(path)
+        self._signature = self._stat()
+        self._checked_at = time.monotonic()
+
+    def get(self) -> Dict:
+        """Return the current configuration; treat it as read-only"""
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._reload_if_changed()
+        return self._config
+
+    def _reload_if_changed(self) -> None:
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.check_interval:
+                return
+            self._checked_at = time.monotonic()
+
+            signature = self._stat()
+            if signature == self._signature:
+                return
+
+            try:
+                config = load_config(self.path)
+            except Exception as e:
+                # e.g. a ConfigMap update that is half written or has a typo
+                print(f"Ignoring invalid update of {self.path}: {str(e)}")
+                return
+            finally:
+                self._signature = signature
+
+            self._config = config
+            self.version += 1
+            print(f"Reloaded {self.path} (version {self.version})")
+
+    def _stat(self) -> Tuple:
+        try:
+            # Resolve symlinks: ConfigMap volumes swap a ..data symlink on update
+            stat = os.stat(os.path.realpath(self.path))
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None, None
+
+
+class ConfigView(Mapping):
+    """Read-only mapping that always reflects the current configuration of a ConfigManager"""
+
+    def __init__(self, manager: ConfigManager):
+        self.manager = manager
+
+    def __getitem__(self, key: str) -> Any:
+        return self.manager.get()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.manager.get())
+
+    def __len__(self) -> int:
+        return len(self.manager.get())
+
+
+# The process-wide configuration, parsed once at import
+manager = ConfigManager(
+    os.environ.get("CONFIG_PATH", "config.yaml"),
+    check_interval=float(os.environ.get("CONFIG_RELOAD_INTERVAL", 5)),
+)
+config = ConfigView(manager)
@@ -0,0 +1,156 @@
+"""
+Startup cost measurement.
+
+With AIUI_PROFILE_STARTUP=1 the import time of every module and the duration
+of the decorated initializers are recorded, and a report of the most
+expensive ones is printed once the first page has rendered. Without it the
+hooks are not installed and the decorator returns the function unchanged.
+
+The report can also be produced without starting Streamlit:
+    python startup_timing.py
+"""
+import functools
+import importlib.abc
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+ENABLED = os.environ.get("AIUI_PROFILE_STARTUP", "").lower() in ("1", "true", "yes")
+
+_lock = threading.Lock()
+# module -> (inclusive seconds, exclusive seconds); exclusive excludes nested imports
+_imports: Dict[str, Tuple[float, float]] = {}
+_inits: List[Tuple[str, float]] = []
+_stack = threading.local()
+_started = time.perf_counter()
+_reported = False
+
+
+class _TimingLoader(importlib.abc.Loader):
+    """Wraps a module loader to time its execution"""
+
+    def __init__(self, loader: importlib.abc.Loader):
+        self.loader = loader
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        frames = _stack.__dict__.setdefault("frames", [])
+        frames.append(0.0)
+        started = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            inclusive = time.perf_counter() - started
+            nested = frames.pop()
+            if frames:
+                frames[-1] += inclusive
+            with _lock:
+                _imports[module.__name__] = (inclusive, inclusive - nested)
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    """Meta path hook that wraps the loaders found by the other finders"""
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimingLoader(spec.loader)
+                return spec
+        return None
+
+
+def install() -> None:
+    """Start timing imports; a no-op unless AIUI_PROFILE_STARTUP is set"""
+    if ENABLED and not any(isinstance(finder, _TimingFinder) for finder in sys.meta_path):
+        sys.meta_path.insert(0, _TimingFinder())
+
+
+def timed_init(func: Callable) -> Callable:
+    """Record the duration of an initializer; put it below @st.cache_resource so only real builds are timed"""
+    if not ENABLED:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with _lock:
+                _inits.append((func.__name__, time.perf_counter() - started))
+
+    return wrapper
+
+
+def report(top: int = 25) -> Optional[str]:
+    """
+    Format the recorded startup costs.
+
+    Args:
+        top (int): Number of modules to list
+
+    Returns:
+        Optional[str]: The report, or None when profiling is disabled
+    """
+    if not ENABLED:
+        return None
+
+    with _lock:
+        imports = dict(_imports)
+        inits = list(_inits)
+
+    # Group submodules under their top-level package, e.g. openai.types.* under openai
+    packages: Dict[str, float] = {}
+    for name, (_, exclusive) in imports.items():
+        package = name.split(".", 1)[0]
+        packages[package] = packages.get(package, 0.0) + exclusive
+
+    lines = [f"Startup profile: {time.perf_counter() - _started:.3f}s since the profiler was installed",
+             f"{'package':<40} {'import (s)':>10}"]
+    for package, seconds in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        lines.append(f"{package:<40} {seconds:>10.3f}")
+
+    if inits:
+        lines.append(f"{'initializer':<40} {'time (s)':>10}")
+        for name, seconds in inits:
+            lines.append(f"{name:<40} {seconds:>10.3f}")
+
+    return "\n".join(lines)
+
+
+def report_once() -> None:
+    """Print the report the first time it is called in the process"""
+    global _reported
+    with _lock:
+        if _reported:
+            return
+        _reported = True
+
+    text = report()
+    if text:
+        print(text)
+
+
+if __name__ == "__main__":
+    # This file runs as __main__ here; record through the startup_timing module the app imports
+    os.environ["AIUI_PROFILE_STARTUP"] = "1"
+    import startup_timing
+
+    startup_timing.install()
+    # Importing app runs its module level setup without rendering a page
+    import app
+
+    app.get_client_pool()
+    app.get_router()
+    startup_timing.report_once()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The app modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Benchmark script run by hand against the mock servers, not a test module
+collect_ignore = ["load_test.py"]
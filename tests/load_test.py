@@ -0,0 +1,377 @@
+"""
+Offline load test and latency benchmark.
+
+Starts the mock model server and the SQLite-backed mock toolbox, then drives
+the app's backend code (client pool, backend router, tool-calling loop,
+toolbox manager and tool result cache) with concurrent simulated chat
+sessions. Reports p50/p95/p99 turn latency, time to first token and
+throughput. No GPU, Ollama, MySQL or genai-toolbox is needed.
+
+    python tests/load_test.py --sessions 16 --turns 4
+    python tests/load_test.py --backend vllm --replicas 2 --json > baseline.json
+    python tests/load_test.py --baseline baseline.json --tolerance 0.2
+    python tests/load_test.py --mcp --no-tool-cache
+
+With --baseline the run exits non-zero when p95 latency, p95 time to first
+token or throughput regress by more than the tolerance.
+"""
+import argparse
+import copy
+import json
+import math
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INVOCATION_DIR = os.getcwd()
+# The app modules read config.yaml and tools.json relative to the working directory
+os.chdir(REPO_ROOT)
+sys.path.insert(0, REPO_ROOT)
+
+import metrics  # noqa: E402
+import system_prompts  # noqa: E402
+from client_pool import ClientPool  # noqa: E402
+from llm_backends import BackendRouter, VLLMBackend, create_router, router_step, tool_message  # noqa: E402
+from mcp_sessions import MCPServer, MCPSessionPool  # noqa: E402
+from mock_llm_server import MockLLMSettings, start_mock_llm_server  # noqa: E402
+from mock_toolbox_server import start_mock_toolbox_server  # noqa: E402
+from model_warmup import ModelWarmer  # noqa: E402
+from prefix_cache import metrics_url, parse_prefix_cache_counters  # noqa: E402
+from prompt_layout import chat_messages  # noqa: E402
+from react_agent import ReActAgent  # noqa: E402
+from request_scheduler import RequestScheduler  # noqa: E402
+from result_shaping import MORE_RESULTS_TOOL, ResultShaper  # noqa: E402
+from settings import load_config  # noqa: E402
+from tool_cache import ToolResultCache  # noqa: E402
+from tool_runner import run_tool_loop  # noqa: E402
+from toolbox_manager import ToolboxManager  # noqa: E402
+
+# Questions cycled through by every session; the lab questions make the model call the toolbox
+PROMPTS = [
+    "Which labs are active right now?",
+    "What can you help me with?",
+    "Show me the pending labs.",
+    "Explain what an OpenShift partner lab is.",
+    "List the completed labs.",
+    "How do I request an extension?",
+    "Compare the pending and approved labs.",
+]
+
+
+@dataclass
+class TurnResult:
+    """Timings of one simulated chat turn"""
+    latency: float
+    ttft: Optional[float]
+    chunks: int
+    error: Optional[str] = None
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of the values; 0 when there are none"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def build_config(args: argparse.Namespace, llm_url: str, toolbox_url: str) -> Dict:
+    """Point a copy of config.yaml at the mock servers"""
+    config = copy.deepcopy(load_config("config.yaml"))
+
+    config["ollama"]["enabled"] = args.backend == "ollama"
+    config["ollama"]["host"] = llm_url
+    config["toolbox"]["url"] = toolbox_url
+    config["tools"]["enabled"] = not args.no_tools
+    config["tool_cache"]["enabled"] = not args.no_tool_cache
+    config["tool_results"]["enabled"] = not args.no_result_shaping
+    config["client_pool"]["max_concurrency"] = args.max_concurrency
+    config["routing"]["cross_backend_failover"] = False
+
+    return config
+
+
+def build_router(args: argparse.Namespace, config: Dict, pool: ClientPool, llm_urls: List[str]) -> BackendRouter:
+    """Build the router the app would build, with the vLLM replicas replaced by the mock servers"""
+    if args.backend == "ollama":
+        return create_router(config, pool)
+
+    routing_config = config.get("routing", {})
+    backends = [
+        VLLMBackend(url, pool.vllm(f"{url}/v1"), {"chat": config["vllm_config"]["chat_model"]})
+        for url in llm_urls
+    ]
+    return BackendRouter(
+        backends,
+        pool,
+        latency_smoothing=routing_config.get("latency_smoothing", 0.3),
+        retry_after=routing_config.get("retry_after", 30),
+    )
+
+
+def completion_tokens() -> float:
+    """Total completion tokens recorded by the router across all backends"""
+    return sum(
+        sample.value
+        for metric in metrics.LLM_TOKENS.collect()
+        for sample in metric.samples
+        if sample.name.endswith("_total") and sample.labels.get("type") == "completion"
+    )
+
+
+def run_session(session: int, args: argparse.Namespace, config: Dict, router: BackendRouter, pool: ClientPool,
+                dispatch, scheduler: Optional[RequestScheduler], results: List[TurnResult],
+                lock: threading.Lock) -> None:
+    """Play one chat session turn by turn, recording the timings of every turn"""
+    tools = pool.tools() if config["tools"]["enabled"] else None
+    if tools and config["tool_results"]["enabled"]:
+        tools = tools + [ResultShaper.tool_definition()]
+    runtime = pool.runtime()
+    history: List[Dict] = []
+
+    def step(messages: List[Dict], allow_tools: bool):
+        return (yield from router_step(router, runtime, messages, tools=tools if allow_tools else None,
+                                       stream=not args.no_stream))
+
+    def complete(messages: List[Dict]):
+        return router_step(router, runtime, messages, stream=not args.no_stream)
+
+    for turn in range(args.turns):
+        prompt = PROMPTS[(session + turn) % len(PROMPTS)]
+        messages = chat_messages(system_prompts.default_persona, history, prompt)
+        started = time.monotonic()
+        ttft = None
+        content = []
+        error = None
+
+        ticket = None
+        try:
+            # Latency and TTFT include the queue wait, as users see it
+            if scheduler is not None:
+                ticket = scheduler.submit(f"session-{session}")
+                while not scheduler.wait(ticket, timeout=0.5):
+                    pass
+            if args.react and tools:
+                turn_output = ReActAgent(complete, tools, dispatch,
+                                         max_steps=config["tools"].get("react_max_steps", 10),
+                                         max_workers=config["tools"].get("max_workers", 4)).run(messages)
+            else:
+                turn_output = run_tool_loop(step, messages, dispatch, tool_message,
+                                            max_steps=config["tools"].get("max_steps", 5),
+                                            max_workers=config["tools"].get("max_workers", 4))
+            for chunk in turn_output:
+                if ttft is None:
+                    ttft = time.monotonic() - started
+                content.append(chunk)
+        except Exception as e:
+            error = str(e)
+        finally:
+            if ticket is not None:
+                scheduler.release(ticket)
+
+        result = TurnResult(latency=time.monotonic() - started, ttft=ttft, chunks=len(content), error=error)
+        with lock:
+            results.append(result)
+
+        # Keep the history the way the app stores it: the question and the final answer
+        history += [{"role": "user", "content": prompt}, {"role": "assistant", "content": "".join(content)}]
+
+
+def prefix_cache_counters(llm_urls: List[str]) -> Optional[List[float]]:
+    """Queried and hit prompt tokens of the mock vLLM prefix caches, summed over the replicas"""
+    totals = [0.0, 0.0]
+    for url in llm_urls:
+        counters = parse_prefix_cache_counters(httpx.get(metrics_url(url)).text)
+        if counters is None:
+            return None
+        totals = [total + value for total, value in zip(totals, counters)]
+    return totals
+
+
+def summarize(results: List[TurnResult], wall_time: float, tokens: float, tool_cache: Optional[ToolResultCache],
+              prefix_cache: Optional[List[float]] = None) -> Dict:
+    """Aggregate the turn timings into the report"""
+    succeeded = [result for result in results if result.error is None]
+    latencies = [result.latency for result in succeeded]
+    ttfts = [result.ttft for result in succeeded if result.ttft is not None]
+
+    return {
+        "turns": len(results),
+        "errors": len(results) - len(succeeded),
+        "wall_time_s": round(wall_time, 3),
+        "throughput_turns_per_s": round(len(succeeded) / wall_time, 3) if wall_time else 0.0,
+        "throughput_tokens_per_s": round(tokens / wall_time, 1) if wall_time else 0.0,
+        "latency_s": {name: round(percentile(latencies, fraction), 3)
+                      for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))},
+        "ttft_s": {name: round(percentile(ttfts, fraction), 3)
+                   for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))},
+        "tool_cache_hit_rate": round(tool_cache.hit_rate(), 3) if tool_cache else None,
+        "prefix_cache_hit_rate": round(prefix_cache[1] / prefix_cache[0], 3) if prefix_cache and prefix_cache[0] else None,
+        "sample_errors": sorted({result.error for result in results if result.error})[:3],
+    }
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """List the metrics that regressed beyond the tolerance relative to the baseline"""
+    regressions = []
+
+    for section in ("latency_s", "ttft_s"):
+        current, previous = report[section]["p95"], baseline[section]["p95"]
+        if previous and current > previous * (1 + tolerance):
+            regressions.append(f"{section} p95 {current:.3f}s vs baseline {previous:.3f}s")
+
+    current, previous = report["throughput_turns_per_s"], baseline["throughput_turns_per_s"]
+    if previous and current < previous * (1 - tolerance):
+        regressions.append(f"throughput {current:.3f} turns/s vs baseline {previous:.3f} turns/s")
+
+    if report["errors"] > baseline.get("errors", 0):
+        regressions.append(f"{report['errors']} failed turns vs baseline {baseline.get('errors', 0)}")
+
+    return regressions
+
+
+def print_report(report: Dict, args: argparse.Namespace) -> None:
+    print(f"backend={args.backend} sessions={args.sessions} turns/session={args.turns} "
+          f"stream={not args.no_stream} tools={'react' if args.react else not args.no_tools}")
+    print(f"turns: {report['turns']}  errors: {report['errors']}  wall time: {report['wall_time_s']}s")
+    print(f"throughput: {report['throughput_turns_per_s']} turns/s, {report['throughput_tokens_per_s']} tokens/s")
+    for label, section in (("latency", "latency_s"), ("TTFT", "ttft_s")):
+        values = report[section]
+        print(f"{label:>8}: p50 {values['p50']:.3f}s  p95 {values['p95']:.3f}s  p99 {values['p99']:.3f}s")
+    if report["tool_cache_hit_rate"] is not None:
+        print(f"tool cache hit rate: {report['tool_cache_hit_rate']:.0%}")
+    if report.get("prefix_cache_hit_rate") is not None:
+        print(f"prefix cache hit rate: {report['prefix_cache_hit_rate']:.0%} of prompt tokens")
+    for error in report["sample_errors"]:
+        print(f"error: {error}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline load test against mock model and toolbox servers")
+    parser.add_argument("--backend", choices=["ollama", "vllm"], default="ollama")
+    parser.add_argument("--replicas", type=int, default=1, help="Mock vLLM replicas behind the router")
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent chat sessions")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per session")
+    parser.add_argument("--ttft", type=float, default=0.2, help="Mock model seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Mock model token rate")
+    parser.add_argument("--completion-tokens", type=int, default=40, help="Tokens per mock answer")
+    parser.add_argument("--tool-latency", type=float, default=0.02, help="Extra seconds per mock tool call")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="Concurrent requests per backend")
+    parser.add_argument("--load-time", type=float, default=0.0,
+                        help="Seconds the mock Ollama server takes to load a model that is not in memory")
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=0.0,
+                        help="Mock vLLM prefill rate of prompt tokens missing from its prefix cache (0: instant)")
+    parser.add_argument("--warmup", action="store_true", help="Load the Ollama models before the sessions start")
+    parser.add_argument("--scheduler", type=int, default=0, metavar="MAX_CONCURRENT",
+                        help="Admit turns through the app's request scheduler with this concurrency cap (0: off)")
+    parser.add_argument("--react", action="store_true", help="Call the tools through the ReAct agent")
+    parser.add_argument("--mcp", action="store_true", help="Call the tools over MCP sessions instead of the toolbox SDK")
+    parser.add_argument("--no-stream", action="store_true", help="Request complete responses")
+    parser.add_argument("--no-tools", action="store_true", help="Do not offer tools to the model")
+    parser.add_argument("--no-tool-cache", action="store_true", help="Disable the tool result cache")
+    parser.add_argument("--no-result-shaping", action="store_true", help="Send the tool results to the model as they are")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--baseline", help="JSON report of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    file_config = load_config("config.yaml")
+    models = [file_config["ollama"]["chat_model"], file_config["ollama"].get("agent_model"),
+              file_config["vllm_config"]["chat_model"]]
+    settings = MockLLMSettings(ttft=args.ttft, tokens_per_second=args.tokens_per_second,
+                               completion_tokens=args.completion_tokens, models=[model for model in models if model],
+                               load_time=args.load_time, prefill_tokens_per_second=args.prefill_tokens_per_second)
+
+    replicas = args.replicas if args.backend == "vllm" else 1
+    llm_urls = [f"http://127.0.0.1:{start_mock_llm_server(0, settings).server_address[1]}" for _ in range(replicas)]
+    toolbox_url = f"http://127.0.0.1:{start_mock_toolbox_server(latency=args.tool_latency).server_address[1]}"
+
+    config = build_config(args, llm_urls[0], toolbox_url)
+    pool = ClientPool(config)
+    router = build_router(args, config, pool, llm_urls)
+    if args.mcp:
+        server = MCPServer(name="toolbox", transport="streamable_http",
+                           url=f"{toolbox_url}/mcp/{config['toolbox']['toolset']}")
+        toolbox = MCPSessionPool([server], pool.runtime(), max_concurrency=config["toolbox"].get("max_concurrency", 8))
+    else:
+        toolbox = ToolboxManager(config["toolbox"]["url"], config["toolbox"]["toolset"], pool.runtime(),
+                                 registry_ttl=config["toolbox"].get("registry_ttl", 300),
+                                 max_concurrency=config["toolbox"].get("max_concurrency", 8))
+
+    tool_cache = None
+    if config["tool_cache"]["enabled"]:
+        tool_cache = ToolResultCache(config["tool_cache"].get("ttls", {}),
+                                     max_entries=config["tool_cache"].get("max_entries", 256))
+
+    shaper = None
+    if config["tool_results"]["enabled"]:
+        shaping_config = config["tool_results"]
+        shaper = ResultShaper(shaping_config.get("columns", {}), max_tokens=shaping_config.get("max_tokens", 1500),
+                              max_field_chars=shaping_config.get("max_field_chars", 120))
+
+    def call(tool_name: str, tool_params: Dict) -> str:
+        if tool_cache is None:
+            return toolbox.call(tool_name, tool_params)
+        return tool_cache.get_or_call(tool_name, tool_params, lambda: toolbox.call(tool_name, tool_params))
+
+    def dispatch(tool_name: str, tool_params: Dict) -> str:
+        if shaper is None:
+            return call(tool_name, tool_params)
+        if tool_name == MORE_RESULTS_TOOL:
+            return shaper.more(tool_params.get("handle", ""))
+        return shaper.shape(tool_name, call(tool_name, tool_params))
+
+    scheduler = None
+    if args.scheduler:
+        scheduler = RequestScheduler(max_concurrent=args.scheduler, max_queue=args.sessions,
+                                     queue_timeout=config["scheduler"].get("queue_timeout", 120))
+
+    results: List[TurnResult] = []
+    lock = threading.Lock()
+    sessions = [
+        threading.Thread(target=run_session, args=(session, args, config, router, pool, dispatch, scheduler, results, lock),
+                         name=f"session-{session}")
+        for session in range(args.sessions)
+    ]
+
+    if args.warmup and args.backend == "ollama":
+        ModelWarmer(config).warm()
+
+    tokens_before = completion_tokens()
+    prefix_cache_before = prefix_cache_counters(llm_urls) if args.backend == "vllm" else None
+    started = time.monotonic()
+    for session in sessions:
+        session.start()
+    for session in sessions:
+        session.join()
+    wall_time = time.monotonic() - started
+
+    prefix_cache = None
+    if prefix_cache_before is not None:
+        prefix_cache = [after - before for after, before in zip(prefix_cache_counters(llm_urls), prefix_cache_before)]
+    report = summarize(results, wall_time, completion_tokens() - tokens_before, tool_cache, prefix_cache)
+    toolbox.close()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, args)
+
+    if args.baseline:
+        with open(os.path.join(INVOCATION_DIR, args.baseline), "r") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
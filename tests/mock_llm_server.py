@@ -0,0 +1,460 @@
+"""
+Local stand-in for the model servers used by the load test.
+
+Serves the parts of the OpenAI (vLLM) and Ollama APIs the app uses, with a
+configurable time to first token and token rate:
+
+    POST /v1/chat/completions   GET /v1/models
+    POST /api/chat              GET /api/tags       POST /api/embed
+    POST /api/generate          GET /api/ps         GET /metrics
+
+The "model" asks for a tool whenever tools are offered and the latest user
+message mentions labs, and answers with filler text otherwise. Given a ReAct
+prompt it writes Thought/Action/Answer text instead. Ollama models
+honour keep_alive: a request for a model that is not loaded first waits
+load_time seconds, as a real server loading the weights would. OpenAI requests
+go through a simulated vLLM prefix cache: prompt tokens whose prefix was seen
+before are served from it, the others are prefilled at prefill_tokens_per_second,
+and /metrics reports the counters vLLM exports for it.
+
+Run standalone with:
+    python tests/mock_llm_server.py --port 8001 --ttft 0.2 --tokens-per-second 50
+"""
+import argparse
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+LAB_STATES = ["pending", "approved", "active", "extended", "denied", "completed"]
+
+
+@dataclass
+class MockLLMSettings:
+    """Simulated model behaviour"""
+    ttft: float = 0.2
+    tokens_per_second: float = 50.0
+    completion_tokens: int = 40
+    embedding_dimensions: int = 64
+    # Models reported by /v1/models and /api/tags; any model name is accepted for chat
+    models: List[str] = field(default_factory=list)
+    # Seconds an Ollama request waits when its model is not loaded
+    load_time: float = 0.0
+    # Rate at which prompt tokens missing from the prefix cache are processed; 0 for instant
+    prefill_tokens_per_second: float = 0.0
+
+
+def parse_keep_alive(value) -> float:
+    """Seconds an Ollama keep_alive keeps a model loaded: "5m", "1h30m", 300, or negative for ever"""
+    if value is None:
+        return 300.0
+    if isinstance(value, (int, float)) or re.fullmatch(r"-?\d+(\.\d+)?", str(value)):
+        seconds = float(value)
+    else:
+        units = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+        seconds = sum(float(amount) * units[unit] for amount, unit in re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value))
+    return math.inf if seconds < 0 else seconds
+
+
+class Residency:
+    """Which Ollama models are loaded, and until when"""
+
+    def __init__(self, load_time: float):
+        self.load_time = load_time
+        self._lock = threading.Lock()
+        # model -> (time the load finishes, time the model is unloaded)
+        self._models: Dict[str, Tuple[float, float]] = {}
+
+    def use(self, model: str, keep_alive) -> float:
+        """Mark a model as used and return the seconds to wait for it to load"""
+        now = time.time()
+        with self._lock:
+            ready_at, expires = self._models.get(model, (0.0, 0.0))
+            if expires <= now:
+                ready_at = now + self.load_time
+            # Requests arriving during a load wait for the same load
+            self._models[model] = (ready_at, ready_at + parse_keep_alive(keep_alive))
+            return max(0.0, ready_at - now)
+
+    def loaded(self) -> Dict[str, float]:
+        now = time.time()
+        with self._lock:
+            return {model: expires for model, (_, expires) in self._models.items() if expires > now}
+
+
+class PrefixCache:
+    """
+    vLLM automatic prefix caching: the prompt is cut into blocks, and a block is a
+    hit when the same block, after the same preceding blocks, was prefilled before.
+    """
+    # Tokens per block, as in vLLM; four characters make a token
+    BLOCK_TOKENS = 16
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._blocks = set()
+        self.queries = 0
+        self.hits = 0
+
+    @staticmethod
+    def render(messages: List[Dict], tools: Optional[List[Dict]]) -> str:
+        """Flatten a request the way a chat template does: tools first, then the messages in order"""
+        parts = [json.dumps(tools, sort_keys=True)] if tools else []
+        parts += [f"<|{message.get('role')}|>{message.get('content') or ''}"
+                  f"{json.dumps(message['tool_calls'], sort_keys=True) if message.get('tool_calls') else ''}"
+                  for message in messages]
+        return "".join(parts)
+
+    def lookup(self, prompt: str) -> Tuple[int, int]:
+        """Count the prompt's tokens and those served from the cache, then cache all of its blocks"""
+        size = self.BLOCK_TOKENS * 4
+        tokens = len(prompt) // 4
+        digest = hashlib.sha256()
+        cached = 0
+        with self._lock:
+            hitting = True
+            # Only full blocks are cached
+            for start in range(0, len(prompt) - size + 1, size):
+                digest.update(prompt[start:start + size].encode())
+                key = digest.copy().hexdigest()
+                if hitting and key in self._blocks:
+                    cached += self.BLOCK_TOKENS
+                else:
+                    hitting = False
+                    self._blocks.add(key)
+            self.queries += tokens
+            self.hits += cached
+        return tokens, cached
+
+    def metrics(self) -> str:
+        """The prefix cache counters in the Prometheus text format vLLM uses"""
+        with self._lock:
+            return (
+                "# HELP vllm:prefix_cache_queries_total Prefix cache queries, in terms of number of queried tokens.\n"
+                "# TYPE vllm:prefix_cache_queries_total counter\n"
+                f'vllm:prefix_cache_queries_total{{engine="0",model_name="mock"}} {float(self.queries)}\n'
+                "# HELP vllm:prefix_cache_hits_total Prefix cache hits, in terms of number of cached tokens.\n"
+                "# TYPE vllm:prefix_cache_hits_total counter\n"
+                f'vllm:prefix_cache_hits_total{{engine="0",model_name="mock"}} {float(self.hits)}\n'
+            )
+
+
+def count_tokens(messages: List[Dict]) -> int:
+    """Rough prompt size, matching the history manager's characters-per-token estimate"""
+    return sum(len(str(message.get("content") or "")) for message in messages) // 4
+
+
+def plan_react(messages: List[Dict], settings: MockLLMSettings) -> List[str]:
+    """
+    ReAct text for agents that describe the tools in the prompt.
+
+    Questions about labs get one action per lab state they name, all in one
+    step, followed by a made-up observation the agent has to cut off; the
+    observations get an answer.
+    """
+    tool = re.search(r"^- ([\w-]+)\(", str(messages[0].get("content") or ""), re.MULTILINE)
+    last = messages[-1]
+    text = str(last.get("content") or "")
+    filler = [f" token{index}" for index in range(settings.completion_tokens - 1)]
+
+    if last.get("role") == "user" and text.startswith("Observation"):
+        rows = 0
+        for line in text.splitlines():
+            try:
+                rows += len(json.loads(line.split("): ", 1)[1]))
+            except (IndexError, ValueError, TypeError):
+                continue
+        return ["Thought: I have what I need.\nAnswer: ", f"I found {rows} matching labs."] + filler
+
+    question = text.rsplit("<user>", 1)[-1].lower()
+    states = [state for state in LAB_STATES if state in question] or (["active"] if "lab" in question else [])
+    if tool and states:
+        actions = "".join(f"Action: {tool.group(1)}\nAction Input: {json.dumps({'state': state})}\n"
+                          for state in states)
+        return ["Thought: I need to look up the labs.\n", actions, "Observation:"] + filler
+
+    return ["Thought: I can answer directly.\nAnswer: ", "Here is what I know."] + filler
+
+
+def plan_response(messages: List[Dict], tools: Optional[List[Dict]],
+                  settings: MockLLMSettings) -> Tuple[List[str], Optional[Dict]]:
+    """
+    Decide what the model says.
+
+    Args:
+        messages (List[Dict]): Conversation sent by the client
+        tools (Optional[List[Dict]]): Tools offered by the client
+        settings (MockLLMSettings): Simulated model behaviour
+
+    Returns:
+        Tuple[List[str], Optional[Dict]]: Text tokens and an optional tool call (name, arguments)
+    """
+    if messages and "Action Input:" in str(messages[0].get("content") or ""):
+        return plan_react(messages, settings), None
+
+    last = messages[-1] if messages else {}
+    # The app wraps the question in <user> tags; only look at the question itself
+    text = str(last.get("content") or "").rsplit("<user>", 1)[-1].lower()
+
+    if tools and last.get("role") == "user" and "lab" in text:
+        state = next((state for state in LAB_STATES if state in text), "active")
+        return [], {"name": tools[0]["function"]["name"], "arguments": {"state": state}}
+
+    if last.get("role") == "tool":
+        content = last.get("content") or "[]"
+        # Results compacted by result_shaping end with "(N rows" or "(rows a-b of N"
+        footer = re.search(r"^\((?:rows \d+-\d+ of )?(\d+)", content, re.MULTILINE)
+        try:
+            rows = int(footer.group(1)) if footer else len(json.loads(content))
+        except ValueError:
+            rows = 1
+        prefix = f"I found {rows} matching labs."
+    else:
+        prefix = "Here is what I know."
+
+    tokens = [prefix] + [f" token{index}" for index in range(settings.completion_tokens - 1)]
+    return tokens, None
+
+
+def paced(tokens: List[str], settings: MockLLMSettings, prefill: float = 0.0) -> Iterator[str]:
+    """Yield the tokens at the configured rate after the prefill time and the time to first token"""
+    time.sleep(prefill + settings.ttft)
+    interval = 1.0 / settings.tokens_per_second if settings.tokens_per_second > 0 else 0
+    for index, token in enumerate(tokens):
+        if index and interval:
+            time.sleep(interval)
+        yield token
+
+
+def embed(text: str, dimensions: int) -> List[float]:
+    """Deterministic pseudo-embedding so identical questions map to identical vectors"""
+    digest = hashlib.sha256(text.strip().lower().encode()).digest()
+    values = [digest[index % len(digest)] / 255 - 0.5 + index * 1e-3 for index in range(dimensions)]
+    norm = math.sqrt(sum(value * value for value in values)) or 1.0
+    return [value / norm for value in values]
+
+
+
+class MockServer(ThreadingHTTPServer):
+    """Threaded server with a listen backlog for bursts of concurrent sessions"""
+    request_queue_size = 128
+
+
+def make_handler(settings: MockLLMSettings):
+    """Build the request handler class bound to the settings"""
+    residency = Residency(settings.load_time)
+    prefix_cache = PrefixCache()
+
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, so the client pools are exercised as in production
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path.startswith("/v1/models"):
+                self._send_json({"object": "list", "data": [
+                    {"id": model, "object": "model", "created": 0, "owned_by": "mock"}
+                    for model in settings.models
+                ]})
+            elif self.path.startswith("/api/tags"):
+                self._send_json({"models": [
+                    {"name": model, "model": model, "modified_at": _now(), "size": 0, "digest": "", "details": {}}
+                    for model in settings.models
+                ]})
+            elif self.path.startswith("/api/ps"):
+                self._send_json({"models": [
+                    {"name": model, "model": model, "size": 0, "digest": "", "details": {}, "size_vram": 0,
+                     "expires_at": (datetime.fromtimestamp(min(expires, 4102444800), timezone.utc)).isoformat()}
+                    for model, expires in residency.loaded().items()
+                ]})
+            elif self.path.startswith("/metrics"):
+                body = prefix_cache.metrics().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json({"error": "not found"}, status=404)
+
+        def do_POST(self):
+            try:
+                self._post()
+            except (BrokenPipeError, ConnectionResetError):
+                # The client stopped reading, like the ReAct agent cutting a step off
+                self.close_connection = True
+
+        def _post(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+            if self.path.startswith("/v1/chat/completions"):
+                self._openai_chat(body)
+            elif self.path.startswith("/api/chat"):
+                self._ollama_chat(body)
+            elif self.path.startswith("/api/generate"):
+                # Without a prompt this only loads (or with keep_alive 0, unloads) the model
+                time.sleep(residency.use(body.get("model", ""), body.get("keep_alive")))
+                self._send_json({"model": body.get("model"), "created_at": _now(), "response": "",
+                                 "done": True, "done_reason": "load"})
+            elif self.path.startswith("/api/embed"):
+                inputs = body.get("input", "")
+                inputs = [inputs] if isinstance(inputs, str) else inputs
+                self._send_json({"model": body.get("model"), "embeddings": [
+                    embed(text, settings.embedding_dimensions) for text in inputs
+                ]})
+            else:
+                self._send_json({"error": "not found"}, status=404)
+
+        def _openai_chat(self, body: Dict):
+            model = body.get("model", "")
+            tokens, tool_call = plan_response(body.get("messages", []), body.get("tools"), settings)
+            prompt_tokens, cached_tokens = prefix_cache.lookup(
+                PrefixCache.render(body.get("messages", []), body.get("tools")))
+            rate = settings.prefill_tokens_per_second
+            prefill = (prompt_tokens - cached_tokens) / rate if rate > 0 else 0.0
+            completion_tokens = len(tokens) or 1
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                     "total_tokens": prompt_tokens + completion_tokens}
+            calls = [] if tool_call is None else [{
+                "id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+                "function": {"name": tool_call["name"], "arguments": json.dumps(tool_call["arguments"])},
+            }]
+            finish_reason = "tool_calls" if calls else "stop"
+
+            def chunk(delta: Dict, finish: Optional[str] = None) -> Dict:
+                return {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+
+            if not body.get("stream"):
+                content = "".join(paced(tokens, settings, prefill))
+                message = {"role": "assistant", "content": content or None}
+                if calls:
+                    message["tool_calls"] = calls
+                self._send_json({"id": completion_id, "object": "chat.completion", "created": int(time.time()),
+                                 "model": model, "usage": usage, "choices": [
+                                     {"index": 0, "message": message, "finish_reason": finish_reason}]})
+                return
+
+            self._start_stream("text/event-stream")
+            if calls:
+                time.sleep(prefill + settings.ttft)
+                self._write_event(chunk({"role": "assistant", "tool_calls": [dict(calls[0], index=0)]}))
+            else:
+                for index, token in enumerate(paced(tokens, settings, prefill)):
+                    delta = {"content": token}
+                    if index == 0:
+                        delta["role"] = "assistant"
+                    self._write_event(chunk(delta))
+            self._write_event(chunk({}, finish_reason))
+            if (body.get("stream_options") or {}).get("include_usage"):
+                self._write_event({"id": completion_id, "object": "chat.completion.chunk",
+                                   "created": int(time.time()), "model": model, "choices": [], "usage": usage})
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._end_stream()
+
+        def _ollama_chat(self, body: Dict):
+            model = body.get("model", "")
+            tokens, tool_call = plan_response(body.get("messages", []), body.get("tools"), settings)
+            calls = [] if tool_call is None else [{"function": tool_call}]
+            started = time.monotonic()
+            time.sleep(residency.use(model, body.get("keep_alive")))
+
+            def final(content: str) -> Dict:
+                message = {"role": "assistant", "content": content}
+                if calls:
+                    message["tool_calls"] = calls
+                return {"model": model, "created_at": _now(), "message": message, "done": True,
+                        "done_reason": "stop", "total_duration": int((time.monotonic() - started) * 1e9),
+                        "prompt_eval_count": count_tokens(body.get("messages", [])),
+                        "eval_count": len(tokens) or 1}
+
+            if not body.get("stream", True):
+                content = "".join(paced(tokens, settings))
+                self._send_json(final(content))
+                return
+
+            self._start_stream("application/x-ndjson")
+            for token in paced(tokens, settings):
+                self._write_chunk(json.dumps({"model": model, "created_at": _now(), "done": False,
+                                              "message": {"role": "assistant", "content": token}}).encode() + b"\n")
+            self._write_chunk(json.dumps(final("")).encode() + b"\n")
+            self._end_stream()
+
+        def _send_json(self, payload: Dict, status: int = 200):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _start_stream(self, content_type: str):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+        def _write_event(self, payload: Dict):
+            self._write_chunk(f"data: {json.dumps(payload)}\n\n".encode())
+
+        def _write_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def _end_stream(self):
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def start_mock_llm_server(port: int = 0, settings: Optional[MockLLMSettings] = None) -> ThreadingHTTPServer:
+    """
+    Start the mock model server in a daemon thread.
+
+    Args:
+        port (int): Port to listen on; 0 picks a free one
+        settings (Optional[MockLLMSettings]): Simulated model behaviour
+
+    Returns:
+        ThreadingHTTPServer: The running server; its port is server.server_address[1]
+    """
+    server = MockServer(("127.0.0.1", port), make_handler(settings or MockLLMSettings()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-llm", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Ollama-compatible model server")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--ttft", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--completion-tokens", type=int, default=40)
+    parser.add_argument("--model", action="append", default=[], help="Served model; repeat for several")
+    parser.add_argument("--load-time", type=float, default=0.0, help="Seconds to load an unloaded Ollama model")
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=0.0,
+                        help="Prefill rate of prompt tokens missing from the prefix cache (0: instant)")
+    args = parser.parse_args()
+
+    server = start_mock_llm_server(args.port, MockLLMSettings(
+        ttft=args.ttft, tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens, models=args.model, load_time=args.load_time,
+        prefill_tokens_per_second=args.prefill_tokens_per_second,
+    ))
+    print(f"Mock model server listening on http://127.0.0.1:{server.server_address[1]}")
+    threading.Event().wait()
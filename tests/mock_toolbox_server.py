@@ -0,0 +1,208 @@
+"""
+Local stand-in for genai-toolbox used by the load test.
+
+Loads mysql_dummy_data.sql into an in-memory SQLite database and serves the
+tools and toolsets of tools.yaml over MCP (JSON-RPC over HTTP, the transport
+toolbox-core speaks), running each tool's SQL statement against SQLite.
+
+Run standalone with:
+    python tests/mock_toolbox_server.py --port 5001
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import yaml
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DUMP = os.path.join(REPO_ROOT, "mysql_dummy_data.sql")
+DEFAULT_TOOLS_FILE = os.path.join(REPO_ROOT, "tools.yaml")
+
+INSERT_PATTERN = re.compile(r"INSERT INTO `(\w+)` \(([^)]*)\) VALUES\s*(.*?);\s*$", re.S | re.M)
+
+
+def load_dump(path: str = DEFAULT_DUMP) -> sqlite3.Connection:
+    """
+    Load the INSERT statements of a MySQL dump into an in-memory SQLite database.
+
+    The MySQL DDL is not portable, so each table is created from the column list
+    of its INSERT statement with untyped columns.
+
+    Args:
+        path (str): MySQL dump file
+
+    Returns:
+        sqlite3.Connection: Database shared across threads; guard it with a lock
+    """
+    with open(path, "r") as f:
+        dump = f.read()
+
+    db = sqlite3.connect(":memory:", check_same_thread=False)
+    db.row_factory = sqlite3.Row
+
+    for table, columns, values in INSERT_PATTERN.findall(dump):
+        column_list = columns.replace("`", '"')
+        db.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({column_list})')
+        db.execute(f'INSERT INTO "{table}" ({column_list}) VALUES {values}')
+    db.commit()
+
+    return db
+
+
+class MockToolbox:
+    """Tools from a genai-toolbox tools file, executed against SQLite"""
+
+    def __init__(self, db: sqlite3.Connection, tools_file: str = DEFAULT_TOOLS_FILE, latency: float = 0.0):
+        with open(tools_file, "r") as f:
+            definition = yaml.safe_load(f)
+
+        self.db = db
+        self.latency = latency
+        self.tools: Dict[str, Dict] = definition.get("tools", {})
+        self.toolsets: Dict[str, List[str]] = definition.get("toolsets", {})
+        self._lock = threading.Lock()
+
+    def list_tools(self, toolset: Optional[str] = None) -> List[Dict]:
+        """Describe the tools of a toolset, or all tools, as MCP tool entries"""
+        names = self.toolsets.get(toolset, []) if toolset else list(self.tools)
+        return [self._describe(name) for name in names if name in self.tools]
+
+    def call(self, name: str, arguments: Dict) -> str:
+        """Run a tool's statement with its parameters in declaration order and return the rows as JSON"""
+        tool = self.tools[name]
+        params = [arguments.get(param["name"]) for param in tool.get("parameters", [])]
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            rows = self.db.execute(tool["statement"], params).fetchall()
+
+        return json.dumps([dict(row) for row in rows], default=str)
+
+    def _describe(self, name: str) -> Dict:
+        tool = self.tools[name]
+        parameters = tool.get("parameters", [])
+        return {
+            "name": name,
+            "description": tool.get("description", ""),
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    param["name"]: {"type": param.get("type", "string"), "description": param.get("description", "")}
+                    for param in parameters
+                },
+                "required": [param["name"] for param in parameters],
+            },
+        }
+
+
+
+class MockServer(ThreadingHTTPServer):
+    """Threaded server with a listen backlog for bursts of concurrent sessions"""
+    request_queue_size = 128
+
+
+def make_handler(toolbox: MockToolbox):
+    """Build the MCP request handler class bound to the toolbox"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            # Toolset manifest, which the app's readiness probe requests
+            if not self.path.startswith("/api/toolset"):
+                self._send(404, {"error": "not found"})
+                return
+            toolset = self.path[len("/api/toolset"):].strip("/") or None
+            self._send(200, {"serverVersion": "0.0.0",
+                             "tools": {tool["name"]: tool for tool in toolbox.list_tools(toolset)}})
+
+        def do_POST(self):
+            if not self.path.startswith("/mcp"):
+                self._send(404, {"error": "not found"})
+                return
+
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            method = request.get("method", "")
+            params = request.get("params") or {}
+
+            if "id" not in request:
+                # Notifications, e.g. notifications/initialized
+                self._send(202, None)
+                return
+
+            if method == "initialize":
+                result = {
+                    "protocolVersion": params.get("protocolVersion"),
+                    "capabilities": {"tools": {"listChanged": False}},
+                    "serverInfo": {"name": "mock-toolbox", "version": "0.0.0"},
+                }
+            elif method == "tools/list":
+                toolset = self.path[len("/mcp"):].strip("/") or None
+                result = {"tools": toolbox.list_tools(toolset)}
+            elif method == "tools/call":
+                try:
+                    text = toolbox.call(params.get("name"), params.get("arguments") or {})
+                    result = {"content": [{"type": "text", "text": text}], "isError": False}
+                except Exception as e:
+                    result = {"content": [{"type": "text", "text": str(e)}], "isError": True}
+            else:
+                self._send(200, {"jsonrpc": "2.0", "id": request["id"],
+                                 "error": {"code": -32601, "message": f"Method not found: {method}"}})
+                return
+
+            self._send(200, {"jsonrpc": "2.0", "id": request["id"], "result": result})
+
+        def _send(self, status: int, payload: Optional[Dict]):
+            body = b"" if payload is None else json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_mock_toolbox_server(port: int = 0, dump: str = DEFAULT_DUMP, tools_file: str = DEFAULT_TOOLS_FILE,
+                              latency: float = 0.0) -> ThreadingHTTPServer:
+    """
+    Start the mock toolbox in a daemon thread.
+
+    Args:
+        port (int): Port to listen on; 0 picks a free one
+        dump (str): MySQL dump with the data
+        tools_file (str): genai-toolbox tools file
+        latency (float): Extra seconds added to every tool call
+
+    Returns:
+        ThreadingHTTPServer: The running server; its port is server.server_address[1]
+    """
+    toolbox = MockToolbox(load_dump(dump), tools_file, latency)
+    server = MockServer(("127.0.0.1", port), make_handler(toolbox))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-toolbox", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock genai-toolbox MCP server backed by SQLite")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--dump", default=DEFAULT_DUMP)
+    parser.add_argument("--tools-file", default=DEFAULT_TOOLS_FILE)
+    parser.add_argument("--latency", type=float, default=0.0, help="Extra seconds per tool call")
+    args = parser.parse_args()
+
+    server = start_mock_toolbox_server(args.port, args.dump, args.tools_file, args.latency)
+    print(f"Mock toolbox listening on http://127.0.0.1:{server.server_address[1]}")
+    threading.Event().wait()
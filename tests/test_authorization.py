@@ -0,0 +1,70 @@
+import pytest
+
+from authorization import AuthorizationIndex, ReloadingAuthorizationIndex
+
+
+class FakeConfigManager:
+    """Serves a fixed preauthorized section, like settings.ConfigManager"""
+
+    def __init__(self, path, preauthorized):
+        self.path = path
+        self.version = 0
+        self.preauthorized = preauthorized
+
+    def get(self):
+        return {"preauthorized": self.preauthorized}
+
+
+def test_emails_match_case_insensitively():
+    index = AuthorizationIndex(["Partner@Example.com "], [])
+    assert index.is_authorized("partner@example.COM")
+    assert not index.is_authorized("other@example.com")
+
+
+def test_exact_domain_and_subdomain_suffix():
+    index = AuthorizationIndex([], ["redhat.com", ".ibm.com"])
+    assert index.is_authorized("user@redhat.com")
+    assert not index.is_authorized("user@emea.redhat.com")
+    assert index.is_authorized("user@us.ibm.com")
+    assert index.is_authorized("user@ibm.com")
+    assert not index.is_authorized("not-an-email")
+
+
+def test_only_an_empty_section_allows_everyone():
+    assert AuthorizationIndex.from_config({"emails": [], "domains": []}).is_authorized("anyone@gmail.com")
+    # Domains restrict access even without emails
+    assert not AuthorizationIndex.from_config({"emails": []}).is_authorized("anyone@gmail.com")
+
+
+def test_empty_emails_file_does_not_allow_everyone(tmp_path):
+    (tmp_path / "emails.txt").write_text("# event partners\n\n")
+    index = AuthorizationIndex.from_config({"emails_file": "emails.txt", "domains": []}, str(tmp_path))
+
+    assert not index.allow_all
+    assert not index.is_authorized("anyone@gmail.com")
+
+
+def test_empty_emails_file_is_rejected_on_request(tmp_path):
+    (tmp_path / "emails.txt").write_text("")
+    with pytest.raises(ValueError):
+        AuthorizationIndex.from_config({"emails_file": "emails.txt"}, str(tmp_path), allow_empty_file=False)
+
+
+def test_reload_keeps_the_previous_lists_when_the_file_empties_or_disappears(tmp_path):
+    emails_file = tmp_path / "emails.txt"
+    emails_file.write_text("partner@example.com\n")
+    manager = FakeConfigManager(str(tmp_path / "config.yaml"), {"emails_file": "emails.txt", "domains": []})
+    index = ReloadingAuthorizationIndex(manager, check_interval=0)
+    assert index.is_authorized("partner@example.com")
+
+    # A ConfigMap update in progress
+    emails_file.write_text("")
+    assert index.is_authorized("partner@example.com")
+    assert not index.is_authorized("anyone@gmail.com")
+
+    emails_file.unlink()
+    assert index.is_authorized("partner@example.com")
+
+    emails_file.write_text("new@example.com\n")
+    assert index.is_authorized("new@example.com")
+    assert not index.is_authorized("partner@example.com")
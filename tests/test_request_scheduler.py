@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import pytest
+
+from async_runtime import AsyncRuntime, DeadlineExceeded
+from request_scheduler import QueueFull, QueueTimeout, RequestScheduler, until_deadline
+from tool_runner import run_tool_loop
+
+
+def test_admits_up_to_max_concurrent():
+    scheduler = RequestScheduler(max_concurrent=2, max_per_user=1)
+    first, second, third = (scheduler.submit(user) for user in ("a", "b", "c"))
+    assert first.admitted and second.admitted
+    assert not third.admitted
+    assert scheduler.position(third) == 1
+    assert scheduler.stats() == {"running": 2, "waiting": 1}
+
+    scheduler.release(first)
+    assert third.admitted
+    assert scheduler.position(third) == 0
+
+
+def test_per_user_cap_lets_other_users_go_first():
+    scheduler = RequestScheduler(max_concurrent=2, max_per_user=1)
+    running = scheduler.submit("a")
+    queued = scheduler.submit("a")
+    other = scheduler.submit("b")
+    assert running.admitted and other.admitted
+    assert not queued.admitted
+
+    scheduler.release(other)
+    assert not queued.admitted
+    scheduler.release(running)
+    assert queued.admitted
+
+
+def test_waiting_turns_are_admitted_in_arrival_order():
+    scheduler = RequestScheduler(max_concurrent=1, max_per_user=1)
+    running = scheduler.submit("a")
+    second, third = scheduler.submit("b"), scheduler.submit("c")
+    scheduler.release(running)
+    assert second.admitted and not third.admitted
+
+
+def test_queue_full():
+    scheduler = RequestScheduler(max_concurrent=1, max_queue=2, max_queued_per_user=5)
+    scheduler.submit("a")
+    scheduler.submit("b")
+    scheduler.submit("c")
+    with pytest.raises(QueueFull):
+        scheduler.submit("d")
+
+
+def test_user_queue_full():
+    scheduler = RequestScheduler(max_concurrent=1, max_queue=10, max_queued_per_user=1)
+    scheduler.submit("a")
+    scheduler.submit("a")
+    with pytest.raises(QueueFull):
+        scheduler.submit("a")
+    assert not scheduler.submit("b").admitted
+
+
+def test_wait_returns_false_then_times_out():
+    scheduler = RequestScheduler(max_concurrent=1, queue_timeout=0.2)
+    scheduler.submit("a")
+    waiting = scheduler.submit("b")
+    assert not scheduler.wait(waiting, 0.05)
+    with pytest.raises(QueueTimeout):
+        scheduler.wait(waiting, 1)
+    assert scheduler.stats() == {"running": 1, "waiting": 0}
+
+
+def test_expired_lease_frees_the_slot():
+    scheduler = RequestScheduler(max_concurrent=1, lease=0.1)
+    scheduler.submit("a")
+    waiting = scheduler.submit("b")
+    assert scheduler.wait(waiting, 1)
+    assert scheduler.stats() == {"running": 1, "waiting": 0}
+
+
+def test_abandoned_waiters_are_dropped():
+    scheduler = RequestScheduler(max_concurrent=1, abandon_after=0.05)
+    scheduler.submit("a")
+    scheduler.submit("b")
+    time.sleep(0.1)
+    scheduler.submit("c")
+    assert scheduler.stats() == {"running": 1, "waiting": 1}
+
+
+def test_until_deadline_cuts_off_with_notice():
+    closed = []
+
+    def chunks():
+        try:
+            yield "one"
+            time.sleep(0.05)
+            yield "two"
+            yield "three"
+        finally:
+            closed.append(True)
+
+    output = list(until_deadline(chunks(), time.monotonic() + 0.01, "[cut]"))
+    assert output == ["one", "two", "[cut]"]
+    assert closed == [True]
+
+
+def test_until_deadline_passes_complete_output():
+    assert list(until_deadline(iter(["a", "b"]), time.monotonic() + 10, "[cut]")) == ["a", "b"]
+
+
+def test_deadline_cancels_a_stalled_model_call():
+    runtime = AsyncRuntime()
+
+    async def stalled():
+        yield "first"
+        await asyncio.sleep(10)
+        yield "never"
+
+    started = time.monotonic()
+    try:
+        output = list(until_deadline(runtime.iterate(stalled(), time.monotonic() + 0.2),
+                                     time.monotonic() + 0.2, "[cut]"))
+    finally:
+        runtime.close()
+    assert output == ["first", "[cut]"]
+    assert time.monotonic() - started < 2
+
+
+def test_tool_loop_stops_before_dispatch_after_deadline():
+    dispatched = []
+
+    def step(messages, allow_tools):
+        time.sleep(0.05)
+        return {"role": "assistant", "content": ""}, [object()]
+        yield
+
+    loop = run_tool_loop(step, [], lambda name, params: dispatched.append(name), lambda call, result: {},
+                         deadline=time.monotonic() + 0.01)
+    with pytest.raises(DeadlineExceeded):
+        list(loop)
+    assert dispatched == []
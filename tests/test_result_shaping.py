@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+from result_shaping import MORE_RESULTS_TOOL, ResultShaper, cell, parse_rows
+
+
+def handle_of(page):
+    last = page.splitlines()[-1]
+    assert last.startswith(f"More: call {MORE_RESULTS_TOOL}")
+    return json.loads(last.split(" with ", 1)[1])["handle"]
+
+
+def test_projects_configured_columns():
+    shaper = ResultShaper(columns={"labs": ["id", "name"]})
+    rows = [{"id": 1, "name": "one", "secret": "x"}, {"id": 2, "name": "two", "secret": "y"}]
+    assert shaper.shape("labs", json.dumps(rows)).splitlines() == [
+        "id|name", "1|one", "2|two", "(2 rows, long values cut with …)",
+    ]
+
+
+def test_unconfigured_tool_keeps_every_column_in_first_seen_order():
+    page = ResultShaper().shape("other", json.dumps([{"a": 1}, {"b": None, "a": 2}]))
+    assert page.splitlines()[:3] == ["a|b", "1|", "2|"]
+
+
+def test_single_object_is_one_row():
+    assert ResultShaper().shape("t", json.dumps({"a": 1})).splitlines()[:2] == ["a", "1"]
+
+
+def test_cell_cuts_long_values_and_flattens_them():
+    assert cell("word " * 50, 10) == "word word…"
+    assert cell("a|b\nc", 0) == "a/b c"
+    assert cell({"k": [1, 2]}, 0) == '{"k":[1,2]}'
+    assert cell(None, 10) == ""
+
+
+def test_parse_rows_only_accepts_objects():
+    assert parse_rows('[{"a": 1}]') == [{"a": 1}]
+    assert parse_rows("[1, 2]") is None
+    assert parse_rows("[]") is None
+    assert parse_rows("not json") is None
+
+
+def test_pages_long_results_with_handles():
+    shaper = ResultShaper(max_tokens=20, chars_per_token=1)
+    rows = [{"id": index, "name": f"lab-{index:02d}"} for index in range(10)]
+    pages = [shaper.shape("labs", json.dumps(rows))]
+    while pages[-1].splitlines()[-1].startswith("More:"):
+        pages.append(shaper.more(handle_of(pages[-1])))
+
+    assert len(pages) > 1
+    assert all(page.splitlines()[0] == "id|name" for page in pages)
+    assert pages[0].splitlines()[-2].startswith("(rows 1-")
+    assert pages[-1].splitlines()[-1].endswith(" of 10, long values cut with …)")
+    seen = [line for page in pages for line in page.splitlines() if line.split("|")[0].isdigit()]
+    assert seen == [f"{index}|lab-{index:02d}" for index in range(10)]
+
+
+def test_every_page_makes_progress():
+    shaper = ResultShaper(max_tokens=1, chars_per_token=1)
+    page = shaper.shape("t", json.dumps([{"a": "long value"}, {"a": "other value"}]))
+    assert "long value" in page
+    assert "other value" in shaper.more(handle_of(page))
+
+
+def test_non_json_text_is_passed_through_or_sliced():
+    shaper = ResultShaper(max_tokens=10, chars_per_token=1)
+    assert shaper.shape("t", "short") == "short"
+
+    text = "abcdefghij" * 3
+    page = shaper.shape("t", text)
+    assert page.splitlines()[0] == text[:10]
+    second = shaper.more(handle_of(page))
+    assert second.splitlines()[0] == text[10:20]
+    assert shaper.more(handle_of(second)) == text[20:]
+
+
+def test_unknown_and_malformed_handles():
+    shaper = ResultShaper()
+    for handle in ("deadbeef:1", "nohandle", "", None):
+        with pytest.raises(ValueError):
+            shaper.more(handle)
+
+
+def test_offset_past_the_end_is_rejected():
+    shaper = ResultShaper(max_tokens=5, chars_per_token=1)
+    result_id = handle_of(shaper.shape("t", "x" * 20)).split(":")[0]
+    with pytest.raises(ValueError):
+        shaper.more(f"{result_id}:99")
+    with pytest.raises(ValueError):
+        shaper.more(f"{result_id}:-1")
+
+
+def test_expired_handles(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("result_shaping.time.monotonic", lambda: clock[0])
+    shaper = ResultShaper(max_tokens=5, chars_per_token=1, result_ttl=60)
+    handle = handle_of(shaper.shape("t", "x" * 20))
+    assert shaper.more(handle)
+
+    clock[0] += 61
+    with pytest.raises(ValueError):
+        shaper.more(handle)
+
+
+def test_oldest_results_are_dropped_past_max_results():
+    shaper = ResultShaper(max_tokens=5, chars_per_token=1, max_results=1)
+    first = handle_of(shaper.shape("t", "x" * 20))
+    second = handle_of(shaper.shape("t", "y" * 20))
+    with pytest.raises(ValueError):
+        shaper.more(first)
+    assert shaper.more(second).startswith("y")
@@ -0,0 +1,137 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import metrics
+
+
+class ToolResultCache:
+    """Bounded LRU cache of read-only tool results with per-tool TTLs"""
+
+    def __init__(self, ttls: Dict[str, float], max_entries: int = 256,
+                 invalidates: Optional[Dict[str, List[str]]] = None):
+        # Only tools with a TTL are cached; everything else is passed straight through
+        self.ttls = ttls
+        self.max_entries = max_entries
+        # Tools that change data, mapped to the cached tools whose results they make stale
+        self.invalidates = invalidates or {}
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+
+    @staticmethod
+    def make_key(tool_name: str, tool_params: Dict) -> str:
+        """Build a cache key that ignores parameter order, surrounding whitespace and unset values"""
+        params = {
+            name: value.strip() if isinstance(value, str) else value
+            for name, value in tool_params.items()
+            if value is not None
+        }
+        return f"{tool_name}:{json.dumps(params, sort_keys=True, default=str)}"
+
+    def get_or_call(self, tool_name: str, tool_params: Dict, call: Callable[[], Any]) -> Any:
+        """
+        Return a fresh cached result for the tool call or execute it and cache the result.
+
+        Concurrent misses for the same key wait for a single execution.
+
+        Args:
+            tool_name (str): Name of the tool
+            tool_params (Dict): Tool parameters
+            call (Callable[[], Any]): Executes the tool
+
+        Returns:
+            Any: Tool result
+        """
+        ttl = self.ttls.get(tool_name)
+        if not ttl:
+            result = call()
+            for cached_tool in self.invalidates.get(tool_name, []):
+                self.invalidate(cached_tool)
+            return result
+
+        key = self.make_key(tool_name, tool_params)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            result = self._lookup(key)
+            if result is not None:
+                self._count(tool_name, hit=True)
+                return result
+
+            self._count(tool_name, hit=False)
+            try:
+                result = call()
+            except BaseException:
+                # Nothing is stored for the key, so its lock would never be dropped by an eviction
+                with self._lock:
+                    if key not in self._entries:
+                        self._key_locks.pop(key, None)
+                raise
+            self._store(key, tool_name, result, ttl)
+
+        return result
+
+    def invalidate(self, tool_name: Optional[str] = None) -> None:
+        """Drop the cached results of one tool, or of every tool"""
+        with self._lock:
+            for key in list(self._entries):
+                if tool_name is None or self._entries[key][0] == tool_name:
+                    del self._entries[key]
+                    self._drop_key_lock(key)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return hit and miss counts per tool"""
+        with self._lock:
+            return {
+                tool_name: {"hits": self._hits.get(tool_name, 0), "misses": self._misses.get(tool_name, 0)}
+                for tool_name in set(self._hits) | set(self._misses)
+            }
+
+    def hit_rate(self) -> float:
+        """Return the overall share of lookups served from the cache"""
+        with self._lock:
+            hits = sum(self._hits.values())
+            total = hits + sum(self._misses.values())
+        return hits / total if total else 0.0
+
+    def _lookup(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            _, result, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return result
+
+    def _store(self, key: str, tool_name: str, result: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (tool_name, result, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._drop_key_lock(evicted)
+
+    def _drop_key_lock(self, key: str) -> None:
+        # A held lock still guards a call in flight; dropping it would let a second caller start
+        # the same call. Its holder stores a result for the key or drops the lock when the call fails.
+        key_lock = self._key_locks.get(key)
+        if key_lock is not None and not key_lock.locked():
+            del self._key_locks[key]
+
+    def _count(self, tool_name: str, hit: bool) -> None:
+        counter = self._hits if hit else self._misses
+        with self._lock:
+            counter[tool_name] = counter.get(tool_name, 0) + 1
+        metrics.TOOL_CACHE_LOOKUPS.labels(tool=tool_name, result="hit" if hit else "miss").inc()
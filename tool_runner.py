@@ -0,0 +1,85 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Generator, Iterator, List, Optional, Tuple
+
+from async_runtime import check_deadline
+
+
+@dataclass
+class ToolCall:
+    """A single tool invocation requested by the model"""
+    id: str
+    name: str
+    arguments: Dict
+
+
+# A step sends the messages to the model, yields any text it produces and
+# returns the assistant message to record plus the tool calls it requested.
+Step = Callable[[List[Dict], bool], Generator[str, None, Tuple[Dict, List[ToolCall]]]]
+
+
+def dispatch_tool_calls(tool_calls: List[ToolCall], dispatch: Callable[[str, Dict], str],
+                        max_workers: int = 4) -> List[str]:
+    """
+    Execute the tool calls of one assistant turn, concurrently when there are several.
+
+    Args:
+        tool_calls (List[ToolCall]): Tool calls requested by the model
+        dispatch (Callable[[str, Dict], str]): Executes a tool by name with its parameters
+        max_workers (int): Upper bound on concurrently running tool calls
+
+    Returns:
+        List[str]: Tool results in the same order as tool_calls
+    """
+    def run(tool_call: ToolCall) -> str:
+        try:
+            return str(dispatch(tool_call.name, tool_call.arguments))
+        except Exception as e:
+            # Hand the failure back to the model instead of aborting the turn
+            return f"Error: {str(e)}"
+
+    if len(tool_calls) == 1:
+        return [run(tool_calls[0])]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tool_calls))) as executor:
+        return list(executor.map(run, tool_calls))
+
+
+def run_tool_loop(step: Step, messages: List[Dict], dispatch: Callable[[str, Dict], str],
+                  tool_message: Callable[[ToolCall, str], Dict],
+                  max_steps: int = 5, max_workers: int = 4, deadline: Optional[float] = None) -> Iterator[str]:
+    """
+    Let the model call tools until it answers or runs out of steps.
+
+    Every step offers the tools to the model; requested tool calls are executed,
+    their results appended to `messages` and the model is called again. The last
+    step withholds the tools so the model has to answer with what it has.
+
+    Args:
+        step (Step): Backend specific model call
+        messages (List[Dict]): Conversation to send; extended in place with tool turns
+        dispatch (Callable[[str, Dict], str]): Executes a tool by name with its parameters
+        tool_message (Callable[[ToolCall, str], Dict]): Builds the backend specific tool result message
+        max_steps (int): Maximum number of model calls
+        max_workers (int): Upper bound on concurrently running tool calls
+        deadline (Optional[float]): time.monotonic() value after which no step or tool call is started
+
+    Returns:
+        Iterator[str]: Text produced by the model
+
+    Raises:
+        DeadlineExceeded: If the deadline passes between steps
+    """
+    for step_number in range(max_steps):
+        check_deadline(deadline)
+        allow_tools = step_number < max_steps - 1
+        assistant_message, tool_calls = yield from step(messages, allow_tools)
+
+        if not tool_calls:
+            return
+
+        messages.append(assistant_message)
+        check_deadline(deadline)
+        results = dispatch_tool_calls(tool_calls, dispatch, max_workers)
+        for tool_call, result in zip(tool_calls, results):
+            messages.append(tool_message(tool_call, result))
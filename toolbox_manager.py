@@ -0,0 +1,124 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING, Dict, Optional
+
+import metrics
+from async_runtime import AsyncRuntime
+
+# toolbox_core is imported when the registry is first loaded, so deployments without tools skip it
+if TYPE_CHECKING:
+    from toolbox_core import ToolboxClient
+    from toolbox_core.tool import ToolboxTool
+
+
+class ToolboxManager:
+    """Long-lived async genai-toolbox client with a cached, TTL-refreshed tool registry"""
+
+    def __init__(self, url: str, toolset: str, runtime: AsyncRuntime, registry_ttl: float = 300,
+                 max_concurrency: int = 8, missing_refresh_interval: float = 30):
+        self.url = url
+        self.toolset = toolset
+        self.runtime = runtime
+        self.registry_ttl = registry_ttl
+        self.max_concurrency = max_concurrency
+        # Minimum seconds between the reloads triggered by calls to tools the registry lacks
+        self.missing_refresh_interval = missing_refresh_interval
+
+        # Both are created lazily on the runtime loop, which the client session is bound to
+        self._lock: Optional[asyncio.Lock] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._client: Optional["ToolboxClient"] = None
+        self._tools: Dict[str, "ToolboxTool"] = {}
+        self._loaded_at = 0.0
+        self._missing_refreshed_at: Optional[float] = None
+
+    async def tools(self) -> Dict[str, "ToolboxTool"]:
+        """Return the loaded tools by name, reloading the toolset once the registry has expired"""
+        async with self._get_lock():
+            if not self._tools or time.monotonic() - self._loaded_at > self.registry_ttl:
+                await self._refresh()
+            return self._tools
+
+    async def call_async(self, tool_name: str, tool_params: Dict) -> str:
+        """
+        Execute a tool from the registry.
+
+        Args:
+            tool_name (str): Name of the tool in tools.yaml
+            tool_params (Dict): Tool parameters
+
+        Returns:
+            str: Tool result
+
+        Raises:
+            ValueError: If the toolset does not contain the tool
+        """
+        tool = (await self.tools()).get(tool_name)
+
+        if tool is None:
+            # The tool may have been added to the server since the last refresh. Reload at most
+            # once per interval, so calls to a tool that does not exist cannot hammer the server.
+            async with self._get_lock():
+                tool = self._tools.get(tool_name)
+                now = time.monotonic()
+                if tool is None and (self._missing_refreshed_at is None
+                                     or now - self._missing_refreshed_at >= self.missing_refresh_interval):
+                    self._missing_refreshed_at = now
+                    await self._refresh()
+                    tool = self._tools.get(tool_name)
+
+        if tool is None:
+            raise ValueError(f"Unknown toolbox tool: {tool_name}")
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            try:
+                with metrics.timed(metrics.TOOL_CALL_DURATION, tool=tool_name):
+                    return await tool(**tool_params)
+            except Exception:
+                metrics.TOOL_CALL_ERRORS.labels(tool=tool_name).inc()
+                raise
+
+    def call(self, tool_name: str, tool_params: Dict) -> str:
+        """Execute a tool from sync code by running call_async on the shared loop"""
+        return self.runtime.run(self.call_async(tool_name, tool_params))
+
+    def close(self) -> None:
+        """Close the underlying client session"""
+        self.runtime.run(self._close_client())
+        self._tools = {}
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _refresh(self) -> None:
+        from toolbox_core import ToolboxClient
+
+        try:
+            if self._client is None:
+                self._client = ToolboxClient(self.url)
+            tools = await self._client.load_toolset(self.toolset)
+        except Exception as e:
+            if not self._tools:
+                # Nothing is served yet; reconnect on the next attempt
+                await self._close_client()
+                raise
+            # Keep serving the previous registry. Its tools stop working once their client is
+            # closed, so the client stays open; the session reconnects on the next request.
+            print(f"Failed to refresh toolset {self.toolset}: {str(e)}")
+            self._loaded_at = time.monotonic()
+            return
+
+        self._tools = {tool.__name__: tool for tool in tools}
+        self._loaded_at = time.monotonic()
+
+    async def _close_client(self) -> None:
+        if self._client is not None:
+            try:
+                await self._client.close()
+            except Exception:
+                pass
+            self._client = None